@@ -0,0 +1,40 @@
+"""Delete dependent rows with ON DELETE CASCADE foreign keys
+
+Revision ID: a4d9c2e8f3b6
+Revises: f1c8a3e5b7d9
+Create Date: 2026-10-17 18:35:27.118640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d9c2e8f3b6'
+down_revision: Union[str, None] = 'f1c8a3e5b7d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The constraints were created unnamed, these are the names Postgres gave them
+FOREIGN_KEYS = [
+    ('decks_user_id_fkey', 'decks', 'user_id', 'users'),
+    ('flashcards_deck_id_fkey', 'flashcards', 'deck_id', 'decks'),
+    ('flashcards_user_id_fkey', 'flashcards', 'user_id', 'users'),
+    ('reviews_flashcard_id_fkey', 'reviews', 'flashcard_id', 'flashcards'),
+    ('reviews_user_id_fkey', 'reviews', 'user_id', 'users'),
+    ('generation_jobs_user_id_fkey', 'generation_jobs', 'user_id', 'users'),
+]
+
+
+def upgrade() -> None:
+    for name, table, column, referred_table in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred_table, [column], ['id'], ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    for name, table, column, referred_table in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred_table, [column], ['id'])
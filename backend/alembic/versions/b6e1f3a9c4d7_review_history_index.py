@@ -0,0 +1,34 @@
+"""Add an index for streaming the review history of a user
+
+Revision ID: b6e1f3a9c4d7
+Revises: a4d9c2e8f3b6
+Create Date: 2026-10-17 20:12:41.530218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e1f3a9c4d7'
+down_revision: Union[str, None] = 'a4d9c2e8f3b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built CONCURRENTLY so reviews can still be stored, which cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_reviews_user_flashcard_review_at', 'reviews', ['user_id', 'flashcard_id', 'review_at'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_reviews_user_flashcard_review_at', table_name='reviews', postgresql_concurrently=True, if_exists=True
+        )
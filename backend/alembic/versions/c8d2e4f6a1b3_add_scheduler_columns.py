@@ -0,0 +1,36 @@
+"""Add the FSRS card state and the scheduler choice of users and decks
+
+Revision ID: c8d2e4f6a1b3
+Revises: b6e1f3a9c4d7
+Create Date: 2026-10-17 22:41:09.184527
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8d2e4f6a1b3'
+down_revision: Union[str, None] = 'b6e1f3a9c4d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('flashcards', sa.Column('stability', sa.Float(), nullable=True))
+    op.add_column('flashcards', sa.Column('difficulty', sa.Float(), nullable=True))
+    # add_column does not create the enum type, unlike create_table
+    scheduler_name = sa.Enum('SM2', 'FSRS', name='schedulername')
+    scheduler_name.create(op.get_bind(), checkfirst=True)
+    op.add_column('decks', sa.Column('scheduler', scheduler_name, nullable=True))
+    op.add_column('users', sa.Column('scheduler', scheduler_name, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'scheduler')
+    op.drop_column('decks', 'scheduler')
+    sa.Enum(name='schedulername').drop(op.get_bind(), checkfirst=True)
+    op.drop_column('flashcards', 'difficulty')
+    op.drop_column('flashcards', 'stability')
@@ -0,0 +1,46 @@
+"""Add composite indexes for the due-card queries
+
+Revision ID: e7b2d4f6a8c1
+Revises: c3a9e5f1b7d2
+Create Date: 2026-10-17 16:03:41.270518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2d4f6a8c1'
+down_revision: Union[str, None] = 'c3a9e5f1b7d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY does not lock the flashcards table against writes,
+    # but cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_flashcards_user_deck_next_review',
+            'flashcards',
+            ['user_id', 'deck_id', 'next_review_at'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_flashcards_user_next_review',
+            'flashcards',
+            ['user_id', 'next_review_at'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_flashcards_user_next_review', table_name='flashcards', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_flashcards_user_deck_next_review', table_name='flashcards', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,37 @@
+"""Add indexes for the paginated deck and flashcard listings
+
+Revision ID: f1c8a3e5b7d9
+Revises: e7b2d4f6a8c1
+Create Date: 2026-10-17 17:48:12.904316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c8a3e5b7d9'
+down_revision: Union[str, None] = 'e7b2d4f6a8c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_flashcards_user_deck_created', 'flashcards', ['user_id', 'deck_id', 'created_at']),
+    ('ix_flashcards_user_created', 'flashcards', ['user_id', 'created_at']),
+    ('ix_decks_user_created', 'decks', ['user_id', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    # Built CONCURRENTLY so the tables stay writable, which cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
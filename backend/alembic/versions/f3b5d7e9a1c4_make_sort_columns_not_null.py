@@ -0,0 +1,35 @@
+"""Make the pagination sort columns NOT NULL
+
+Revision ID: f3b5d7e9a1c4
+Revises: e9a1c3b5d7f2
+Create Date: 2026-10-19 09:12:44.871203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b5d7e9a1c4'
+down_revision: Union[str, None] = 'e9a1c3b5d7f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset pagination compares (sort column, id) tuples, a NULL sort value never compares
+    # greater than a cursor, so rows written without one are backfilled before the constraint
+    op.execute("UPDATE decks SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+    op.execute("UPDATE flashcards SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+    op.execute("UPDATE flashcards SET next_review_at = created_at WHERE next_review_at IS NULL")
+    op.alter_column('decks', 'created_at', existing_type=sa.DateTime(), nullable=False)
+    op.alter_column('flashcards', 'created_at', existing_type=sa.DateTime(), nullable=False)
+    op.alter_column('flashcards', 'next_review_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    op.alter_column('flashcards', 'next_review_at', existing_type=sa.DateTime(), nullable=True)
+    op.alter_column('flashcards', 'created_at', existing_type=sa.DateTime(), nullable=True)
+    op.alter_column('decks', 'created_at', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,130 @@
+"""Throughput and latency of the sync and the async endpoint stack under many concurrent clients.
+
+Each client repeatedly fetches the due cards of a deck. The sync stack runs
+every request in FastAPI's threadpool, the async stack serves it from the
+async engine (USE_ASYNC_DB). Both stacks use the same connection pool size.
+
+By default a throwaway SQLite file is used (aiosqlite for the async stack).
+Pass a PostgreSQL URL to compare against a real server:
+    python benchmarks/bench_async_stack.py --database-url postgresql+psycopg://user:pw@localhost:5433/bench
+
+Usage (from backend/):
+    python benchmarks/bench_async_stack.py --clients 500 --requests 2
+"""
+import argparse
+import asyncio
+import os
+import logging
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from common import create_user, summarize
+from routers import decks, decks_async
+from src.database import Base, get_db, get_async_db
+from src.models import DBDeck, DBFlashcard
+
+
+def sync_app(url: str, pool_size: int) -> tuple[FastAPI, object]:
+    engine = create_engine(url, pool_size=pool_size, max_overflow=0)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(decks.router)
+    app.dependency_overrides[get_db] = override_get_db
+    return app, engine
+
+
+def async_app(url: str, pool_size: int) -> tuple[FastAPI, object]:
+    if url.startswith("sqlite://"):
+        url = url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    engine = create_async_engine(url, pool_size=pool_size, max_overflow=0)
+    session_factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(decks_async.router)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    return app, engine
+
+
+def create_fixtures(url: str, cards: int):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    user, headers = create_user(session_factory, username=f"benchuser{int(time.time())}")
+    db = session_factory()
+    try:
+        deck = DBDeck(name="Bench deck", user_id=user.id)
+        db.add(deck)
+        db.flush()
+        db.add_all([DBFlashcard(front=f"Q{i}", back=f"A{i}", deck_id=deck.id, user_id=user.id) for i in range(cards)])
+        db.commit()
+        return deck.id, headers
+    finally:
+        db.close()
+        engine.dispose()
+
+
+async def load(app: FastAPI, deck_id: int, headers: dict, clients: int, requests: int) -> tuple[float, list[float], int]:
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    limits = httpx.Limits(max_connections=None)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None, limits=limits) as client:
+        path = f"/decks/{deck_id}/flashcards?due=true"
+        await client.get(path, headers=headers)
+        samples = []
+        failures = 0
+
+        async def run_client():
+            nonlocal failures
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                samples.append(time.perf_counter() - start)
+                failures += response.status_code != 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*[run_client() for _ in range(clients)])
+        return time.perf_counter() - start, samples, failures
+
+
+async def run(url: str, clients: int, requests: int, pool_size: int, cards: int):
+    deck_id, headers = create_fixtures(url, cards)
+    for name, build in (("sync", sync_app), ("async", async_app)):
+        app, engine = build(url, pool_size)
+        elapsed, samples, failures = await load(app, deck_id, headers, clients, requests)
+        print(f"{name} stack: {len(samples) / elapsed:.0f} req/s, {failures} failed")
+        summarize(f"  {name} latency", samples)
+        # The aiosqlite connection threads keep the process alive until the pool is closed
+        result = engine.dispose()
+        if asyncio.iscoroutine(result):
+            await result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=2, help="requests per client")
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--cards", type=int, default=50)
+    args = parser.parse_args()
+    # Per-request INFO logs would dominate the measurement
+    logging.disable(logging.INFO)
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='betterank-bench-'), 'bench.db')}"
+    asyncio.run(run(url, args.clients, args.requests, args.pool_size, args.cards))
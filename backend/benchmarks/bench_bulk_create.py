@@ -0,0 +1,62 @@
+"""Saving N generated flashcards: one POST /flashcards per card vs. POST /flashcards/bulk.
+
+The per-card path is what the deck page did before: every card authenticates,
+checks the deck, commits and refreshes on its own.
+
+Usage (from backend/):
+    python benchmarks/bench_bulk_create.py --cards 500
+"""
+import argparse
+
+from fastapi.testclient import TestClient
+
+from common import make_session_factory, setup_app, create_user, timed
+from src.models import DBDeck
+
+
+def create_deck(session_factory, user_id: int) -> int:
+    db = session_factory()
+    try:
+        deck = DBDeck(name="Bench deck", user_id=user_id)
+        db.add(deck)
+        db.commit()
+        return deck.id
+    finally:
+        db.close()
+
+
+def per_card(client: TestClient, headers: dict, deck_id: int, cards: list[dict]):
+    for card in cards:
+        response = client.post("/flashcards", headers=headers, json={**card, "deck_id": deck_id})
+        response.raise_for_status()
+
+
+def bulk(client: TestClient, headers: dict, deck_id: int, cards: list[dict]):
+    response = client.post("/flashcards/bulk", headers=headers, json={"deck_id": deck_id, "flashcards": cards})
+    response.raise_for_status()
+
+
+def run(num_cards: int):
+    session_factory = make_session_factory()
+    app = setup_app(session_factory)
+    user, headers = create_user(session_factory)
+    cards = [{"front": f"Question {i}", "back": f"Answer {i}"} for i in range(num_cards)]
+
+    client = TestClient(app)
+    # Warm up the app before measuring
+    client.get("/me", headers=headers)
+
+    per_card_time, _ = timed(per_card, client, headers, create_deck(session_factory, user.id), cards)
+    bulk_time, _ = timed(bulk, client, headers, create_deck(session_factory, user.id), cards)
+
+    print(f"{num_cards} cards")
+    print(f"  per card: {per_card_time * 1000:.1f}ms ({per_card_time / num_cards * 1000:.2f}ms per card)")
+    print(f"  bulk:     {bulk_time * 1000:.1f}ms ({bulk_time / num_cards * 1000:.2f}ms per card)")
+    print(f"  speedup:  {per_card_time / bulk_time:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=500)
+    args = parser.parse_args()
+    run(args.cards)
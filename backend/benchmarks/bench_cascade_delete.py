@@ -0,0 +1,99 @@
+"""Deleting a large deck: ORM cascade vs. ON DELETE CASCADE.
+
+The ORM path is what DELETE /decks/{id} did before: SQLAlchemy loads every
+flashcard and review of the deck and deletes them row by row. The cascade path
+calls the endpoint, which issues one DELETE and lets the database remove the rest.
+
+Usage (from backend/):
+    python benchmarks/bench_cascade_delete.py --cards 20000 --reviews 3
+"""
+import argparse
+import tracemalloc
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select
+from sqlalchemy.orm import selectinload
+
+from common import make_session_factory, setup_app, create_user, timed
+from src.models import DBDeck, DBFlashcard, DBReview, ReviewFeedback
+
+
+def create_deck(session_factory, user_id: int, cards: int, reviews: int) -> int:
+    """Create a deck with the given number of cards and reviews per card."""
+    db = session_factory()
+    try:
+        deck = DBDeck(name="Bench deck", user_id=user_id)
+        db.add(deck)
+        db.flush()
+        now = datetime.now()
+        card_ids = db.scalars(
+            insert(DBFlashcard).returning(DBFlashcard.id),
+            [{"front": f"Q{i}", "back": f"A{i}", "deck_id": deck.id, "user_id": user_id, "next_review_at": now} for i in range(cards)],
+        ).all()
+        if reviews:
+            db.execute(insert(DBReview), [
+                {"flashcard_id": card_id, "user_id": user_id, "feedback": ReviewFeedback.GOOD, "review_at": now}
+                for card_id in card_ids for _ in range(reviews)
+            ])
+        db.commit()
+        return deck.id
+    finally:
+        db.close()
+
+
+def orm_cascade(session_factory, deck_id: int):
+    db = session_factory()
+    try:
+        deck = db.scalars(
+            select(DBDeck).where(DBDeck.id == deck_id)
+            .options(selectinload(DBDeck.flashcards).selectinload(DBFlashcard.reviews))
+        ).one()
+        for card in deck.flashcards:
+            for review in card.reviews:
+                db.delete(review)
+            db.delete(card)
+        db.delete(deck)
+        db.commit()
+    finally:
+        db.close()
+
+
+def database_cascade(client: TestClient, headers: dict, deck_id: int):
+    response = client.delete(f"/decks/{deck_id}", headers=headers)
+    response.raise_for_status()
+
+
+def measure(fn, *args) -> tuple[float, float]:
+    """Elapsed seconds and peak traced memory in MB."""
+    tracemalloc.start()
+    try:
+        elapsed, _ = timed(fn, *args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def run(cards: int, reviews: int):
+    session_factory = make_session_factory()
+    app = setup_app(session_factory)
+    user, headers = create_user(session_factory)
+    client = TestClient(app)
+    client.get("/me", headers=headers)
+
+    orm_time, orm_memory = measure(orm_cascade, session_factory, create_deck(session_factory, user.id, cards, reviews))
+    db_time, db_memory = measure(database_cascade, client, headers, create_deck(session_factory, user.id, cards, reviews))
+
+    print(f"deck with {cards} cards and {cards * reviews} reviews")
+    print(f"  ORM cascade:      {orm_time * 1000:.0f}ms, peak memory {orm_memory:.1f}MB")
+    print(f"  ON DELETE CASCADE: {db_time * 1000:.0f}ms, peak memory {db_memory:.1f}MB")
+    print(f"  speedup:          {orm_time / db_time:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=20000)
+    parser.add_argument("--reviews", type=int, default=3, help="reviews per card")
+    args = parser.parse_args()
+    run(args.cards, args.reviews)
@@ -0,0 +1,61 @@
+"""Generation latency for growing text lengths with and without chunking.
+
+The fake model's latency grows linearly with the prompt length
+(`--base-latency` + `--per-kchar` per 1000 characters), roughly like a real
+model whose output grows with its input.
+
+Usage (from backend/):
+    python benchmarks/bench_chunked_generation.py --lengths 5000 20000 80000
+"""
+import argparse
+import asyncio
+import time
+
+import common  # noqa: F401 - sets up sys.path and the environment
+from src.llm_service import LLMService, FlashcardBatch, GeneratedFlashcard
+
+
+class LengthProportionalModel:
+    """Fake model whose latency depends on the prompt length."""
+
+    def __init__(self, base_latency: float, per_kchar: float):
+        self.base_latency = base_latency
+        self.per_kchar = per_kchar
+
+    async def ainvoke(self, messages):
+        prompt = messages[0].content
+        await asyncio.sleep(self.base_latency + self.per_kchar * len(prompt) / 1000)
+        return FlashcardBatch(flashcards=[
+            GeneratedFlashcard(front=f"card {time.perf_counter_ns()} {i}", back="back") for i in range(5)
+        ])
+
+
+async def measure(text: str, chunked: bool, args) -> float:
+    service = LLMService()
+    service.model = LengthProportionalModel(args.base_latency, args.per_kchar)
+    service.max_concurrency = args.fanout
+    service.chunk_fanout = args.fanout
+    service.chunk_chars = args.chunk_chars if chunked else len(text) + 1
+    start = time.perf_counter()
+    await service.agenerate_flashcards(text=text, count=args.count)
+    return time.perf_counter() - start
+
+
+async def run(args):
+    sentence = "これは日本語の授業の文です。"
+    for length in args.lengths:
+        text = (sentence * (length // len(sentence) + 1))[:length]
+        single = await measure(text, False, args)
+        chunked = await measure(text, True, args)
+        print(f"{length:>7} chars: single call {single:.2f}s, chunked {chunked:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[5000, 20000, 80000])
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--chunk-chars", type=int, default=6000)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--base-latency", type=float, default=0.2)
+    parser.add_argument("--per-kchar", type=float, default=0.05)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,77 @@
+"""Latency of a cheap endpoint while LLM generations are in flight.
+
+The Gemini model is replaced by a fake that waits `--model-latency` seconds.
+With `--blocking` the fake sleeps on the event loop thread, which is what the
+old synchronous `generate_flashcards` call did inside the async endpoints.
+
+Usage (from backend/):
+    python benchmarks/bench_llm_concurrency.py --generations 8 --model-latency 2
+    python benchmarks/bench_llm_concurrency.py --generations 8 --model-latency 2 --blocking
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from common import make_session_factory, setup_app, create_user, summarize
+from routers import llm as llm_router
+from src.llm_service import FlashcardBatch, GeneratedFlashcard
+
+
+class SlowModel:
+    """Fake model that takes `latency` seconds per call."""
+
+    def __init__(self, latency: float, blocking: bool):
+        self.latency = latency
+        self.blocking = blocking
+
+    async def ainvoke(self, messages):
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        return FlashcardBatch(flashcards=[GeneratedFlashcard(front="front", back="back")])
+
+
+async def run(generations: int, model_latency: float, probes: int, blocking: bool):
+    session_factory = make_session_factory()
+    app = setup_app(session_factory)
+    _, headers = create_user(session_factory)
+    llm_router.llm_service.model = SlowModel(model_latency, blocking)
+    llm_router.llm_service.max_concurrency = generations
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Warm up the app before measuring
+        await client.get("/me", headers=headers)
+
+        async def generate():
+            await client.post("/llm/generate-from-text", headers=headers, json={"text": "lesson", "num_cards": 1})
+
+        async def probe():
+            samples = []
+            for _ in range(probes):
+                start = time.perf_counter()
+                await client.get("/me", headers=headers)
+                samples.append(time.perf_counter() - start)
+                await asyncio.sleep(model_latency / probes)
+            return samples
+
+        start = time.perf_counter()
+        results = await asyncio.gather(probe(), *[generate() for _ in range(generations)])
+        elapsed = time.perf_counter() - start
+
+    mode = "blocking" if blocking else "async"
+    print(f"{generations} generations ({mode}, {model_latency}s model latency) finished in {elapsed:.2f}s")
+    summarize("GET /me during generation", results[0])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--generations", type=int, default=8)
+    parser.add_argument("--model-latency", type=float, default=1.0)
+    parser.add_argument("--probes", type=int, default=20)
+    parser.add_argument("--blocking", action="store_true", help="simulate the old blocking model call")
+    args = parser.parse_args()
+    asyncio.run(run(args.generations, args.model_latency, args.probes, args.blocking))
@@ -0,0 +1,87 @@
+"""Latency of the review endpoints while a burst of logins is hashing passwords.
+
+With `--inline` bcrypt runs in the threadpool that all sync endpoints share,
+which is what the sync login endpoint did before. Otherwise it runs in the
+password hashing process pool.
+
+Usage (from backend/):
+    python benchmarks/bench_login_storm.py --logins 200 --workers 2
+    python benchmarks/bench_login_storm.py --logins 200 --inline
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from common import make_session_factory, setup_app, create_user, summarize
+from src.models import DBDeck, DBFlashcard, DBUser
+from src.utils import get_password_hasher, hash_password
+
+
+def create_fixtures(session_factory, user_id: int, cards: int) -> int:
+    """Create a login user with a real bcrypt hash and a deck of due cards for the probe user."""
+    db = session_factory()
+    try:
+        db.add(DBUser(username="stormuser", email="storm@example.com", hashed_password=hash_password("stormpassword")))
+        deck = DBDeck(name="Bench deck", user_id=user_id)
+        db.add(deck)
+        db.flush()
+        db.add_all([DBFlashcard(front=f"Q{i}", back=f"A{i}", deck_id=deck.id, user_id=user_id) for i in range(cards)])
+        db.commit()
+        return deck.id
+    finally:
+        db.close()
+
+
+async def run(logins: int, workers: int, inline: bool, probes: int):
+    session_factory = make_session_factory()
+    app = setup_app(session_factory)
+    user, headers = create_user(session_factory)
+    deck_id = create_fixtures(session_factory, user.id, cards=50)
+    hasher = get_password_hasher()
+    hasher.workers = 0 if inline else workers
+
+    # Report failed requests as 500 instead of raising, the old path can exhaust the connection pool
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Warm up the app and the worker processes before measuring
+        await client.get(f"/decks/{deck_id}/flashcards?due=true", headers=headers)
+        await client.post("/login", data={"username": "stormuser", "password": "stormpassword"})
+
+        async def login():
+            response = await client.post("/login", data={"username": "stormuser", "password": "stormpassword"})
+            return response.status_code == 200
+
+        async def probe():
+            samples = []
+            failures = 0
+            for _ in range(probes):
+                start = time.perf_counter()
+                response = await client.get(f"/decks/{deck_id}/flashcards?due=true", headers=headers)
+                samples.append(time.perf_counter() - start)
+                failures += response.status_code != 200
+                await asyncio.sleep(0.01)
+            return samples, failures
+
+        baseline, _ = await probe()
+        start = time.perf_counter()
+        (samples, failures), *succeeded = await asyncio.gather(probe(), *[login() for _ in range(logins)])
+        elapsed = time.perf_counter() - start
+
+    hasher.shutdown()
+    mode = "threadpool" if inline else f"{workers} hashing processes"
+    print(f"{sum(succeeded)}/{logins} logins ({mode}) succeeded in {elapsed:.2f}s, max queue depth {hasher.stats()['max_pending']}")
+    summarize("due cards, idle", baseline)
+    summarize("due cards, during login storm", samples)
+    print(f"failed probes during login storm: {failures}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--probes", type=int, default=50)
+    parser.add_argument("--inline", action="store_true", help="hash in the shared threadpool like the old sync endpoint")
+    args = parser.parse_args()
+    asyncio.run(run(args.logins, args.workers, args.inline, args.probes))
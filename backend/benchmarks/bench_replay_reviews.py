@@ -0,0 +1,90 @@
+"""Throughput and peak memory of rebuilding schedules from the review history.
+
+Fills a file-backed SQLite database with --reviews reviews spread over --cards
+cards of one user, then runs src/replay_reviews.py with growing chunk sizes.
+Peak memory should follow the chunk size, not the length of the history.
+
+Usage (from backend/):
+    python benchmarks/bench_replay_reviews.py --reviews 1000000 --cards 20000
+"""
+import argparse
+import random
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from common import make_session_factory, create_user
+from src.models import DBFlashcard, DBReview, ReviewFeedback
+from src.replay_reviews import replay
+
+
+def fill(session_factory, user_id: int, reviews: int, cards: int):
+    """Insert the cards and their reviews in batches."""
+    rng = random.Random(0)
+    feedback = list(ReviewFeedback)
+    start = datetime(2020, 1, 1)
+    db = session_factory()
+    try:
+        card_ids = db.scalars(
+            insert(DBFlashcard).returning(DBFlashcard.id),
+            [{"front": f"Q{i}", "back": f"A{i}", "user_id": user_id} for i in range(cards)],
+        ).all()
+        batch = []
+        streaks = [0] * cards
+        for i in range(reviews):
+            card = i % cards
+            # A real card is not due again before its interval has passed, so its intervals stay within
+            # the datetime range. Reviews here are a minute apart, break success streaks explicitly.
+            item = ReviewFeedback.BAD if streaks[card] == 8 else rng.choice(feedback)
+            streaks[card] = 0 if item == ReviewFeedback.BAD else streaks[card] + 1
+            batch.append({
+                "flashcard_id": card_ids[card], "user_id": user_id, "feedback": item,
+                "review_at": start + timedelta(minutes=i),
+            })
+            if len(batch) == 50000:
+                db.execute(insert(DBReview), batch)
+                batch = []
+        if batch:
+            db.execute(insert(DBReview), batch)
+        db.commit()
+    finally:
+        db.close()
+
+
+def replay_once(session_factory, chunk_size: int):
+    db = session_factory()
+    try:
+        return replay(db, chunk_size=chunk_size)
+    finally:
+        db.close()
+
+
+def run(reviews: int, cards: int, chunk_sizes: list[int]):
+    session_factory = make_session_factory()
+    user, _ = create_user(session_factory)
+    fill(session_factory, user.id, reviews, cards)
+
+    print(f"{reviews} reviews of {cards} cards")
+    for chunk_size in chunk_sizes:
+        # tracemalloc slows down every allocation, so time and memory come from separate runs
+        stats = replay_once(session_factory, chunk_size)
+        tracemalloc.start()
+        try:
+            replay_once(session_factory, chunk_size)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        print(
+            f"  chunk size {chunk_size:>6}: {stats.seconds:.1f}s, {stats.reviews_per_second:,.0f} reviews/s, "
+            f"peak memory {peak / 1024 / 1024:.1f}MB"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=1000000)
+    parser.add_argument("--cards", type=int, default=20000)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+    run(args.reviews, args.cards, args.chunk_sizes)
@@ -0,0 +1,53 @@
+"""Scheduling N reviews with the scalar SM2Algo.update_flashcard vs. the vectorized update_batch.
+
+The scalar path updates one card object per call, update_batch computes the new
+schedule of all cards in one pass over NumPy arrays.
+
+Usage (from backend/):
+    python benchmarks/bench_sm2_batch.py --cards 100000
+"""
+import argparse
+import random
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+from common import timed
+from src.models import ReviewFeedback
+from src.spaced_repetition import SM2Algo
+
+
+def scalar(cards: list, feedback: list, now: datetime):
+    for card, item in zip(cards, feedback):
+        SM2Algo.update_flashcard(item, card, now=now)
+
+
+def batch(quality: np.ndarray, ef: np.ndarray, interval: np.ndarray, repetitions: np.ndarray, now: datetime):
+    return SM2Algo.update_batch(quality, ef, interval, repetitions, now)
+
+
+def run(cards: int):
+    rng = random.Random(0)
+    feedback = [rng.choice(list(ReviewFeedback)) for _ in range(cards)]
+    states = [(round(rng.uniform(1.3, 3.0), 2), rng.randint(1, 200), rng.randint(0, 10)) for _ in range(cards)]
+    objects = [SimpleNamespace(id=i, easiness_factor=ef, interval=days, repetitions=reps, review_count=reps,
+                               stability=None, difficulty=None, next_review_at=None, last_reviewed_at=None)
+               for i, (ef, days, reps) in enumerate(states)]
+    ef, interval, repetitions = (np.array(column) for column in zip(*states))
+    now = datetime.now()
+
+    scalar_time, _ = timed(scalar, objects, feedback, now)
+    batch_time, _ = timed(batch, SM2Algo.quality_array(feedback), ef, interval, repetitions, now)
+
+    print(f"{cards} reviews")
+    print(f"  update_flashcard: {scalar_time * 1000:.1f}ms ({cards / scalar_time:,.0f} cards/s)")
+    print(f"  update_batch:     {batch_time * 1000:.1f}ms ({cards / batch_time:,.0f} cards/s)")
+    print(f"  speedup:          {scalar_time / batch_time:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=100000)
+    args = parser.parse_args()
+    run(args.cards)
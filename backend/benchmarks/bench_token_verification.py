@@ -0,0 +1,38 @@
+"""Cost of verifying the same access token over and over, with and without the verification cache.
+
+A review session sends the same bearer token with every request, so all
+but the first verification can be served from the cache.
+
+Usage (from backend/):
+    python benchmarks/bench_token_verification.py --iterations 20000
+"""
+import argparse
+
+from common import timed
+from src import auth
+
+
+def verify_many(verify, tokens: list[str], iterations: int):
+    for i in range(iterations):
+        verify(tokens[i % len(tokens)])
+
+
+def run(iterations: int, users: int):
+    tokens = [auth.create_access_token(data={"sub": f"user{i}", "uid": i}) for i in range(users)]
+
+    uncached, _ = timed(verify_many, auth.decode_access_token, tokens, iterations)
+    auth.clear_token_cache()
+    cached, _ = timed(verify_many, auth.verify_access_token, tokens, iterations)
+
+    print(f"{iterations} verifications of {users} distinct tokens")
+    print(f"  uncached: {uncached / iterations * 1e6:.1f}us per verification")
+    print(f"  cached:   {cached / iterations * 1e6:.1f}us per verification")
+    print(f"  speedup:  {uncached / cached:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+    run(args.iterations, args.users)
@@ -0,0 +1,90 @@
+"""Shared setup for the benchmark scripts.
+
+Builds the FastAPI app against a throwaway SQLite database so benchmarks can
+run without PostgreSQL or a Gemini API key.
+"""
+import os
+import sys
+import tempfile
+import time
+import statistics
+
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+
+# Allow 'from src import X' style imports when run as `python benchmarks/<script>.py`
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.database import Base, get_db
+from src.models import DBUser
+from src.auth import create_access_token
+from src.main import app
+
+
+def make_session_factory():
+    """Create a file-backed SQLite database with all tables and return a session factory."""
+    db_dir = tempfile.mkdtemp(prefix="betterank-bench-")
+    engine = create_engine(
+        f"sqlite:///{os.path.join(db_dir, 'bench.db')}",
+        connect_args={"check_same_thread": False},
+    )
+
+    # Enforce foreign keys like PostgreSQL does, deletes rely on ON DELETE CASCADE
+    @event.listens_for(engine, "connect")
+    def enable_foreign_keys(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def setup_app(session_factory):
+    """Point the app's database dependency at the benchmark database."""
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return app
+
+
+def create_user(session_factory, username: str = "benchuser") -> tuple[DBUser, dict]:
+    """Create a user directly in the database and return it with auth headers."""
+    db = session_factory()
+    try:
+        user = DBUser(username=username, email=f"{username}@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+    finally:
+        db.close()
+    token = create_access_token(data={"sub": user.username, "uid": user.id})
+    return user, {"Authorization": f"Bearer {token}"}
+
+
+def timed(fn, *args, **kwargs) -> tuple[float, object]:
+    """Run fn and return (elapsed seconds, result)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def summarize(label: str, samples: list[float]):
+    """Print p50/p99/max of a list of latencies given in seconds."""
+    if not samples:
+        print(f"{label}: no samples")
+        return
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{label}: n={len(ordered)} p50={statistics.median(ordered) * 1000:.1f}ms "
+        f"p99={p99 * 1000:.1f}ms max={ordered[-1] * 1000:.1f}ms"
+    )
@@ -1,13 +1,16 @@
 import logging
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from src.models import UserCreate, DBUser, UserResponse, Message
+from src.models import UserCreate, DBUser, UserResponse, Message, UpdateScheduler
+from src import account_queries
 from src.database import get_db
-from src.utils import hash_password, verify_password
+from src.utils import get_password_hasher
 from src.auth import create_access_token
-from src.dependencies import get_current_user
+from src.dependencies import get_current_user, get_user_cache
 
 logger = logging.getLogger(__name__)
 
@@ -16,41 +19,53 @@ router = APIRouter(
 )
 
 @router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
     """Register a new user."""
     logger.info(f"Registration attempt for username: {user.username}, email: {user.email}")
 
-    if db.query(DBUser).filter(DBUser.username == user.username).first():
-        logger.warning(f"Registration failed: Username '{user.username}' already exists")
-        raise HTTPException(status_code=400, detail="Username already exists")
-    if db.query(DBUser).filter(DBUser.email == user.email).first():
-        logger.warning(f"Registration failed: Email '{user.email}' already exists")
-        raise HTTPException(status_code=400, detail="Email already exists")
+    def check_available():
+        account_queries.require_available(db.execute(account_queries.taken_statement(user)).all(), user)
+        # End the read-only transaction, the connection goes back to the pool while the password is hashed
+        db.commit()
 
-    hashed_password = hash_password(user.password)
-    db_user = DBUser(
-        username=user.username,
-        email=user.email,
-        hashed_password=hashed_password,
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    def create_user(hashed_password: str) -> DBUser:
+        db_user = account_queries.new_user(user, hashed_password)
+        db.add(db_user)
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent registration took the username or email while the password was hashed
+            db.rollback()
+            check_available()
+            raise account_queries.taken_concurrently(user)
+        db.refresh(db_user)
+        return db_user
+
+    # Database work runs in the threadpool, bcrypt in the password hashing pool
+    await run_in_threadpool(check_available)
+    hashed_password = await get_password_hasher().hash(user.password)
+    db_user = await run_in_threadpool(create_user, hashed_password)
 
     logger.info(f"User registered successfully: {user.username} (ID: {db_user.id})")
     return db_user
 
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Authenticate a user and return a JWT token."""
     logger.info(f"Login attempt for username: {form_data.username}")
 
-    db_user = db.query(DBUser).filter(DBUser.username == form_data.username).first()
-    if not db_user or not verify_password(form_data.password, db_user.hashed_password):
+    def load_user():
+        db_user = db.execute(account_queries.login_statement(form_data.username)).first()
+        # End the read-only transaction, the connection goes back to the pool while the password is verified
+        db.commit()
+        return db_user
+
+    db_user = await run_in_threadpool(load_user)
+    if not db_user or not await get_password_hasher().verify(form_data.password, db_user.hashed_password):
         logger.warning(f"Login failed for username: {form_data.username} - Invalid credentials")
         raise HTTPException(status_code=401, detail="Invalid username or password")
 
-    access_token = create_access_token(data={"sub": db_user.username})
+    access_token = create_access_token(data={"sub": db_user.username, "uid": db_user.id})
     logger.info(f"User logged in successfully: {form_data.username} (ID: {db_user.id})")
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -60,14 +75,29 @@ def get_me(current_user: DBUser = Depends(get_current_user)):
     logger.info(f"User profile accessed: {current_user.username} (ID: {current_user.id})")
     return current_user
 
+@router.put("/me/scheduler", response_model=UserResponse)
+def update_scheduler(
+    body: UpdateScheduler,
+    current_user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Choose the spaced repetition scheduler of the current user, null for the server default. Decks with their own scheduler keep it."""
+    logger.info(f"Scheduler of user {current_user.username} (ID: {current_user.id}) set to {body.scheduler}")
+    db.execute(account_queries.update_scheduler_statement(current_user.id, body.scheduler))
+    db.commit()
+    get_user_cache().invalidate(current_user.id)
+    return account_queries.scheduler_response(current_user, body.scheduler)
+
 @router.delete("/me", response_model=Message)
 def delete_me(
     current_user: DBUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete the current user's account."""
-    logger.info(f"Account deletion requested for user: {current_user.username} (ID: {current_user.id})")
-    db.delete(current_user)
+    user_id, username = current_user.id, current_user.username
+    logger.info(f"Account deletion requested for user: {username} (ID: {user_id})")
+    db.execute(account_queries.delete_user_statement(user_id))
     db.commit()
-    logger.info(f"User account deleted successfully: {current_user.username} (ID: {current_user.id})")
+    get_user_cache().invalidate(user_id)
+    logger.info(f"User account deleted successfully: {username} (ID: {user_id})")
     return {"message": "User account deleted successfully"}
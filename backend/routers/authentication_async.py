@@ -0,0 +1,98 @@
+"""
+Async version of the authentication router, served from the async engine when USE_ASYNC_DB is enabled.
+Endpoints and responses are the same as in routers/authentication.py, both build their statements in src/account_queries.py.
+"""
+import logging
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import UserCreate, DBUser, UserResponse, Message, UpdateScheduler
+from src import account_queries
+from src.database import get_async_db
+from src.utils import get_password_hasher
+from src.auth import create_access_token
+from src.dependencies import get_current_user_async, get_user_cache
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    tags=["authentication"],
+)
+
+@router.post("/register", response_model=UserResponse)
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    """Register a new user."""
+    logger.info(f"Registration attempt for username: {user.username}, email: {user.email}")
+
+    async def check_available():
+        account_queries.require_available((await db.execute(account_queries.taken_statement(user))).all(), user)
+        # End the read-only transaction, the connection goes back to the pool while the password is hashed
+        await db.commit()
+
+    await check_available()
+
+    hashed_password = await get_password_hasher().hash(user.password)
+    db_user = account_queries.new_user(user, hashed_password)
+    db.add(db_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent registration took the username or email while the password was hashed
+        await db.rollback()
+        await check_available()
+        raise account_queries.taken_concurrently(user)
+    await db.refresh(db_user)
+
+    logger.info(f"User registered successfully: {user.username} (ID: {db_user.id})")
+    return db_user
+
+@router.post("/login")
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    """Authenticate a user and return a JWT token."""
+    logger.info(f"Login attempt for username: {form_data.username}")
+
+    db_user = (await db.execute(account_queries.login_statement(form_data.username))).first()
+    # End the read-only transaction, the connection goes back to the pool while the password is verified
+    await db.commit()
+    if not db_user or not await get_password_hasher().verify(form_data.password, db_user.hashed_password):
+        logger.warning(f"Login failed for username: {form_data.username} - Invalid credentials")
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+
+    access_token = create_access_token(data={"sub": db_user.username, "uid": db_user.id})
+    logger.info(f"User logged in successfully: {form_data.username} (ID: {db_user.id})")
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@router.get("/me", response_model=UserResponse)
+async def get_me(current_user: DBUser = Depends(get_current_user_async)):
+    """Get the current logged-in user."""
+    logger.info(f"User profile accessed: {current_user.username} (ID: {current_user.id})")
+    return current_user
+
+@router.put("/me/scheduler", response_model=UserResponse)
+async def update_scheduler(
+    body: UpdateScheduler,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Choose the spaced repetition scheduler of the current user, null for the server default. Decks with their own scheduler keep it."""
+    logger.info(f"Scheduler of user {current_user.username} (ID: {current_user.id}) set to {body.scheduler}")
+    await db.execute(account_queries.update_scheduler_statement(current_user.id, body.scheduler))
+    await db.commit()
+    get_user_cache().invalidate(current_user.id)
+    return account_queries.scheduler_response(current_user, body.scheduler)
+
+@router.delete("/me", response_model=Message)
+async def delete_me(
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete the current user's account."""
+    user_id, username = current_user.id, current_user.username
+    logger.info(f"Account deletion requested for user: {username} (ID: {user_id})")
+    await db.execute(account_queries.delete_user_statement(user_id))
+    await db.commit()
+    get_user_cache().invalidate(user_id)
+    logger.info(f"User account deleted successfully: {username} (ID: {user_id})")
+    return {"message": "User account deleted successfully"}
@@ -1,12 +1,16 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
 
-from src.models import Deck, DBDeck, UpdateDeck, Flashcard, DBFlashcard, DBUser, Message
+from src.models import Deck, DBDeck, UpdateDeck, Flashcard, DBUser, Message, ReviewQueuePage, DeckStats, FlashcardOrder
+from src.models import BulkMoveFlashcards, BulkRemoveFlashcards, BulkUpdateResult
+from src import review_queue, deck_queries, flashcard_queries
+from src.deck_stats import deck_stats_statement, to_deck_stats
+from src.pagination import set_next_cursor
 from src.database import get_db
-from src.dependencies import get_current_user
+from src.dependencies import get_current_user, get_read_db
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +19,12 @@ router = APIRouter(
     tags=["decks"],
 )
 
+def get_user_deck(db: Session, deck_id: int, current_user: DBUser, *columns):
+    """Load a deck of the current user, or only the given columns of it, or raise 404."""
+    statement = deck_queries.user_deck_statement(deck_id, current_user.id, *columns)
+    row = db.execute(statement).first() if columns else db.execute(statement).scalars().first()
+    return deck_queries.require_deck(row, deck_id, current_user)
+
 @router.post("", response_model=Deck)
 def create_deck(
     deck: Deck,
@@ -26,13 +36,7 @@ def create_deck(
     """
     logger.info(f"Creating deck '{deck.name}' for user {current_user.username} (ID: {current_user.id})")
 
-    db_deck = DBDeck(
-        name=deck.name,
-        description=deck.description,
-        created_at=datetime.now(),
-        user_id=current_user.id
-    )
-
+    db_deck = deck_queries.new_deck(deck, current_user.id)
     db.add(db_deck)
     db.commit()
     db.refresh(db_deck)
@@ -40,38 +44,51 @@ def create_deck(
     logger.info(f"Deck created successfully: '{deck.name}' (ID: {db_deck.id})")
     return db_deck
 
+# Declared before /{deck_id}, which would otherwise match "stats"
+@router.get("/stats", response_model=List[DeckStats])
+def get_all_deck_stats(
+    current_user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Get the card counts of all decks of the current user, computed in one query."""
+    logger.info(f"Fetching stats of all decks for user {current_user.username} (ID: {current_user.id})")
+
+    rows = db.execute(deck_stats_statement(current_user.id, datetime.now())).all()
+
+    logger.info(f"Retrieved stats of {len(rows)} decks for user {current_user.username}")
+    return [to_deck_stats(row) for row in rows]
+
 @router.get("/{deck_id}", response_model=Deck)
 def get_deck(
     deck_id: int,
     current_user: DBUser = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get a specific deck by ID."""
     logger.info(f"Fetching deck {deck_id} for user {current_user.username} (ID: {current_user.id})")
 
-    db_deck = db.query(DBDeck).filter(
-        DBDeck.id == deck_id,
-        DBDeck.user_id == current_user.id
-    ).first()
-    if db_deck is None:
-        logger.warning(f"Deck {deck_id} not found for user {current_user.username}")
-        raise HTTPException(status_code=404, detail="Deck not found")
+    db_deck = get_user_deck(db, deck_id, current_user)
 
     logger.debug(f"Deck retrieved: '{db_deck.name}' (ID: {db_deck.id})")
     return db_deck
 
 @router.get("", response_model=List[Deck])
 def get_decks(
-    limit: int = 100,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
     current_user: DBUser = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
-    Get all decks for the current user with pagination.
+    Get all decks for the current user, oldest first, with cursor pagination.
+    If there are more decks, the X-Next-Cursor header holds the cursor of the next page.
     """
     logger.info(f"Fetching decks for user {current_user.username} (ID: {current_user.id}), limit: {limit}")
 
-    decks = db.query(DBDeck).filter(DBDeck.user_id == current_user.id).limit(limit).all()
+    query = deck_queries.deck_list_statement(current_user, cursor, limit)
+    decks = db.execute(query).scalars().all()
+    set_next_cursor(response, decks, limit, DBDeck.created_at)
 
     logger.info(f"Retrieved {len(decks)} decks for user {current_user.username}")
     return decks
@@ -79,35 +96,74 @@ def get_decks(
 @router.get("/{deck_id}/flashcards", response_model=List[Flashcard])
 def get_deck_flashcards(
     deck_id: int,
+    response: Response,
     due: bool = False,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
+    order_by: FlashcardOrder | None = None,
     current_user: DBUser = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Get flashcards in a deck."""
+    """
+    Get flashcards in a deck with cursor pagination, ordered by creation time, or by
+    next review time for due cards. If there are more cards, the X-Next-Cursor header
+    holds the cursor of the next page.
+    """
     logger.info(f"Fetching flashcards for deck {deck_id}, user {current_user.username}, due: {due}, limit: {limit}")
 
-    db_deck = db.query(DBDeck).filter(
-        DBDeck.id == deck_id,
-        DBDeck.user_id == current_user.id
-    ).first()
-    if db_deck is None:
-        logger.warning(f"Deck {deck_id} not found for user {current_user.username}")
-        raise HTTPException(status_code=404, detail="Deck not found")
-
-    query = db.query(DBFlashcard).filter(
-        DBFlashcard.deck_id == deck_id,
-        DBFlashcard.user_id == current_user.id
-    )
+    get_user_deck(db, deck_id, current_user, DBDeck.id)
 
-    if due:
-        now = datetime.now()
-        query = query.filter(DBFlashcard.next_review_at <= now)
+    query, sort_column = deck_queries.deck_flashcards_statement(deck_id, current_user, due, order_by, cursor, limit)
+    flashcards = db.execute(query).scalars().all()
+    set_next_cursor(response, flashcards, limit, sort_column)
 
-    flashcards = query.limit(limit).all()
     logger.info(f"Retrieved {len(flashcards)} flashcards from deck {deck_id}")
     return flashcards
 
+@router.get("/{deck_id}/stats", response_model=DeckStats)
+def get_deck_stats(
+    deck_id: int,
+    current_user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Get the total, due, new, learning and mature card counts of a deck."""
+    logger.info(f"Fetching stats of deck {deck_id} for user {current_user.username}")
+
+    row = db.execute(deck_stats_statement(current_user.id, datetime.now(), deck_id)).first()
+    return to_deck_stats(deck_queries.require_deck(row, deck_id, current_user))
+
+@router.get("/{deck_id}/review-queue", response_model=ReviewQueuePage)
+def get_review_queue(
+    deck_id: int,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None,
+    current_user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get the due cards of a deck, most overdue first, within today's new and review card limits.
+    Pass next_cursor of a page as cursor to get the next page.
+    """
+    logger.info(f"Fetching review queue of deck {deck_id} for user {current_user.username}, limit: {limit}")
+
+    get_user_deck(db, deck_id, current_user, DBDeck.id)
+
+    now = datetime.now()
+    if cursor is None:
+        studied, studied_new = db.execute(review_queue.studied_today_statement(current_user.id, deck_id, now)).one()
+        after = None
+        new_left, reviews_left = review_queue.remaining_today(studied, studied_new)
+    else:
+        after, new_left, reviews_left = deck_queries.read_review_cursor(cursor, current_user, deck_id, now)
+
+    rows = db.execute(
+        review_queue.page_statement(current_user.id, deck_id, now, limit, after, new_left, reviews_left)
+    ).all()
+    page = review_queue.build_page(rows, limit, new_left, reviews_left, current_user.id, deck_id, now)
+
+    logger.info(f"Retrieved {len(page.cards)} due cards from deck {deck_id}")
+    return page
+
 @router.put("/{deck_id}", response_model=Deck)
 def update_deck(
     deck_id: int,
@@ -120,21 +176,8 @@ def update_deck(
     """
     logger.info(f"Updating deck {deck_id} for user {current_user.username} (ID: {current_user.id})")
 
-    db_deck = db.query(DBDeck).filter(
-        DBDeck.id == deck_id,
-        DBDeck.user_id == current_user.id
-    ).first()
-    if db_deck is None:
-        logger.warning(f"Deck {deck_id} not found for user {current_user.username}")
-        raise HTTPException(status_code=404, detail="Deck not found")
-
-    if deck.name:
-        logger.debug(f"Updating deck name from '{db_deck.name}' to '{deck.name}'")
-        db_deck.name = deck.name
-    if deck.description:
-        logger.debug(f"Updating deck description")
-        db_deck.description = deck.description
-
+    db_deck = get_user_deck(db, deck_id, current_user)
+    deck_queries.apply_deck_update(db_deck, deck)
     db.commit()
     db.refresh(db_deck)
 
@@ -147,19 +190,11 @@ def delete_deck(
     current_user: DBUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Delete a specific deck."""
+    """Delete a specific deck, with its flashcards and their reviews."""
     logger.info(f"Deleting deck {deck_id} for user {current_user.username} (ID: {current_user.id})")
 
-    db_deck = db.query(DBDeck).filter(
-        DBDeck.id == deck_id,
-        DBDeck.user_id == current_user.id
-    ).first()
-    if db_deck is None:
-        logger.warning(f"Deck {deck_id} not found for user {current_user.username}")
-        raise HTTPException(status_code=404, detail="Deck not found")
-
-    deck_name = db_deck.name
-    db.delete(db_deck)
+    deck_name = db.execute(deck_queries.delete_deck_statement(deck_id, current_user.id)).scalar_one_or_none()
+    deck_queries.require_deck(deck_name, deck_id, current_user)
     db.commit()
 
     logger.info(f"Deck '{deck_name}' (ID: {deck_id}) deleted successfully")
@@ -177,21 +212,9 @@ def add_flashcard_to_deck(
     """
     logger.info(f"Adding flashcard {flashcard_id} to deck {deck_id} for user {current_user.username}")
 
-    flashcard = db.query(DBFlashcard).filter(
-        DBFlashcard.id == flashcard_id,
-        DBFlashcard.user_id == current_user.id
-    ).first()
-    if flashcard is None:
-        logger.warning(f"Flashcard {flashcard_id} not found for user {current_user.username}")
-        raise HTTPException(status_code=404, detail="Flashcard not found")
-
-    deck = db.query(DBDeck).filter(
-        DBDeck.id == deck_id,
-        DBDeck.user_id == current_user.id
-    ).first()
-    if deck is None:
-        logger.warning(f"Deck {deck_id} not found for user {current_user.username}")
-        raise HTTPException(status_code=404, detail="Deck not found")
+    flashcard = db.execute(flashcard_queries.user_flashcard_statement(flashcard_id, current_user.id)).scalars().first()
+    flashcard_queries.require_flashcard(flashcard, flashcard_id, current_user)
+    deck = get_user_deck(db, deck_id, current_user)
 
     flashcard.deck_id = deck_id
     db.commit()
@@ -199,3 +222,46 @@ def add_flashcard_to_deck(
 
     logger.info(f"Flashcard {flashcard_id} successfully added to deck {deck_id}")
     return deck
+
+@router.post("/{deck_id}/flashcards:move", response_model=BulkUpdateResult)
+def move_flashcards_to_deck(
+    deck_id: int,
+    request: BulkMoveFlashcards,
+    current_user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Move flashcards into a deck with one UPDATE, either the given flashcard_ids or all cards
+    of from_deck_id. Cards of other users and cards already in the deck are not counted.
+    """
+    logger.info(f"Moving flashcards into deck {deck_id} for user {current_user.username} (ID: {current_user.id})")
+
+    statement = deck_queries.move_flashcards_statement(deck_id, current_user, request)
+    get_user_deck(db, deck_id, current_user, DBDeck.id)
+
+    updated = db.execute(statement).rowcount
+    db.commit()
+
+    logger.info(f"Moved {updated} flashcards into deck {deck_id}")
+    return {"updated": updated}
+
+@router.post("/{deck_id}/flashcards:remove", response_model=BulkUpdateResult)
+def remove_flashcards_from_deck(
+    deck_id: int,
+    request: BulkRemoveFlashcards,
+    current_user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Remove flashcards from a deck with one UPDATE, the given flashcard_ids or all cards of the deck.
+    The flashcards are kept, without a deck.
+    """
+    logger.info(f"Removing flashcards from deck {deck_id} for user {current_user.username} (ID: {current_user.id})")
+
+    get_user_deck(db, deck_id, current_user, DBDeck.id)
+
+    updated = db.execute(deck_queries.remove_flashcards_statement(deck_id, current_user.id, request)).rowcount
+    db.commit()
+
+    logger.info(f"Removed {updated} flashcards from deck {deck_id}")
+    return {"updated": updated}
@@ -0,0 +1,271 @@
+"""
+Async version of the decks router, served from the async engine when USE_ASYNC_DB is enabled.
+Endpoints and responses are the same as in routers/decks.py, both build their statements in src/deck_queries.py.
+"""
+import logging
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from datetime import datetime
+
+from src.models import Deck, DBDeck, UpdateDeck, Flashcard, DBUser, Message, ReviewQueuePage, DeckStats, FlashcardOrder
+from src.models import BulkMoveFlashcards, BulkRemoveFlashcards, BulkUpdateResult
+from src import review_queue, deck_queries, flashcard_queries
+from src.deck_stats import deck_stats_statement, to_deck_stats
+from src.pagination import set_next_cursor
+from src.database import get_async_db
+from src.dependencies import get_current_user_async
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/decks",
+    tags=["decks"],
+)
+
+async def get_user_deck(db: AsyncSession, deck_id: int, current_user: DBUser, *columns):
+    """Load a deck of the current user, or only the given columns of it, or raise 404."""
+    statement = deck_queries.user_deck_statement(deck_id, current_user.id, *columns)
+    row = (await db.execute(statement)).first() if columns else (await db.execute(statement)).scalars().first()
+    return deck_queries.require_deck(row, deck_id, current_user)
+
+@router.post("", response_model=Deck)
+async def create_deck(
+    deck: Deck,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create a new deck for the current user.
+    """
+    logger.info(f"Creating deck '{deck.name}' for user {current_user.username} (ID: {current_user.id})")
+
+    db_deck = deck_queries.new_deck(deck, current_user.id)
+    db.add(db_deck)
+    await db.commit()
+    await db.refresh(db_deck)
+
+    logger.info(f"Deck created successfully: '{deck.name}' (ID: {db_deck.id})")
+    return db_deck
+
+# Declared before /{deck_id}, which would otherwise match "stats"
+@router.get("/stats", response_model=List[DeckStats])
+async def get_all_deck_stats(
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the card counts of all decks of the current user, computed in one query."""
+    logger.info(f"Fetching stats of all decks for user {current_user.username} (ID: {current_user.id})")
+
+    rows = (await db.execute(deck_stats_statement(current_user.id, datetime.now()))).all()
+
+    logger.info(f"Retrieved stats of {len(rows)} decks for user {current_user.username}")
+    return [to_deck_stats(row) for row in rows]
+
+@router.get("/{deck_id}", response_model=Deck)
+async def get_deck(
+    deck_id: int,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a specific deck by ID."""
+    logger.info(f"Fetching deck {deck_id} for user {current_user.username} (ID: {current_user.id})")
+
+    db_deck = await get_user_deck(db, deck_id, current_user)
+
+    logger.debug(f"Deck retrieved: '{db_deck.name}' (ID: {db_deck.id})")
+    return db_deck
+
+@router.get("", response_model=List[Deck])
+async def get_decks(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get all decks for the current user, oldest first, with cursor pagination.
+    If there are more decks, the X-Next-Cursor header holds the cursor of the next page.
+    """
+    logger.info(f"Fetching decks for user {current_user.username} (ID: {current_user.id}), limit: {limit}")
+
+    query = deck_queries.deck_list_statement(current_user, cursor, limit)
+    decks = (await db.execute(query)).scalars().all()
+    set_next_cursor(response, decks, limit, DBDeck.created_at)
+
+    logger.info(f"Retrieved {len(decks)} decks for user {current_user.username}")
+    return decks
+
+@router.get("/{deck_id}/flashcards", response_model=List[Flashcard])
+async def get_deck_flashcards(
+    deck_id: int,
+    response: Response,
+    due: bool = False,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
+    order_by: FlashcardOrder | None = None,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get flashcards in a deck with cursor pagination, ordered by creation time, or by
+    next review time for due cards. If there are more cards, the X-Next-Cursor header
+    holds the cursor of the next page.
+    """
+    logger.info(f"Fetching flashcards for deck {deck_id}, user {current_user.username}, due: {due}, limit: {limit}")
+
+    await get_user_deck(db, deck_id, current_user, DBDeck.id)
+
+    query, sort_column = deck_queries.deck_flashcards_statement(deck_id, current_user, due, order_by, cursor, limit)
+    flashcards = (await db.execute(query)).scalars().all()
+    set_next_cursor(response, flashcards, limit, sort_column)
+
+    logger.info(f"Retrieved {len(flashcards)} flashcards from deck {deck_id}")
+    return flashcards
+
+@router.get("/{deck_id}/stats", response_model=DeckStats)
+async def get_deck_stats(
+    deck_id: int,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the total, due, new, learning and mature card counts of a deck."""
+    logger.info(f"Fetching stats of deck {deck_id} for user {current_user.username}")
+
+    row = (await db.execute(deck_stats_statement(current_user.id, datetime.now(), deck_id))).first()
+    return to_deck_stats(deck_queries.require_deck(row, deck_id, current_user))
+
+@router.get("/{deck_id}/review-queue", response_model=ReviewQueuePage)
+async def get_review_queue(
+    deck_id: int,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the due cards of a deck, most overdue first, within today's new and review card limits.
+    Pass next_cursor of a page as cursor to get the next page.
+    """
+    logger.info(f"Fetching review queue of deck {deck_id} for user {current_user.username}, limit: {limit}")
+
+    await get_user_deck(db, deck_id, current_user, DBDeck.id)
+
+    now = datetime.now()
+    if cursor is None:
+        studied, studied_new = (await db.execute(review_queue.studied_today_statement(current_user.id, deck_id, now))).one()
+        after = None
+        new_left, reviews_left = review_queue.remaining_today(studied, studied_new)
+    else:
+        after, new_left, reviews_left = deck_queries.read_review_cursor(cursor, current_user, deck_id, now)
+
+    rows = (await db.execute(
+        review_queue.page_statement(current_user.id, deck_id, now, limit, after, new_left, reviews_left)
+    )).all()
+    page = review_queue.build_page(rows, limit, new_left, reviews_left, current_user.id, deck_id, now)
+
+    logger.info(f"Retrieved {len(page.cards)} due cards from deck {deck_id}")
+    return page
+
+@router.put("/{deck_id}", response_model=Deck)
+async def update_deck(
+    deck_id: int,
+    deck: UpdateDeck,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Update a specific deck.
+    """
+    logger.info(f"Updating deck {deck_id} for user {current_user.username} (ID: {current_user.id})")
+
+    db_deck = await get_user_deck(db, deck_id, current_user)
+    deck_queries.apply_deck_update(db_deck, deck)
+    await db.commit()
+    await db.refresh(db_deck)
+
+    logger.info(f"Deck {deck_id} updated successfully")
+    return db_deck
+
+@router.delete("/{deck_id}", response_model=Message)
+async def delete_deck(
+    deck_id: int,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete a specific deck, with its flashcards and their reviews."""
+    logger.info(f"Deleting deck {deck_id} for user {current_user.username} (ID: {current_user.id})")
+
+    deck_name = (await db.execute(deck_queries.delete_deck_statement(deck_id, current_user.id))).scalar_one_or_none()
+    deck_queries.require_deck(deck_name, deck_id, current_user)
+    await db.commit()
+
+    logger.info(f"Deck '{deck_name}' (ID: {deck_id}) deleted successfully")
+    return {"message": "Deck deleted successfully"}
+
+@router.put("/{deck_id}/flashcard/{flashcard_id}", response_model=Deck)
+async def add_flashcard_to_deck(
+    deck_id: int,
+    flashcard_id: int,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Add a flashcard to a deck (both must belong to current user).
+    """
+    logger.info(f"Adding flashcard {flashcard_id} to deck {deck_id} for user {current_user.username}")
+
+    flashcard = (await db.execute(flashcard_queries.user_flashcard_statement(flashcard_id, current_user.id))).scalars().first()
+    flashcard_queries.require_flashcard(flashcard, flashcard_id, current_user)
+    deck = await get_user_deck(db, deck_id, current_user)
+
+    flashcard.deck_id = deck_id
+    await db.commit()
+    await db.refresh(deck)
+
+    logger.info(f"Flashcard {flashcard_id} successfully added to deck {deck_id}")
+    return deck
+
+@router.post("/{deck_id}/flashcards:move", response_model=BulkUpdateResult)
+async def move_flashcards_to_deck(
+    deck_id: int,
+    request: BulkMoveFlashcards,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Move flashcards into a deck with one UPDATE, either the given flashcard_ids or all cards
+    of from_deck_id. Cards of other users and cards already in the deck are not counted.
+    """
+    logger.info(f"Moving flashcards into deck {deck_id} for user {current_user.username} (ID: {current_user.id})")
+
+    statement = deck_queries.move_flashcards_statement(deck_id, current_user, request)
+    await get_user_deck(db, deck_id, current_user, DBDeck.id)
+
+    updated = (await db.execute(statement)).rowcount
+    await db.commit()
+
+    logger.info(f"Moved {updated} flashcards into deck {deck_id}")
+    return {"updated": updated}
+
+@router.post("/{deck_id}/flashcards:remove", response_model=BulkUpdateResult)
+async def remove_flashcards_from_deck(
+    deck_id: int,
+    request: BulkRemoveFlashcards,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Remove flashcards from a deck with one UPDATE, the given flashcard_ids or all cards of the deck.
+    The flashcards are kept, without a deck.
+    """
+    logger.info(f"Removing flashcards from deck {deck_id} for user {current_user.username} (ID: {current_user.id})")
+
+    await get_user_deck(db, deck_id, current_user, DBDeck.id)
+
+    updated = (await db.execute(deck_queries.remove_flashcards_statement(deck_id, current_user.id, request))).rowcount
+    await db.commit()
+
+    logger.info(f"Removed {updated} flashcards from deck {deck_id}")
+    return {"updated": updated}
@@ -1,13 +1,14 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from typing import List
-from datetime import datetime
 
-from src.spaced_repetition import SM2Algo
-from src.models import Flashcard, DBFlashcard, Message, Review, DBReview, ReviewCreate, UpdateFlashcard, DBDeck, DBUser
+from src.models import Flashcard, BulkFlashcardCreate, DBFlashcard, Message, Review, ReviewCreate, UpdateFlashcard, DBUser, FlashcardOrder
+from src import flashcard_queries
 from src.database import get_db
-from src.dependencies import get_current_user
+from src.dependencies import get_current_user, get_read_db
+from src.pagination import set_next_cursor
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +17,18 @@ router = APIRouter(
     tags=["flashcards"],
 )
 
+def check_deck_access(db: Session, deck_id: int | None, current_user: DBUser):
+    """Raise 404 if a deck_id is given that does not belong to the current user."""
+    if deck_id is None:
+        return
+    deck = db.execute(flashcard_queries.deck_access_statement(deck_id, current_user.id)).first()
+    flashcard_queries.require_deck_access(deck, deck_id, current_user)
+
+def get_user_flashcard(db: Session, flashcard_id: int, current_user: DBUser) -> DBFlashcard:
+    """Load a flashcard of the current user or raise 404."""
+    flashcard = db.execute(flashcard_queries.user_flashcard_statement(flashcard_id, current_user.id)).scalars().first()
+    return flashcard_queries.require_flashcard(flashcard, flashcard_id, current_user)
+
 @router.post("", response_model=Flashcard)
 def create_flashcard(
     flashcard: Flashcard,
@@ -27,24 +40,9 @@ def create_flashcard(
     """
     logger.info(f"Creating flashcard for user {current_user.username} (ID: {current_user.id}), deck_id: {flashcard.deck_id}")
 
-    if flashcard.deck_id is not None:
-        deck = db.query(DBDeck).filter(
-            DBDeck.id == flashcard.deck_id,
-            DBDeck.user_id == current_user.id
-        ).first()
-        if deck is None:
-            logger.warning(f"Deck {flashcard.deck_id} not found or access denied for user {current_user.username}")
-            raise HTTPException(status_code=404, detail="Deck not found or access denied")
-
-    db_flashcard = DBFlashcard(
-        front=flashcard.front,
-        back=flashcard.back,
-        created_at=datetime.now(),
-        next_review_at=datetime.now(),
-        deck_id=flashcard.deck_id,
-        user_id=current_user.id
-    )
+    check_deck_access(db, flashcard.deck_id, current_user)
 
+    db_flashcard = flashcard_queries.new_flashcard(flashcard, current_user.id)
     db.add(db_flashcard)
     db.commit()
     db.refresh(db_flashcard)
@@ -52,25 +50,53 @@ def create_flashcard(
     logger.info(f"Flashcard created successfully (ID: {db_flashcard.id})")
     return db_flashcard
 
+@router.post("/bulk", response_model=List[Flashcard])
+def create_flashcards_bulk(
+    request: BulkFlashcardCreate,
+    current_user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Create many flashcards for the current user in one request.
+    All cards are inserted with a single multi-row INSERT in one transaction, either all of them are created or none.
+    """
+    logger.info(f"Bulk creating {len(request.flashcards)} flashcards for user {current_user.username} (ID: {current_user.id}), deck_id: {request.deck_id}")
+
+    check_deck_access(db, request.deck_id, current_user)
+
+    rows = flashcard_queries.bulk_rows(request, current_user.id)
+    try:
+        db_flashcards = db.scalars(insert(DBFlashcard).returning(DBFlashcard), rows).all()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Bulk flashcard creation failed for user {current_user.username}: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to create flashcards")
+
+    logger.info(f"Bulk created {len(db_flashcards)} flashcards for user {current_user.username}")
+    return db_flashcards
+
 @router.get("", response_model=List[Flashcard])
 def get_flashcards(
+    response: Response,
     due: bool = False,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
+    order_by: FlashcardOrder | None = None,
     current_user: DBUser = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
-    Get all flashcards for the current user with pagination.
+    Get all flashcards for the current user with cursor pagination, ordered by creation time,
+    or by next review time for due cards. If there are more cards, the X-Next-Cursor header
+    holds the cursor of the next page.
     """
     logger.info(f"Fetching flashcards for user {current_user.username}, due: {due}, limit: {limit}")
 
-    query = db.query(DBFlashcard).filter(DBFlashcard.user_id == current_user.id)
-
-    if due:
-        now = datetime.now()
-        query = query.filter(DBFlashcard.next_review_at <= now)
+    query, sort_column = flashcard_queries.flashcard_list_statement(current_user, due, order_by, cursor, limit)
+    flashcards = db.execute(query).scalars().all()
+    set_next_cursor(response, flashcards, limit, sort_column)
 
-    flashcards = query.limit(limit).all()
     logger.info(f"Retrieved {len(flashcards)} flashcards for user {current_user.username}")
     return flashcards
 
@@ -78,20 +104,14 @@ def get_flashcards(
 def get_flashcard(
     flashcard_id: int,
     current_user: DBUser = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get a specific flashcard by ID.
     """
     logger.info(f"Fetching flashcard {flashcard_id} for user {current_user.username}")
 
-    db_flashcard = db.query(DBFlashcard).filter(
-        DBFlashcard.id == flashcard_id,
-        DBFlashcard.user_id == current_user.id
-    ).first()
-    if db_flashcard is None:
-        logger.warning(f"Flashcard {flashcard_id} not found for user {current_user.username}")
-        raise HTTPException(status_code=404, detail="Flashcard not found")
+    db_flashcard = get_user_flashcard(db, flashcard_id, current_user)
 
     logger.debug(f"Flashcard {flashcard_id} retrieved successfully")
     return db_flashcard
@@ -108,21 +128,8 @@ def update_flashcard(
     """
     logger.info(f"Updating flashcard {flashcard_id} for user {current_user.username}")
 
-    db_flashcard = db.query(DBFlashcard).filter(
-        DBFlashcard.id == flashcard_id,
-        DBFlashcard.user_id == current_user.id
-    ).first()
-    if db_flashcard is None:
-        logger.warning(f"Flashcard {flashcard_id} not found for user {current_user.username}")
-        raise HTTPException(status_code=404, detail="Flashcard not found")
-
-    if flashcard.front:
-        logger.debug(f"Updating flashcard {flashcard_id} front content")
-        db_flashcard.front = flashcard.front
-    if flashcard.back:
-        logger.debug(f"Updating flashcard {flashcard_id} back content")
-        db_flashcard.back = flashcard.back
-
+    db_flashcard = get_user_flashcard(db, flashcard_id, current_user)
+    flashcard_queries.apply_flashcard_update(db_flashcard, flashcard)
     db.commit()
     db.refresh(db_flashcard)
 
@@ -138,15 +145,9 @@ def delete_flashcard(
     """Delete a specific flashcard."""
     logger.info(f"Deleting flashcard {flashcard_id} for user {current_user.username}")
 
-    db_flashcard = db.query(DBFlashcard).filter(
-        DBFlashcard.id == flashcard_id,
-        DBFlashcard.user_id == current_user.id
-    ).first()
-    if db_flashcard is None:
-        logger.warning(f"Flashcard {flashcard_id} not found for user {current_user.username}")
-        raise HTTPException(status_code=404, detail="Flashcard not found")
-
-    db.delete(db_flashcard)
+    result = db.execute(flashcard_queries.delete_flashcard_statement(flashcard_id, current_user.id))
+    if result.rowcount == 0:
+        raise flashcard_queries.flashcard_not_found(flashcard_id, current_user)
     db.commit()
 
     logger.info(f"Flashcard {flashcard_id} deleted successfully")
@@ -160,27 +161,15 @@ def create_review(
     db: Session = Depends(get_db)
 ):
     """
-    Create a new review for a flashcard and update its next review date based on the SM-2 algorithm.
+    Create a new review for a flashcard and update its next review date with the scheduler
+    of its deck, or else of the user (SM-2 or FSRS).
     """
     logger.info(f"Creating review for flashcard {flashcard_id}, user {current_user.username}, feedback: {review_data.feedback}")
 
-    flashcard = db.query(DBFlashcard).filter(
-        DBFlashcard.id == flashcard_id,
-        DBFlashcard.user_id == current_user.id
-    ).first()
-    if flashcard is None:
-        logger.warning(f"Flashcard {flashcard_id} not found for user {current_user.username}")
-        raise HTTPException(status_code=404, detail="Flashcard not found")
-
-    logger.debug(f"Applying SM-2 algorithm to flashcard {flashcard_id}")
-    SM2Algo.update_flashcard(feedback=review_data.feedback, flashcard=flashcard)
-
-    db_review = DBReview(
-        flashcard_id=flashcard_id,
-        review_at=datetime.now(),
-        feedback=review_data.feedback,
-        user_id=current_user.id
-    )
+    row = db.execute(flashcard_queries.review_target_statement(flashcard_id, current_user.id)).first()
+    flashcard, deck_scheduler = flashcard_queries.require_flashcard(row, flashcard_id, current_user)
+
+    db_review = flashcard_queries.schedule_review(flashcard, deck_scheduler, current_user, review_data)
     db.add(db_review)
     db.commit()
     db.refresh(db_review)
@@ -199,20 +188,8 @@ def remove_flashcard_from_deck(
     """
     logger.info(f"Removing flashcard {flashcard_id} from its deck for user {current_user.username}")
 
-    flashcard = db.query(DBFlashcard).filter(
-        DBFlashcard.id == flashcard_id,
-        DBFlashcard.user_id == current_user.id
-    ).first()
-    if flashcard is None:
-        logger.warning(f"Flashcard {flashcard_id} not found for user {current_user.username}")
-        raise HTTPException(status_code=404, detail="Flashcard not found")
-
-    if flashcard.deck_id is None:
-        logger.warning(f"Flashcard {flashcard_id} is not assigned to any deck")
-        raise HTTPException(status_code=400, detail="Flashcard is not assigned to any deck")
-
-    old_deck_id = flashcard.deck_id
-    flashcard.deck_id = None
+    flashcard = get_user_flashcard(db, flashcard_id, current_user)
+    old_deck_id = flashcard_queries.detach_from_deck(flashcard)
     db.commit()
 
     logger.info(f"Flashcard {flashcard_id} removed from deck {old_deck_id} successfully")
@@ -0,0 +1,200 @@
+"""
+Async version of the flashcards router, served from the async engine when USE_ASYNC_DB is enabled.
+Endpoints and responses are the same as in routers/flashcards.py, both build their statements in src/flashcard_queries.py.
+"""
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from src.models import Flashcard, BulkFlashcardCreate, DBFlashcard, Message, Review, ReviewCreate, UpdateFlashcard, DBUser, FlashcardOrder
+from src import flashcard_queries
+from src.database import get_async_db
+from src.dependencies import get_current_user_async
+from src.pagination import set_next_cursor
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/flashcards",
+    tags=["flashcards"],
+)
+
+async def check_deck_access(db: AsyncSession, deck_id: int | None, current_user: DBUser):
+    """Raise 404 if a deck_id is given that does not belong to the current user."""
+    if deck_id is None:
+        return
+    deck = (await db.execute(flashcard_queries.deck_access_statement(deck_id, current_user.id))).first()
+    flashcard_queries.require_deck_access(deck, deck_id, current_user)
+
+async def get_user_flashcard(db: AsyncSession, flashcard_id: int, current_user: DBUser) -> DBFlashcard:
+    """Load a flashcard of the current user or raise 404."""
+    flashcard = (await db.execute(flashcard_queries.user_flashcard_statement(flashcard_id, current_user.id))).scalars().first()
+    return flashcard_queries.require_flashcard(flashcard, flashcard_id, current_user)
+
+@router.post("", response_model=Flashcard)
+async def create_flashcard(
+    flashcard: Flashcard,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create a new flashcard for the current user.
+    """
+    logger.info(f"Creating flashcard for user {current_user.username} (ID: {current_user.id}), deck_id: {flashcard.deck_id}")
+
+    await check_deck_access(db, flashcard.deck_id, current_user)
+
+    db_flashcard = flashcard_queries.new_flashcard(flashcard, current_user.id)
+    db.add(db_flashcard)
+    await db.commit()
+    await db.refresh(db_flashcard)
+
+    logger.info(f"Flashcard created successfully (ID: {db_flashcard.id})")
+    return db_flashcard
+
+@router.post("/bulk", response_model=List[Flashcard])
+async def create_flashcards_bulk(
+    request: BulkFlashcardCreate,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create many flashcards for the current user in one request.
+    All cards are inserted with a single multi-row INSERT in one transaction, either all of them are created or none.
+    """
+    logger.info(f"Bulk creating {len(request.flashcards)} flashcards for user {current_user.username} (ID: {current_user.id}), deck_id: {request.deck_id}")
+
+    await check_deck_access(db, request.deck_id, current_user)
+
+    rows = flashcard_queries.bulk_rows(request, current_user.id)
+    try:
+        db_flashcards = (await db.scalars(insert(DBFlashcard).returning(DBFlashcard), rows)).all()
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Bulk flashcard creation failed for user {current_user.username}: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to create flashcards")
+
+    logger.info(f"Bulk created {len(db_flashcards)} flashcards for user {current_user.username}")
+    return db_flashcards
+
+@router.get("", response_model=List[Flashcard])
+async def get_flashcards(
+    response: Response,
+    due: bool = False,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
+    order_by: FlashcardOrder | None = None,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get all flashcards for the current user with cursor pagination, ordered by creation time,
+    or by next review time for due cards. If there are more cards, the X-Next-Cursor header
+    holds the cursor of the next page.
+    """
+    logger.info(f"Fetching flashcards for user {current_user.username}, due: {due}, limit: {limit}")
+
+    query, sort_column = flashcard_queries.flashcard_list_statement(current_user, due, order_by, cursor, limit)
+    flashcards = (await db.execute(query)).scalars().all()
+    set_next_cursor(response, flashcards, limit, sort_column)
+
+    logger.info(f"Retrieved {len(flashcards)} flashcards for user {current_user.username}")
+    return flashcards
+
+@router.get("/{flashcard_id}", response_model=Flashcard)
+async def get_flashcard(
+    flashcard_id: int,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get a specific flashcard by ID.
+    """
+    logger.info(f"Fetching flashcard {flashcard_id} for user {current_user.username}")
+
+    db_flashcard = await get_user_flashcard(db, flashcard_id, current_user)
+
+    logger.debug(f"Flashcard {flashcard_id} retrieved successfully")
+    return db_flashcard
+
+@router.put("/{flashcard_id}", response_model=Flashcard)
+async def update_flashcard(
+    flashcard_id: int,
+    flashcard: UpdateFlashcard,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Update a specific flashcard.
+    """
+    logger.info(f"Updating flashcard {flashcard_id} for user {current_user.username}")
+
+    db_flashcard = await get_user_flashcard(db, flashcard_id, current_user)
+    flashcard_queries.apply_flashcard_update(db_flashcard, flashcard)
+    await db.commit()
+    await db.refresh(db_flashcard)
+
+    logger.info(f"Flashcard {flashcard_id} updated successfully")
+    return db_flashcard
+
+@router.delete("/{flashcard_id}", response_model=Message)
+async def delete_flashcard(
+    flashcard_id: int,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete a specific flashcard."""
+    logger.info(f"Deleting flashcard {flashcard_id} for user {current_user.username}")
+
+    result = await db.execute(flashcard_queries.delete_flashcard_statement(flashcard_id, current_user.id))
+    if result.rowcount == 0:
+        raise flashcard_queries.flashcard_not_found(flashcard_id, current_user)
+    await db.commit()
+
+    logger.info(f"Flashcard {flashcard_id} deleted successfully")
+    return {"message": "Flashcard deleted successfully"}
+
+@router.post("/{flashcard_id}/review", response_model=Review)
+async def create_review(
+    flashcard_id: int,
+    review_data: ReviewCreate,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create a new review for a flashcard and update its next review date with the scheduler
+    of its deck, or else of the user (SM-2 or FSRS).
+    """
+    logger.info(f"Creating review for flashcard {flashcard_id}, user {current_user.username}, feedback: {review_data.feedback}")
+
+    row = (await db.execute(flashcard_queries.review_target_statement(flashcard_id, current_user.id))).first()
+    flashcard, deck_scheduler = flashcard_queries.require_flashcard(row, flashcard_id, current_user)
+
+    db_review = flashcard_queries.schedule_review(flashcard, deck_scheduler, current_user, review_data)
+    db.add(db_review)
+    await db.commit()
+    await db.refresh(db_review)
+
+    logger.info(f"Review created for flashcard {flashcard_id}, next review at: {flashcard.next_review_at}")
+    return db_review
+
+@router.delete("/{flashcard_id}/deck", response_model=Message)
+async def remove_flashcard_from_deck(
+    flashcard_id: int,
+    current_user: DBUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Remove a flashcard from its deck.
+    """
+    logger.info(f"Removing flashcard {flashcard_id} from its deck for user {current_user.username}")
+
+    flashcard = await get_user_flashcard(db, flashcard_id, current_user)
+    old_deck_id = flashcard_queries.detach_from_deck(flashcard)
+    await db.commit()
+
+    logger.info(f"Flashcard {flashcard_id} removed from deck {old_deck_id} successfully")
+    return {"message": "Flashcard removed from deck successfully"}
@@ -1,22 +1,35 @@
 """
 Router for LLM-powered flashcard generation endpoints.
 """
+import os
+import json
+import asyncio
 import logging
 import base64
-from fastapi import APIRouter, Depends, HTTPException
+import binascii
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from src.models import (
     LLMGenerateRequest,
     LLMGenerateFromImageRequest,
+    LLMGenerateFromImagesRequest,
     LLMGenerateBatchResponse,
     LLMGeneratedFlashcardResponse,
+    GenerationJob,
+    DBGenerationJob,
+    DBGenerationJobImage,
     DBDeck,
     DBUser
 )
 from src.database import get_db
-from src.dependencies import get_current_user
+from src.dependencies import get_current_user, get_session_factory
 from src.llm_service import get_llm_service
+from src.image_processing import UnsupportedImageError, preprocess_image
+from src.generation_jobs import get_job_queue, job_to_response, QueueFullError, WorkersNotRunningError, FINISHED_STATUSES
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -27,34 +40,93 @@ router = APIRouter(
 )
 
 llm_service = get_llm_service()
+job_queue = get_job_queue()
 
-@router.post("/generate-from-text", response_model=LLMGenerateBatchResponse)
+# Seconds between two status checks of a job in the events stream
+JOB_EVENTS_POLL_INTERVAL = 1.0
+
+# Limits for multipart image uploads
+LLM_MAX_UPLOAD_BYTES = int(os.getenv("LLM_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+LLM_MAX_UPLOAD_FILES = int(os.getenv("LLM_MAX_UPLOAD_FILES", "10"))
+# Largest multipart body of the upload endpoints, rejected by BodySizeLimitMiddleware before it is parsed
+LLM_MAX_UPLOAD_REQUEST_BYTES = LLM_MAX_UPLOAD_FILES * LLM_MAX_UPLOAD_BYTES + 64 * 1024
+UPLOAD_PATHS = ("/llm/generate-from-image/upload",)
+
+def check_deck_access(deck_id: int | None, current_user: DBUser, db: Session):
+    """Raise 404 if a deck_id is given that does not belong to the current user."""
+    if deck_id is None:
+        return
+    deck = db.query(DBDeck).filter(
+        DBDeck.id == deck_id,
+        DBDeck.user_id == current_user.id
+    ).first()
+    if deck is None:
+        logger.warning(f"Deck {deck_id} not found or access denied for user {current_user.username}")
+        raise HTTPException(status_code=404, detail="Deck not found or access denied")
+
+def enqueue_generation_job(
+    db: Session,
+    current_user: DBUser,
+    response: Response,
+    num_cards: int,
+    deck_id: int | None,
+    text: str | None = None,
+    image: bytes | None = None,
+    images: list[bytes] | None = None,
+) -> GenerationJob:
+    """Persist a generation job, hand it to the worker pool and return its status."""
+    db_job = DBGenerationJob(
+        source="text" if text is not None else "image" if image is not None else "images",
+        text=text,
+        image=image,
+        images=[DBGenerationJobImage(position=position, data=data) for position, data in enumerate(images or [])],
+        num_cards=num_cards,
+        deck_id=deck_id,
+        user_id=current_user.id
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+
+    try:
+        job_queue.submit(db_job.id)
+    except (QueueFullError, WorkersNotRunningError) as e:
+        logger.warning(f"Generation job {db_job.id} rejected for user {current_user.username}: {str(e)}")
+        db.delete(db_job)
+        db.commit()
+        raise HTTPException(status_code=503, detail=str(e))
+
+    logger.info(f"Generation job {db_job.id} created for user {current_user.username}")
+    response.status_code = 202
+    return job_to_response(db_job)
+
+
+@router.post("/generate-from-text", response_model=LLMGenerateBatchResponse | GenerationJob)
 async def generate_flashcards_from_text(
     request: LLMGenerateRequest,
+    response: Response,
+    background: bool = False,
     current_user: DBUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Generate flashcards from text using Gemini API.
     Does not save to database - returns generated cards for review.
+    With background=true a generation job is queued instead and its id is returned right away.
     """
     logger.info(f"Generating {request.num_cards} flashcards from text for user {current_user.username}, deck_id: {request.deck_id}")
     logger.debug(f"Text length: {len(request.text)} characters")
 
     # Validate deck ownership if deck_id is provided
-    if request.deck_id is not None:
-        deck = db.query(DBDeck).filter(
-            DBDeck.id == request.deck_id,
-            DBDeck.user_id == current_user.id
-        ).first()
-        if deck is None:
-            logger.warning(f"Deck {request.deck_id} not found or access denied for user {current_user.username}")
-            raise HTTPException(status_code=404, detail="Deck not found or access denied")
+    check_deck_access(request.deck_id, current_user, db)
+
+    if background:
+        return enqueue_generation_job(db, current_user, response, request.num_cards, request.deck_id, text=request.text)
 
     try:
         # Generate flashcards using LLM service
         logger.info(f"Calling LLM service to generate flashcards from text")
-        flashcard_batch = llm_service.generate_flashcards(
+        flashcard_batch = await llm_service.agenerate_flashcards(
             text=request.text,
             count=request.num_cards
         )
@@ -75,27 +147,23 @@ async def generate_flashcards_from_text(
         raise HTTPException(status_code=500, detail=f"Failed to generate flashcards: {str(e)}")
 
 
-@router.post("/generate-from-image", response_model=LLMGenerateBatchResponse)
+@router.post("/generate-from-image", response_model=LLMGenerateBatchResponse | GenerationJob)
 async def generate_flashcards_from_image(
     request: LLMGenerateFromImageRequest,
+    response: Response,
+    background: bool = False,
     current_user: DBUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Generate flashcards from an image using Gemini API.
     Does not save to database - returns generated cards for review.
+    With background=true a generation job is queued instead and its id is returned right away.
     """
     logger.info(f"Generating {request.num_cards} flashcards from image for user {current_user.username}, deck_id: {request.deck_id}")
 
     # Validate deck ownership if deck_id is provided
-    if request.deck_id is not None:
-        deck = db.query(DBDeck).filter(
-            DBDeck.id == request.deck_id,
-            DBDeck.user_id == current_user.id
-        ).first()
-        if deck is None:
-            logger.warning(f"Deck {request.deck_id} not found or access denied for user {current_user.username}")
-            raise HTTPException(status_code=404, detail="Deck not found or access denied")
+    check_deck_access(request.deck_id, current_user, db)
 
     try:
         # Decode base64 image
@@ -103,9 +171,12 @@ async def generate_flashcards_from_image(
         image_data = base64.b64decode(request.image_base64)
         logger.debug(f"Decoded image size: {len(image_data)} bytes")
 
+        if background:
+            return enqueue_generation_job(db, current_user, response, request.num_cards, request.deck_id, image=image_data)
+
         # Generate flashcards using LLM service
         logger.info(f"Calling LLM service to generate flashcards from image")
-        flashcard_batch = llm_service.generate_flashcards(
+        flashcard_batch = await llm_service.agenerate_flashcards(
             image=image_data,
             count=request.num_cards
         )
@@ -121,6 +192,290 @@ async def generate_flashcards_from_image(
             flashcards=response_cards,
             message=f"Successfully generated {len(response_cards)} flashcards from image"
         )
+    except HTTPException:
+        raise
+    except UnsupportedImageError as e:
+        logger.warning(f"Rejected image upload from user {current_user.username}: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to generate flashcards from image for user {current_user.username}: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to generate flashcards: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to generate flashcards: {str(e)}")
+
+
+@router.post("/generate-from-images", response_model=LLMGenerateBatchResponse)
+async def generate_flashcards_from_images(
+    request: LLMGenerateFromImagesRequest,
+    current_user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate one deduplicated set of flashcards from several images of the same lesson.
+    The images are sent to Gemini together instead of one request per image.
+    Does not save to database - returns generated cards for review.
+    """
+    logger.info(f"Generating {request.num_cards} flashcards from {len(request.images_base64)} images for user {current_user.username}, deck_id: {request.deck_id}")
+
+    if len(request.images_base64) > LLM_MAX_UPLOAD_FILES:
+        logger.warning(f"Rejected {len(request.images_base64)} images from user {current_user.username}")
+        raise HTTPException(status_code=400, detail=f"At most {LLM_MAX_UPLOAD_FILES} images can be sent at once")
+
+    # Validate deck ownership if deck_id is provided
+    check_deck_access(request.deck_id, current_user, db)
+
+    try:
+        # Decode base64 images
+        try:
+            image_data = [base64.b64decode(image_base64, validate=True) for image_base64 in request.images_base64]
+        except binascii.Error:
+            logger.warning(f"Rejected invalid base64 image from user {current_user.username}")
+            raise HTTPException(status_code=400, detail="Images must be base64 encoded")
+        logger.debug(f"Decoded image sizes: {[len(data) for data in image_data]} bytes")
+
+        # Generate flashcards using LLM service
+        logger.info(f"Calling LLM service to generate flashcards from {len(image_data)} images")
+        flashcard_batch = await llm_service.agenerate_flashcards_from_images(
+            images=image_data,
+            count=request.num_cards
+        )
+
+        # Convert to response format
+        response_cards = [
+            LLMGeneratedFlashcardResponse(front=card.front, back=card.back)
+            for card in flashcard_batch.flashcards
+        ]
+
+        logger.info(f"Successfully generated {len(response_cards)} flashcards from {len(image_data)} images for user {current_user.username}")
+        return LLMGenerateBatchResponse(
+            flashcards=response_cards,
+            message=f"Successfully generated {len(response_cards)} flashcards from {len(image_data)} images"
+        )
+    except HTTPException:
+        raise
+    except UnsupportedImageError as e:
+        logger.warning(f"Rejected image upload from user {current_user.username}: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to generate flashcards from images for user {current_user.username}: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to generate flashcards: {str(e)}")
+
+
+async def read_upload(upload: UploadFile) -> bytes:
+    """
+    Read an uploaded image from its spooled temp file, enforcing the size limit, and downscale it.
+    Uploads are read one at a time and only their downscaled version is kept, so a request never
+    holds more than one full size image in memory.
+    """
+    if upload.size is not None and upload.size > LLM_MAX_UPLOAD_BYTES:
+        logger.warning(f"Rejected upload '{upload.filename}' of {upload.size} bytes")
+        raise HTTPException(status_code=413, detail=f"Image '{upload.filename}' exceeds the limit of {LLM_MAX_UPLOAD_BYTES} bytes")
+    data = await upload.read(LLM_MAX_UPLOAD_BYTES + 1)
+    await upload.close()
+    if len(data) > LLM_MAX_UPLOAD_BYTES:
+        logger.warning(f"Rejected upload '{upload.filename}' larger than {LLM_MAX_UPLOAD_BYTES} bytes")
+        raise HTTPException(status_code=413, detail=f"Image '{upload.filename}' exceeds the limit of {LLM_MAX_UPLOAD_BYTES} bytes")
+    try:
+        prepared = await run_in_threadpool(preprocess_image, data)
+    except UnsupportedImageError as e:
+        logger.warning(f"Rejected upload '{upload.filename}': {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    return prepared.data
+
+
+@router.post("/generate-from-image/upload", response_model=LLMGenerateBatchResponse | GenerationJob)
+async def generate_flashcards_from_image_upload(
+    response: Response,
+    images: List[UploadFile] = File(...),
+    num_cards: int = Form(2),
+    deck_id: int | None = Form(None),
+    background: bool = False,
+    current_user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate flashcards from one or more images uploaded as multipart/form-data.
+    The images are streamed to temporary files instead of being embedded as base64 in JSON.
+    Does not save to database - returns generated cards for review.
+    With background=true a generation job is queued instead and its id is returned right away.
+    """
+    logger.info(f"Generating {num_cards} flashcards from {len(images)} uploaded images for user {current_user.username}, deck_id: {deck_id}")
+
+    if len(images) > LLM_MAX_UPLOAD_FILES:
+        logger.warning(f"Rejected upload of {len(images)} images from user {current_user.username}")
+        raise HTTPException(status_code=400, detail=f"At most {LLM_MAX_UPLOAD_FILES} images can be uploaded at once")
+
+    check_deck_access(deck_id, current_user, db)
+
+    image_data = [await read_upload(upload) for upload in images]
+    logger.debug(f"Downscaled upload sizes: {[len(data) for data in image_data]} bytes")
+
+    if background:
+        return enqueue_generation_job(db, current_user, response, num_cards, deck_id, images=image_data)
+
+    try:
+        # Generate flashcards using LLM service
+        logger.info(f"Calling LLM service to generate flashcards from {len(image_data)} images")
+        flashcard_batch = await llm_service.agenerate_flashcards_from_images(
+            images=image_data,
+            count=num_cards
+        )
+
+        # Convert to response format
+        response_cards = [
+            LLMGeneratedFlashcardResponse(front=card.front, back=card.back)
+            for card in flashcard_batch.flashcards
+        ]
+
+        logger.info(f"Successfully generated {len(response_cards)} flashcards from {len(image_data)} images for user {current_user.username}")
+        return LLMGenerateBatchResponse(
+            flashcards=response_cards,
+            message=f"Successfully generated {len(response_cards)} flashcards from {len(image_data)} images"
+        )
+    except HTTPException:
+        raise
+    except UnsupportedImageError as e:
+        logger.warning(f"Rejected image upload from user {current_user.username}: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to generate flashcards from uploaded images for user {current_user.username}: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to generate flashcards: {str(e)}")
+
+
+def stream_flashcard_events(cards, request: Request, username: str) -> StreamingResponse:
+    """
+    Send generated flashcards as Server-Sent Events.
+    Each flashcard is sent as a 'card' event once it has been generated, followed by a 'done' event,
+    or an 'error' event if the generation fails after the stream has started.
+    """
+    async def events():
+        sent = 0
+        try:
+            async for card in cards:
+                if await request.is_disconnected():
+                    logger.info(f"Client of user {username} disconnected after {sent} streamed flashcards")
+                    return
+                sent += 1
+                yield f"event: card\ndata: {LLMGeneratedFlashcardResponse(front=card.front, back=card.back).model_dump_json()}\n\n"
+        except Exception as e:
+            logger.error(f"Streamed flashcard generation failed for user {username}: {str(e)}", exc_info=True)
+            error = {"detail": f"Failed to generate flashcards: {str(e)}"}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+            return
+        finally:
+            await cards.aclose()
+        logger.info(f"Successfully streamed {sent} flashcards for user {username}")
+        done = {"count": sent, "message": f"Successfully generated {sent} flashcards"}
+        yield f"event: done\ndata: {json.dumps(done)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.post("/generate-from-text/stream")
+async def stream_flashcards_from_text(
+    request: LLMGenerateRequest,
+    http_request: Request,
+    current_user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate flashcards from text and stream each card as soon as it is generated (Server-Sent Events).
+    Does not save to database - returns generated cards for review.
+    """
+    logger.info(f"Streaming {request.num_cards} flashcards from text for user {current_user.username}, deck_id: {request.deck_id}")
+    check_deck_access(request.deck_id, current_user, db)
+
+    cards = llm_service.astream_flashcards(text=request.text, count=request.num_cards)
+    return stream_flashcard_events(cards, http_request, current_user.username)
+
+
+@router.post("/generate-from-image/upload/stream")
+async def stream_flashcards_from_image_upload(
+    http_request: Request,
+    images: List[UploadFile] = File(...),
+    num_cards: int = Form(2),
+    deck_id: int | None = Form(None),
+    current_user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate flashcards from uploaded images and stream each card as soon as it is generated (Server-Sent Events).
+    Does not save to database - returns generated cards for review.
+    """
+    logger.info(f"Streaming {num_cards} flashcards from {len(images)} uploaded images for user {current_user.username}, deck_id: {deck_id}")
+
+    if len(images) > LLM_MAX_UPLOAD_FILES:
+        logger.warning(f"Rejected upload of {len(images)} images from user {current_user.username}")
+        raise HTTPException(status_code=400, detail=f"At most {LLM_MAX_UPLOAD_FILES} images can be uploaded at once")
+
+    check_deck_access(deck_id, current_user, db)
+
+    # Unreadable uploads are rejected with a normal error response before the stream starts
+    image_data = [await read_upload(upload) for upload in images]
+
+    cards = llm_service.astream_flashcards(images=image_data, count=num_cards)
+    return stream_flashcard_events(cards, http_request, current_user.username)
+
+
+def get_user_job(job_id: str, current_user: DBUser, db: Session) -> DBGenerationJob:
+    """Load a generation job of the current user or raise 404."""
+    db_job = db.query(DBGenerationJob).filter(
+        DBGenerationJob.id == job_id,
+        DBGenerationJob.user_id == current_user.id
+    ).first()
+    if db_job is None:
+        logger.warning(f"Generation job {job_id} not found for user {current_user.username}")
+        raise HTTPException(status_code=404, detail="Generation job not found")
+    return db_job
+
+
+@router.get("/jobs/{job_id}", response_model=GenerationJob)
+def get_generation_job(
+    job_id: str,
+    current_user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the status, and once finished the flashcards, of a generation job."""
+    logger.info(f"Fetching generation job {job_id} for user {current_user.username}")
+    return job_to_response(get_user_job(job_id, current_user, db))
+
+
+@router.get("/jobs/{job_id}/events")
+def stream_generation_job_events(
+    job_id: str,
+    request: Request,
+    current_user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    session_factory=Depends(get_session_factory)
+):
+    """
+    Subscribe to status changes of a generation job via Server-Sent Events.
+    Sends a 'status' event whenever the status changes and closes the stream once the job has finished.
+    """
+    logger.info(f"Streaming events of generation job {job_id} for user {current_user.username}")
+    get_user_job(job_id, current_user, db)
+
+    def load_job() -> GenerationJob | None:
+        # The request's session is closed before the body streams, each poll opens its own
+        # session so no connection is held between polls
+        with session_factory() as poll_db:
+            try:
+                return job_to_response(get_user_job(job_id, current_user, poll_db))
+            except HTTPException:
+                return None
+
+    async def events():
+        last_status = None
+        while True:
+            job = await run_in_threadpool(load_job)
+            if job is None:
+                # Deleted while the stream was open, e.g. with the account
+                break
+            if job.status != last_status:
+                last_status = job.status
+                yield f"event: status\ndata: {job.model_dump_json()}\n\n"
+            else:
+                yield ": keepalive\n\n"
+            if job.status in FINISHED_STATUSES or await request.is_disconnected():
+                break
+            await asyncio.sleep(JOB_EVENTS_POLL_INTERVAL)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -0,0 +1,28 @@
+"""
+Router for runtime metrics of the API process.
+"""
+import logging
+from fastapi import APIRouter, Depends
+
+from src.models import Metrics, DBUser
+from src.dependencies import get_current_user
+from src.utils import get_password_hasher
+from src.database import get_pool_stats
+from src.llm_service import get_llm_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+)
+
+@router.get("", response_model=Metrics)
+def get_metrics(current_user: DBUser = Depends(get_current_user)):
+    """Get queue depths and counters of the worker and database connection pools and the LLM response cache of this process."""
+    logger.info(f"Metrics requested by user {current_user.username}")
+    return Metrics(
+        password_hashing=get_password_hasher().stats(),
+        database_pools=get_pool_stats(),
+        llm_cache=get_llm_service().cache.stats(),
+    )
@@ -0,0 +1,119 @@
+import logging
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from datetime import datetime
+
+from src.spaced_repetition import BatchState, feedback_array, schedule_in_rounds, scheduler_for
+from src.models import DBDeck, DBFlashcard, DBReview, DBUser, ReviewBatchCreate, ReviewBatchItem, ReviewBatchResponse
+from src.database import get_db
+from src.dependencies import get_current_user
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/reviews",
+    tags=["reviews"],
+)
+
+# Columns the schedulers read and write, the batch only loads and updates these
+SCHEDULE_COLUMNS = (
+    DBFlashcard.id,
+    DBFlashcard.easiness_factor,
+    DBFlashcard.interval,
+    DBFlashcard.repetitions,
+    DBFlashcard.review_count,
+    DBFlashcard.stability,
+    DBFlashcard.difficulty,
+    DBFlashcard.next_review_at,
+    DBFlashcard.last_reviewed_at,
+)
+
+def to_local_naive(value: datetime | None, now: datetime) -> datetime:
+    """Convert a client timestamp to the naive local time stored in the database, never later than now."""
+    if value is None:
+        return now
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return min(value, now)
+
+def schedule_reviews(rows: list, reviews: list[ReviewBatchItem], reviewed_at: list[datetime], user_scheduler) -> list[dict]:
+    """
+    Apply the reviews of a batch, in order, to the loaded schedule rows, each card with the scheduler of
+    its deck or else of the user. A card reviewed k times is updated in k rounds, see
+    schedule_in_rounds, so the reviews of each card are applied in order. Returns the rows for the bulk UPDATE.
+    """
+    position = {row.id: i for i, row in enumerate(rows)}
+    state = BatchState.of(rows)
+    schedulers = [scheduler_for(row.scheduler, user_scheduler) for row in rows]
+
+    card = np.array([position[item.flashcard_id] for item in reviews])
+    # How many earlier reviews of the same card the batch holds
+    reviews_so_far = dict.fromkeys(position, 0)
+    occurrence = np.empty(len(reviews), dtype=np.int64)
+    for i, item in enumerate(reviews):
+        occurrence[i] = reviews_so_far[item.flashcard_id]
+        reviews_so_far[item.flashcard_id] += 1
+
+    schedule_in_rounds(
+        state, card, occurrence, feedback_array(item.feedback for item in reviews),
+        np.array(reviewed_at, dtype="datetime64[us]"), schedulers
+    )
+    return [{"id": row.id, **values} for row, values in zip(rows, state.rows())]
+
+@router.post("/batch", response_model=ReviewBatchResponse)
+def create_reviews_batch(
+    batch: ReviewBatchCreate,
+    current_user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Submit several reviews at once and update the flashcards with the scheduler of their deck or of the user.
+    Reviews are applied in the given order, so a card reviewed twice is scheduled from its second review.
+    Reviews of cards that do not exist or belong to another user are skipped and reported in the response,
+    so a card deleted while its review was queued does not block the others.
+    The remaining reviews are stored in one transaction, either all of them or none.
+    """
+    logger.info(f"Submitting {len(batch.reviews)} reviews for user {current_user.username}")
+
+    flashcard_ids = {item.flashcard_id for item in batch.reviews}
+    rows = db.query(*SCHEDULE_COLUMNS, DBDeck.scheduler).outerjoin(DBDeck, DBFlashcard.deck_id == DBDeck.id).filter(
+        DBFlashcard.id.in_(flashcard_ids),
+        DBFlashcard.user_id == current_user.id
+    ).all()
+    missing = sorted(flashcard_ids - {row.id for row in rows})
+    if missing:
+        logger.warning(f"Skipping reviews of flashcards {missing} not found for user {current_user.username}")
+    skipped = set(missing)
+    reviews = [item for item in batch.reviews if item.flashcard_id not in skipped]
+    if not reviews:
+        return ReviewBatchResponse(reviewed=0, skipped=missing, message="No reviews stored")
+
+    now = datetime.now()
+    reviewed_at = [to_local_naive(item.reviewed_at, now) for item in reviews]
+    review_rows = [{
+        "flashcard_id": item.flashcard_id,
+        "review_at": review_time,
+        "feedback": item.feedback,
+        "elapsed_ms": item.elapsed_ms,
+        "user_id": current_user.id,
+    } for item, review_time in zip(reviews, reviewed_at)]
+    card_rows = schedule_reviews(rows, reviews, reviewed_at, current_user.scheduler)
+
+    try:
+        db.execute(insert(DBReview), review_rows)
+        # Bulk UPDATE by primary key, one executemany for all cards
+        db.execute(update(DBFlashcard), card_rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Batch review submission failed for user {current_user.username}: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to save reviews")
+
+    logger.info(f"Stored {len(review_rows)} reviews of {len(rows)} flashcards for user {current_user.username}")
+    return ReviewBatchResponse(
+        reviewed=len(review_rows),
+        skipped=missing,
+        message=f"Successfully stored {len(review_rows)} reviews"
+    )
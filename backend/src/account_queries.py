@@ -0,0 +1,58 @@
+"""
+Statements and checks of the authentication endpoints.
+
+Shared by the sync router (routers/authentication.py) and the async one (routers/authentication_async.py),
+which only differ in how they execute the statements built here.
+"""
+import logging
+from fastapi import HTTPException
+from sqlalchemy import select, delete, update, or_
+
+from src.models import DBUser, UserCreate, UserResponse, SchedulerName
+
+logger = logging.getLogger(__name__)
+
+
+def taken_statement(user: UserCreate):
+    """Select the username and email of the users that already have the username or email of a registration."""
+    return select(DBUser.username, DBUser.email).where(
+        or_(DBUser.username == user.username, DBUser.email == user.email)
+    )
+
+def require_available(taken_rows, user: UserCreate):
+    """Raise 400 if the rows of taken_statement show the username or the email is taken, the username first."""
+    if any(row.username == user.username for row in taken_rows):
+        logger.warning(f"Registration failed: Username '{user.username}' already exists")
+        raise HTTPException(status_code=400, detail="Username already exists")
+    if taken_rows:
+        logger.warning(f"Registration failed: Email '{user.email}' already exists")
+        raise HTTPException(status_code=400, detail="Email already exists")
+
+def taken_concurrently(user: UserCreate) -> HTTPException:
+    """The 400 of a registration whose username or email a concurrent one took while the password was hashed."""
+    logger.warning(f"Registration failed: Username '{user.username}' or email '{user.email}' was taken concurrently")
+    return HTTPException(status_code=400, detail="Username or email already exists")
+
+def new_user(user: UserCreate, hashed_password: str) -> DBUser:
+    """Build the row of a registered user."""
+    return DBUser(
+        username=user.username,
+        email=user.email,
+        hashed_password=hashed_password,
+    )
+
+def login_statement(username: str):
+    """Select the columns a login needs, without loading the whole user."""
+    return select(DBUser.id, DBUser.username, DBUser.hashed_password).where(DBUser.username == username)
+
+def update_scheduler_statement(user_id: int, scheduler: SchedulerName | None):
+    """One UPDATE of the user's scheduler."""
+    return update(DBUser).where(DBUser.id == user_id).values(scheduler=scheduler)
+
+def scheduler_response(current_user: DBUser, scheduler: SchedulerName | None) -> UserResponse:
+    """The user as returned after a scheduler update, without reloading the row."""
+    return UserResponse.model_validate(current_user).model_copy(update={"scheduler": scheduler})
+
+def delete_user_statement(user_id: int):
+    """One DELETE, the database removes decks, flashcards, reviews and jobs through ON DELETE CASCADE."""
+    return delete(DBUser).where(DBUser.id == user_id)
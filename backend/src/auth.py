@@ -1,4 +1,8 @@
 import logging
+import time
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 import os
@@ -10,6 +14,12 @@ if not JWT_SECRET_KEY:
     raise ValueError("JWT_SECRET_KEY environment variable is not set")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_DAYS = 1
+# Number of verified tokens kept in memory, 0 disables the cache
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "4096"))
+
+# LRU of sha256(token) -> verified payload, so a token is only decoded once per process
+_token_cache: OrderedDict[str, dict] = OrderedDict()
+_token_cache_lock = threading.Lock()
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """Create a JWT access token."""
@@ -23,8 +33,8 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     logger.debug(f"Created access token for subject: {data.get('sub')}")
     return token
 
-def verify_access_token(token: str) -> dict | None:
-    """Verify a JWT access token and return the payload."""
+def decode_access_token(token: str) -> dict | None:
+    """Decode and validate a JWT access token without using the cache."""
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[ALGORITHM])
         logger.debug(f"Token verified successfully for subject: {payload.get('sub')}")
@@ -32,3 +42,33 @@ def verify_access_token(token: str) -> dict | None:
     except JWTError as e:
         logger.warning(f"Token verification failed: {str(e)}")
         return None
+
+def verify_access_token(token: str) -> dict | None:
+    """Verify a JWT access token and return the payload.
+
+    Valid tokens are cached until their exp claim passes. Invalid tokens are never cached.
+    """
+    if TOKEN_CACHE_MAX_ENTRIES <= 0:
+        return decode_access_token(token)
+
+    digest = hashlib.sha256(token.encode()).hexdigest()
+    with _token_cache_lock:
+        payload = _token_cache.get(digest)
+        if payload is not None:
+            if payload.get("exp", 0) > time.time():
+                _token_cache.move_to_end(digest)
+                return dict(payload)
+            del _token_cache[digest]
+
+    payload = decode_access_token(token)
+    if payload is not None and "exp" in payload:
+        with _token_cache_lock:
+            _token_cache[digest] = dict(payload)
+            if len(_token_cache) > TOKEN_CACHE_MAX_ENTRIES:
+                _token_cache.popitem(last=False)
+    return payload
+
+def clear_token_cache():
+    """Forget all verified tokens."""
+    with _token_cache_lock:
+        _token_cache.clear()
@@ -0,0 +1,122 @@
+"""
+Statements, ownership checks and response shaping of the decks endpoints.
+
+Shared by the sync router (routers/decks.py) and the async one (routers/decks_async.py),
+which only differ in how they execute the statements built here.
+"""
+import logging
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import select, delete, update
+
+from src.models import DBDeck, DBFlashcard, DBUser, Deck, UpdateDeck, FlashcardOrder, BulkMoveFlashcards, BulkRemoveFlashcards
+from src.pagination import InvalidCursor, paginate, flashcard_sort_column
+from src import review_queue
+
+logger = logging.getLogger(__name__)
+
+
+def user_deck_statement(deck_id: int, user_id: int, *columns):
+    """Select a deck of the user, the whole row or only the given columns."""
+    return select(*(columns or (DBDeck,))).where(DBDeck.id == deck_id, DBDeck.user_id == user_id)
+
+def require_deck(deck, deck_id: int, current_user: DBUser):
+    """Return the loaded deck, or raise 404 if the user has no deck with this id."""
+    if deck is None:
+        logger.warning(f"Deck {deck_id} not found for user {current_user.username}")
+        raise HTTPException(status_code=404, detail="Deck not found")
+    return deck
+
+def new_deck(deck: Deck, user_id: int) -> DBDeck:
+    """Build the row of a new deck of the user."""
+    return DBDeck(
+        name=deck.name,
+        description=deck.description,
+        scheduler=deck.scheduler,
+        created_at=datetime.now(),
+        user_id=user_id
+    )
+
+def apply_deck_update(db_deck: DBDeck, deck: UpdateDeck):
+    """Copy the given fields of an update onto a loaded deck."""
+    if deck.name:
+        logger.debug(f"Updating deck name from '{db_deck.name}' to '{deck.name}'")
+        db_deck.name = deck.name
+    if deck.description:
+        logger.debug(f"Updating deck description")
+        db_deck.description = deck.description
+    # Only when given, an explicit null goes back to the user's scheduler
+    if "scheduler" in deck.model_fields_set:
+        logger.debug(f"Updating deck scheduler to {deck.scheduler}")
+        db_deck.scheduler = deck.scheduler
+
+def deck_list_statement(current_user: DBUser, cursor: str | None, limit: int):
+    """Select a page of the user's decks, oldest first. An invalid cursor is a 400."""
+    query = select(DBDeck).where(DBDeck.user_id == current_user.id)
+    try:
+        return paginate(query, DBDeck.created_at, DBDeck.id, cursor, limit)
+    except InvalidCursor:
+        logger.warning(f"Invalid deck list cursor from user {current_user.username}")
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def deck_flashcards_statement(deck_id: int, current_user: DBUser, due: bool, order_by: FlashcardOrder | None,
+                              cursor: str | None, limit: int):
+    """Select a page of a deck's flashcards and return it with its sort column. An invalid cursor is a 400."""
+    query = select(DBFlashcard).where(
+        DBFlashcard.deck_id == deck_id,
+        DBFlashcard.user_id == current_user.id
+    )
+    if due:
+        query = query.where(DBFlashcard.next_review_at <= datetime.now())
+
+    sort_column = flashcard_sort_column(order_by, due)
+    try:
+        return paginate(query, sort_column, DBFlashcard.id, cursor, limit), sort_column
+    except InvalidCursor:
+        logger.warning(f"Invalid flashcard list cursor from user {current_user.username}")
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def read_review_cursor(cursor: str, current_user: DBUser, deck_id: int, now: datetime):
+    """review_queue.read_cursor, an invalid cursor is a 400."""
+    try:
+        return review_queue.read_cursor(cursor, current_user.id, deck_id, now)
+    except InvalidCursor:
+        logger.warning(f"Invalid review queue cursor from user {current_user.username}")
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def delete_deck_statement(deck_id: int, user_id: int):
+    """Delete a deck of the user, returning its name, no row if it does not exist.
+
+    One DELETE, the database removes the flashcards and reviews through ON DELETE CASCADE.
+    """
+    return (
+        delete(DBDeck)
+        .where(DBDeck.id == deck_id, DBDeck.user_id == user_id)
+        .returning(DBDeck.name)
+        # Identify deleted objects in the session from RETURNING instead of loading expired ones
+        .execution_options(synchronize_session="fetch")
+    )
+
+def move_flashcards_statement(deck_id: int, current_user: DBUser, request: BulkMoveFlashcards):
+    """One UPDATE moving the user's flashcards into a deck. A request without exactly one selection is a 400."""
+    if (request.flashcard_ids is None) == (request.from_deck_id is None):
+        logger.warning(f"Bulk move for user {current_user.username} without exactly one of flashcard_ids and from_deck_id")
+        raise HTTPException(status_code=400, detail="Pass either flashcard_ids or from_deck_id")
+
+    statement = update(DBFlashcard).where(
+        DBFlashcard.user_id == current_user.id,
+        DBFlashcard.deck_id.is_distinct_from(deck_id)
+    ).values(deck_id=deck_id)
+    if request.flashcard_ids is not None:
+        return statement.where(DBFlashcard.id.in_(request.flashcard_ids))
+    return statement.where(DBFlashcard.deck_id == request.from_deck_id)
+
+def remove_flashcards_statement(deck_id: int, user_id: int, request: BulkRemoveFlashcards):
+    """One UPDATE taking the given flashcards, or all of them, out of a deck of the user."""
+    statement = update(DBFlashcard).where(
+        DBFlashcard.user_id == user_id,
+        DBFlashcard.deck_id == deck_id
+    ).values(deck_id=None)
+    if request.flashcard_ids is not None:
+        statement = statement.where(DBFlashcard.id.in_(request.flashcard_ids))
+    return statement
@@ -0,0 +1,48 @@
+"""
+Card counts per deck, computed in the database with one grouped query.
+
+A card is new until its first review, learning while its interval is shorter than
+MATURE_INTERVAL_DAYS and mature after that. Due counts every card whose next review
+is not in the future, whatever its state.
+"""
+from datetime import datetime
+from sqlalchemy import select, func
+
+from src.models import DBDeck, DBFlashcard, DeckStats
+
+# Interval from which a card counts as mature, as in Anki
+MATURE_INTERVAL_DAYS = 21
+
+
+def deck_stats_statement(user_id: int, now: datetime, deck_id: int | None = None):
+    """Count the cards of the user's decks (or of one deck) by state, decks without cards count zero."""
+    card = DBFlashcard.id
+    reviewed = DBFlashcard.review_count > 0
+    query = (
+        select(
+            DBDeck.id.label("deck_id"),
+            func.count(card).label("total"),
+            func.count(card).filter(DBFlashcard.next_review_at <= now).label("due"),
+            func.count(card).filter(~reviewed).label("new_cards"),
+            func.count(card).filter(reviewed, DBFlashcard.interval < MATURE_INTERVAL_DAYS).label("learning"),
+            func.count(card).filter(reviewed, DBFlashcard.interval >= MATURE_INTERVAL_DAYS).label("mature"),
+        )
+        .outerjoin(DBFlashcard, DBFlashcard.deck_id == DBDeck.id)
+        .where(DBDeck.user_id == user_id)
+        .group_by(DBDeck.id)
+        .order_by(DBDeck.id)
+    )
+    if deck_id is not None:
+        query = query.where(DBDeck.id == deck_id)
+    return query
+
+def to_deck_stats(row) -> DeckStats:
+    """Convert a row of deck_stats_statement."""
+    return DeckStats(
+        deck_id=row.deck_id,
+        total=row.total,
+        due=row.due,
+        new=row.new_cards,
+        learning=row.learning,
+        mature=row.mature,
+    )
@@ -1,18 +1,102 @@
+import os
+import hmac
+import time
+import hashlib
 import logging
-from fastapi import Depends, HTTPException
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from fastapi import Depends, HTTPException, Request, Response
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models import DBUser
-from src.database import get_db
-from src.auth import verify_access_token
+from src.database import get_db, get_async_db, get_replica_session, REPLICA_STICKINESS_SECONDS
+from src.auth import verify_access_token, JWT_SECRET_KEY
 
 logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> DBUser:
-    """Get the current user from the JWT token."""
+# How long an authenticated user is served from memory before it is loaded from the database again.
+# Also how long other worker processes may still accept a deleted user or show an old scheduler
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+# Columns of DBUser kept in the cache
+USER_COLUMNS = ("id", "username", "email", "hashed_password", "created_at", "scheduler")
+
+
+class UserIdentityCache:
+    """Per-process cache of authenticated users, keyed by token subject.
+
+    Only plain column values are stored, never session-bound objects, so a
+    cached user can be attached to the session of any request without a query.
+    When full, the least recently used entry is evicted.
+
+    invalidate() only reaches the cache of the current process. Other worker processes
+    keep serving their entry until it expires, so for up to ttl_seconds after an account
+    is deleted its token still authenticates there, and a changed scheduler is not seen yet.
+    Writes of such a request only touch rows owned by the deleted user id, which no longer
+    exist, and new rows referencing it are rejected by the users foreign keys.
+    """
+
+    def __init__(self, ttl_seconds: int = AUTH_CACHE_TTL_SECONDS, max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict | None:
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, snapshot = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return snapshot
+
+    def set(self, key: str, user: DBUser):
+        if self.ttl_seconds <= 0:
+            return
+        snapshot = {column: getattr(user, column) for column in USER_COLUMNS}
+        with self._lock:
+            self._entries[key] = (time.monotonic(), snapshot)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        """Remove every entry of a user, e.g. after the account was deleted."""
+        with self._lock:
+            for key in [key for key, (_, snapshot) in self._entries.items() if snapshot["id"] == user_id]:
+                del self._entries[key]
+        logger.debug(f"Invalidated cached identity of user {user_id}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_user_cache = None
+
+def get_user_cache() -> UserIdentityCache:
+    """Get or create the identity cache singleton."""
+    global _user_cache
+    if _user_cache is None:
+        _user_cache = UserIdentityCache()
+    return _user_cache
+
+
+def read_token_subject(token: str) -> tuple[str, int | None, str]:
+    """Verify a token and return its username, user id (if present) and identity cache key."""
     payload = verify_access_token(token)
     if not payload:
         logger.warning("Authentication failed: Invalid or expired token")
@@ -23,10 +107,138 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         logger.warning("Authentication failed: Invalid token - no username in payload")
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    db_user = db.query(DBUser).filter(DBUser.username == username).first()
+    user_id = payload.get("uid")
+    cache_key = f"uid:{user_id}" if user_id is not None else f"sub:{username}"
+    return username, user_id, cache_key
+
+class RecentWrites:
+    """
+    Read-your-writes for the read replicas. The time of a user's last committed write travels
+    in a signed cookie instead of process memory, so it holds whichever worker process serves
+    the user's next request.
+    """
+    cookie_name = "last_write"
+
+    def __init__(self, window_seconds: float = REPLICA_STICKINESS_SECONDS, secret: str = JWT_SECRET_KEY):
+        self.window_seconds = window_seconds
+        self._secret = secret.encode()
+
+    def _signature(self, user_id: int, written_at: str) -> str:
+        return hmac.new(self._secret, f"{user_id}:{written_at}".encode(), hashlib.sha256).hexdigest()
+
+    def cookie_value(self, user_id: int, at: float | None = None) -> str:
+        written_at = f"{time.time() if at is None else at:.3f}"
+        return f"{user_id}:{written_at}:{self._signature(user_id, written_at)}"
+
+    def mark(self, response: Response, user_id: int):
+        """Set the cookie of a write the user just committed."""
+        response.set_cookie(
+            self.cookie_name, self.cookie_value(user_id),
+            max_age=max(int(self.window_seconds) + 1, 0), httponly=True, samesite="lax"
+        )
+
+    def is_recent(self, user_id: int, cookie: str | None) -> bool:
+        """Whether the cookie is a valid mark of this user's write within the window."""
+        try:
+            cookie_user, written_at, signature = cookie.split(":")
+            at = float(written_at)
+        except (AttributeError, ValueError):
+            return False
+        if cookie_user != str(user_id) or not hmac.compare_digest(signature, self._signature(user_id, written_at)):
+            return False
+        return time.time() - at <= self.window_seconds
+
+recent_writes = RecentWrites()
+
+def cached_user(cache_key: str, username: str) -> DBUser | None:
+    """Build a detached user from the identity cache, ready to be merged into a session without loading."""
+    snapshot = get_user_cache().get(cache_key)
+    if snapshot is None or snapshot["username"] != username:
+        return None
+    db_user = DBUser(**snapshot)
+    make_transient_to_detached(db_user)
+    return db_user
+
+def track_writes(db: Session, response: Response, user_id: int):
+    """Mark the user's writes committed in this session on the response, see RecentWrites."""
+    db.info["after_write_commit"] = lambda: recent_writes.mark(response, user_id)
+
+def get_current_user(response: Response, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> DBUser:
+    """Get the current user from the JWT token."""
+    username, user_id, cache_key = read_token_subject(token)
+
+    db_user = cached_user(cache_key, username)
+    if db_user is not None:
+        # Attach the cached user to this request's session without loading it
+        db_user = db.merge(db_user, load=False)
+        track_writes(db, response, db_user.id)
+        logger.debug(f"User authenticated from cache: {username} (ID: {db_user.id})")
+        return db_user
+
+    if user_id is not None:
+        db_user = db.get(DBUser, user_id)
+        if db_user is not None and db_user.username != username:
+            db_user = None
+    else:
+        # Tokens issued before the uid claim was added
+        db_user = db.query(DBUser).filter(DBUser.username == username).first()
+    if not db_user:
+        logger.warning(f"Authentication failed: User '{username}' not found in database")
+        raise HTTPException(status_code=401, detail="User not found")
+
+    get_user_cache().set(cache_key, db_user)
+    track_writes(db, response, db_user.id)
+    logger.debug(f"User authenticated: {username} (ID: {db_user.id})")
+    return db_user
+
+def get_session_factory(request: Request):
+    """Provides a factory of short-lived sessions, for endpoints that query again after the request's session is gone.
+
+    Sessions come from the app's get_db provider, so dependency overrides apply to them as well.
+    Use it as `with session_factory() as db:`.
+    """
+    return contextmanager(request.app.dependency_overrides.get(get_db, get_db))
+
+def get_read_db(request: Request, current_user: DBUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Provides a session for read-only endpoints.
+
+    Reads go to a read replica, unless no replicas are configured or the user's last_write cookie
+    shows a write to the primary within the last REPLICA_STICKINESS_SECONDS, then the request's primary session is used.
+    """
+    if recent_writes.is_recent(current_user.id, request.cookies.get(RecentWrites.cookie_name)):
+        logger.debug(f"Reading from primary for user {current_user.id} after a recent write")
+        yield db
+        return
+    replica = get_replica_session()
+    if replica is None:
+        yield db
+        return
+    try:
+        yield replica
+    finally:
+        replica.close()
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> DBUser:
+    """Get the current user from the JWT token, for endpoints using the async engine."""
+    username, user_id, cache_key = read_token_subject(token)
+
+    db_user = cached_user(cache_key, username)
+    if db_user is not None:
+        db_user = await db.merge(db_user, load=False)
+        logger.debug(f"User authenticated from cache: {username} (ID: {db_user.id})")
+        return db_user
+
+    if user_id is not None:
+        db_user = await db.get(DBUser, user_id)
+        if db_user is not None and db_user.username != username:
+            db_user = None
+    else:
+        # Tokens issued before the uid claim was added
+        db_user = (await db.execute(select(DBUser).where(DBUser.username == username))).scalars().first()
     if not db_user:
         logger.warning(f"Authentication failed: User '{username}' not found in database")
         raise HTTPException(status_code=401, detail="User not found")
 
+    get_user_cache().set(cache_key, db_user)
     logger.debug(f"User authenticated: {username} (ID: {db_user.id})")
     return db_user
@@ -0,0 +1,127 @@
+"""
+Statements, ownership checks and response shaping of the flashcards endpoints.
+
+Shared by the sync router (routers/flashcards.py) and the async one (routers/flashcards_async.py),
+which only differ in how they execute the statements built here.
+"""
+import logging
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import select, delete
+
+from src.models import DBFlashcard, DBDeck, DBReview, DBUser, Flashcard, BulkFlashcardCreate, UpdateFlashcard, FlashcardOrder, ReviewCreate, SchedulerName
+from src.pagination import InvalidCursor, paginate, flashcard_sort_column
+from src.spaced_repetition import CardState, scheduler_for
+
+logger = logging.getLogger(__name__)
+
+
+def deck_access_statement(deck_id: int, user_id: int):
+    """Select the id of a deck of the user, to check that new cards may be put into it."""
+    return select(DBDeck.id).where(DBDeck.id == deck_id, DBDeck.user_id == user_id)
+
+def require_deck_access(deck, deck_id: int, current_user: DBUser):
+    """Raise 404 if the deck of deck_access_statement was not found."""
+    if deck is None:
+        logger.warning(f"Deck {deck_id} not found or access denied for user {current_user.username}")
+        raise HTTPException(status_code=404, detail="Deck not found or access denied")
+
+def user_flashcard_statement(flashcard_id: int, user_id: int):
+    """Select a flashcard of the user."""
+    return select(DBFlashcard).where(DBFlashcard.id == flashcard_id, DBFlashcard.user_id == user_id)
+
+def flashcard_not_found(flashcard_id: int, current_user: DBUser) -> HTTPException:
+    """The 404 of a flashcard the user does not have."""
+    logger.warning(f"Flashcard {flashcard_id} not found for user {current_user.username}")
+    return HTTPException(status_code=404, detail="Flashcard not found")
+
+def require_flashcard(flashcard, flashcard_id: int, current_user: DBUser):
+    """Return the loaded flashcard, or raise 404 if the user has no flashcard with this id."""
+    if flashcard is None:
+        raise flashcard_not_found(flashcard_id, current_user)
+    return flashcard
+
+def new_flashcard(flashcard: Flashcard, user_id: int) -> DBFlashcard:
+    """Build the row of a new flashcard of the user, due right away."""
+    now = datetime.now()
+    return DBFlashcard(
+        front=flashcard.front,
+        back=flashcard.back,
+        created_at=now,
+        next_review_at=now,
+        deck_id=flashcard.deck_id,
+        user_id=user_id
+    )
+
+def bulk_rows(request: BulkFlashcardCreate, user_id: int) -> list[dict]:
+    """Rows of a bulk create, inserted with a single multi-row INSERT."""
+    now = datetime.now()
+    return [
+        {
+            "front": card.front,
+            "back": card.back,
+            "created_at": now,
+            "next_review_at": now,
+            "deck_id": request.deck_id,
+            "user_id": user_id,
+        }
+        for card in request.flashcards
+    ]
+
+def flashcard_list_statement(current_user: DBUser, due: bool, order_by: FlashcardOrder | None,
+                             cursor: str | None, limit: int):
+    """Select a page of the user's flashcards and return it with its sort column. An invalid cursor is a 400."""
+    query = select(DBFlashcard).where(DBFlashcard.user_id == current_user.id)
+    if due:
+        query = query.where(DBFlashcard.next_review_at <= datetime.now())
+
+    sort_column = flashcard_sort_column(order_by, due)
+    try:
+        return paginate(query, sort_column, DBFlashcard.id, cursor, limit), sort_column
+    except InvalidCursor:
+        logger.warning(f"Invalid flashcard list cursor from user {current_user.username}")
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def apply_flashcard_update(db_flashcard: DBFlashcard, flashcard: UpdateFlashcard):
+    """Copy the given fields of an update onto a loaded flashcard."""
+    if flashcard.front:
+        logger.debug(f"Updating flashcard {db_flashcard.id} front content")
+        db_flashcard.front = flashcard.front
+    if flashcard.back:
+        logger.debug(f"Updating flashcard {db_flashcard.id} back content")
+        db_flashcard.back = flashcard.back
+
+def delete_flashcard_statement(flashcard_id: int, user_id: int):
+    """Delete a flashcard of the user, the database removes its reviews through ON DELETE CASCADE."""
+    return delete(DBFlashcard).where(DBFlashcard.id == flashcard_id, DBFlashcard.user_id == user_id)
+
+def review_target_statement(flashcard_id: int, user_id: int):
+    """Select a flashcard of the user with the scheduler of its deck, in the same query."""
+    return (
+        select(DBFlashcard, DBDeck.scheduler)
+        .outerjoin(DBDeck, DBFlashcard.deck_id == DBDeck.id)
+        .where(DBFlashcard.id == flashcard_id, DBFlashcard.user_id == user_id)
+    )
+
+def schedule_review(flashcard: DBFlashcard, deck_scheduler: SchedulerName | None, current_user: DBUser,
+                    review_data: ReviewCreate) -> DBReview:
+    """Reschedule a flashcard with the scheduler of its deck, or else of the user, and build the review row."""
+    scheduler = scheduler_for(deck_scheduler, current_user.scheduler)
+    logger.debug(f"Applying {scheduler.name.value} to flashcard {flashcard.id}")
+    now = datetime.now()
+    scheduler.schedule(CardState.of(flashcard), review_data.feedback, now).apply_to(flashcard)
+    return DBReview(
+        flashcard_id=flashcard.id,
+        review_at=now,
+        feedback=review_data.feedback,
+        user_id=current_user.id
+    )
+
+def detach_from_deck(flashcard: DBFlashcard) -> int:
+    """Take a loaded flashcard out of its deck and return the deck's id. A card without a deck is a 400."""
+    if flashcard.deck_id is None:
+        logger.warning(f"Flashcard {flashcard.id} is not assigned to any deck")
+        raise HTTPException(status_code=400, detail="Flashcard is not assigned to any deck")
+    old_deck_id = flashcard.deck_id
+    flashcard.deck_id = None
+    return old_deck_id
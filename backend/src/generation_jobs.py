@@ -0,0 +1,300 @@
+"""
+Background queue for LLM flashcard generation jobs.
+
+Jobs are persisted in the generation_jobs table and executed by a bounded
+pool of asyncio workers, so the HTTP request that created a job can return
+immediately. Several processes can share the table: a worker claims a job with
+a conditional UPDATE before running it, so each job runs once, and keeps its
+heartbeat_at fresh while it runs. Pending jobs and running jobs whose heartbeat
+is older than the lease are picked up again by any process.
+"""
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, or_, select, update
+
+from src.database import SessionLocal
+from src.models import DBGenerationJob, DBGenerationJobImage, GenerationJob, GenerationJobStatus, LLMGeneratedFlashcardResponse
+from src.llm_service import FlashcardBatch, get_llm_service
+
+logger = logging.getLogger(__name__)
+
+# Number of jobs processed at the same time per process, 0 disables the workers
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "2"))
+# Maximum number of jobs waiting for a worker
+GENERATION_QUEUE_SIZE = int(os.getenv("GENERATION_QUEUE_SIZE", "100"))
+# Seconds without a heartbeat after which a running job counts as abandoned and is run again,
+# the worker running a job refreshes its heartbeat three times per lease
+GENERATION_JOB_LEASE_SECONDS = float(os.getenv("GENERATION_JOB_LEASE_SECONDS", "120"))
+
+FINISHED_STATUSES = (GenerationJobStatus.SUCCEEDED, GenerationJobStatus.FAILED)
+
+
+class QueueFullError(Exception):
+    """Raised when no more jobs can be queued."""
+
+
+class WorkersNotRunningError(Exception):
+    """Raised when a job is submitted to a process whose workers are not running."""
+
+
+def job_to_response(job: DBGenerationJob) -> GenerationJob:
+    """Convert a job row into its API representation."""
+    flashcards = None
+    if job.result:
+        batch = FlashcardBatch.model_validate_json(job.result)
+        flashcards = [LLMGeneratedFlashcardResponse(front=card.front, back=card.back) for card in batch.flashcards]
+    return GenerationJob(
+        id=job.id,
+        status=job.status,
+        source=job.source,
+        num_cards=job.num_cards,
+        deck_id=job.deck_id,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        flashcards=flashcards,
+        error=job.error,
+    )
+
+
+class GenerationJobQueue:
+    """Bounded worker pool that runs generation jobs stored in the database."""
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        workers: int = GENERATION_WORKERS,
+        max_size: int = GENERATION_QUEUE_SIZE,
+        lease_seconds: float = GENERATION_JOB_LEASE_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.max_size = max_size
+        self.lease_seconds = lease_seconds
+        self._queue: asyncio.Queue | None = None
+        self._queued: set[str] = set()
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        """Start the workers and the sweeper that queues pending and abandoned jobs."""
+        if self.workers <= 0:
+            logger.info("Generation job workers are disabled")
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        await self._queue_recoverable_jobs()
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+        logger.info(f"Started {self.workers} generation job workers ({self._queue.qsize()} jobs queued)")
+
+    async def stop(self):
+        """Cancel the workers. Their jobs are run again once their lease has expired."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queued.clear()
+        logger.info("Stopped generation job workers")
+
+    def submit(self, job_id: str):
+        """Queue a job that has already been committed to the database."""
+        if not self.running:
+            raise WorkersNotRunningError("Flashcard generation jobs are not available right now, please try again later")
+        self._put(job_id)
+        logger.info(f"Queued generation job {job_id} ({self._queue.qsize()} waiting)")
+
+    def _put(self, job_id: str):
+        if job_id in self._queued:
+            return
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            raise QueueFullError("Too many flashcard generation jobs queued, please try again later")
+        self._queued.add(job_id)
+
+    def _claimable(self, now: datetime):
+        """Jobs a worker may claim: pending ones and running ones whose lease has expired."""
+        return or_(
+            DBGenerationJob.status == GenerationJobStatus.PENDING,
+            and_(
+                DBGenerationJob.status == GenerationJobStatus.RUNNING,
+                or_(
+                    DBGenerationJob.heartbeat_at.is_(None),
+                    DBGenerationJob.heartbeat_at < now - timedelta(seconds=self.lease_seconds),
+                ),
+            ),
+        )
+
+    def _recover_jobs(self) -> list[str]:
+        """Ids of the jobs waiting to be claimed, oldest first. Claiming them is left to the workers."""
+        db = self.session_factory()
+        try:
+            job_ids = db.scalars(
+                select(DBGenerationJob.id)
+                .where(self._claimable(datetime.now()))
+                .order_by(DBGenerationJob.created_at)
+            ).all()
+            if job_ids:
+                logger.info(f"Found {len(job_ids)} unfinished generation jobs to run")
+            return list(job_ids)
+        finally:
+            db.close()
+
+    async def _queue_recoverable_jobs(self):
+        try:
+            for job_id in await asyncio.to_thread(self._recover_jobs):
+                self._put(job_id)
+        except QueueFullError:
+            logger.warning("Generation job queue is full, remaining unfinished jobs are queued by a later sweep")
+        except Exception as e:
+            logger.error(f"Failed to recover unfinished generation jobs: {str(e)}")
+
+    async def _sweeper(self):
+        """Queue jobs of crashed processes once their lease has expired, and jobs no process has queued."""
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            await self._queue_recoverable_jobs()
+
+    async def _worker(self, number: int):
+        logger.debug(f"Generation job worker {number} started")
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            try:
+                await self.run_job(job_id)
+            except Exception as e:
+                logger.error(f"Generation job worker {number} failed on job {job_id}: {str(e)}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def claim(self, job_id: str) -> datetime | None:
+        """
+        Mark a claimable job as running in one conditional UPDATE, so of several processes
+        only one gets it. Returns the claim time, which identifies the claim, or None.
+        """
+        db = self.session_factory()
+        try:
+            now = datetime.now()
+            claimed = db.execute(
+                update(DBGenerationJob)
+                .where(DBGenerationJob.id == job_id, self._claimable(now))
+                .values(status=GenerationJobStatus.RUNNING, started_at=now, heartbeat_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            return now if claimed == 1 else None
+        finally:
+            db.close()
+
+    def _heartbeat(self, job_id: str, claimed_at: datetime):
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(DBGenerationJob)
+                .where(DBGenerationJob.id == job_id, DBGenerationJob.started_at == claimed_at)
+                .values(heartbeat_at=datetime.now())
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    async def _keep_alive(self, job_id: str, claimed_at: datetime):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await asyncio.to_thread(self._heartbeat, job_id, claimed_at)
+            except Exception as e:
+                logger.warning(f"Heartbeat of generation job {job_id} failed: {str(e)}")
+
+    async def run_job(self, job_id: str):
+        """Claim a job and process it, unless another worker has claimed it or it has finished."""
+        claimed_at = await asyncio.to_thread(self.claim, job_id)
+        if claimed_at is None:
+            logger.debug(f"Skipping generation job {job_id}: missing, finished or claimed by another worker")
+            return
+
+        heartbeat = asyncio.create_task(self._keep_alive(job_id, claimed_at))
+        try:
+            inputs = await asyncio.to_thread(self.load_inputs, job_id)
+            await self.process(job_id, inputs, claimed_at)
+        finally:
+            heartbeat.cancel()
+
+    def load_inputs(self, job_id: str) -> dict:
+        """
+        Read what the generation of a job needs into plain values. The session is closed
+        before the LLM call, so no pooled connection waits in a transaction while it runs.
+        """
+        db = self.session_factory()
+        try:
+            job = db.get(DBGenerationJob, job_id)
+            return {
+                "source": job.source,
+                "text": job.text,
+                "image": job.image,
+                "images": [image.data for image in job.images],
+                "num_cards": job.num_cards,
+                "user_id": job.user_id,
+            }
+        finally:
+            db.close()
+
+    def store_outcome(self, job_id: str, claimed_at: datetime, values: dict) -> bool:
+        """Store the result or error of a job while the claim is ours. Returns whether it was stored."""
+        db = self.session_factory()
+        try:
+            # A worker that took over an expired lease owns the job now
+            stored = db.execute(
+                update(DBGenerationJob)
+                .where(DBGenerationJob.id == job_id, DBGenerationJob.started_at == claimed_at)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if stored:
+                db.execute(delete(DBGenerationJobImage).where(DBGenerationJobImage.job_id == job_id))
+            db.commit()
+            return bool(stored)
+        finally:
+            db.close()
+
+    async def process(self, job_id: str, inputs: dict, claimed_at: datetime):
+        """Run the LLM generation of a claimed job and store the result or the error."""
+        source, num_cards = inputs["source"], inputs["num_cards"]
+        logger.info(f"Running generation job {job_id} ({source}, {num_cards} cards) for user {inputs['user_id']}")
+        values = {"image": None}
+        try:
+            if source == "images":
+                batch = await get_llm_service().agenerate_flashcards_from_images(images=inputs["images"], count=num_cards)
+            else:
+                batch = await get_llm_service().agenerate_flashcards(
+                    text=inputs["text"] if source == "text" else None,
+                    image=inputs["image"] if source == "image" else None,
+                    count=num_cards,
+                )
+            values.update(result=batch.model_dump_json(), status=GenerationJobStatus.SUCCEEDED)
+            logger.info(f"Generation job {job_id} succeeded with {len(batch.flashcards)} flashcards")
+        except Exception as e:
+            values.update(error=str(e), status=GenerationJobStatus.FAILED)
+            logger.error(f"Generation job {job_id} failed: {str(e)}")
+
+        values["finished_at"] = datetime.now()
+        if not await asyncio.to_thread(self.store_outcome, job_id, claimed_at, values):
+            logger.warning(f"Result of generation job {job_id} discarded, its lease expired and another worker took it over")
+
+
+_job_queue = None
+
+def get_job_queue() -> GenerationJobQueue:
+    """Get or create the generation job queue singleton."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = GenerationJobQueue()
+    return _job_queue
@@ -0,0 +1,124 @@
+"""
+Image preprocessing before images are sent to the LLM.
+
+Uploaded lesson screenshots are often several MB and far larger than the
+model needs. They are downscaled to a maximum edge length, re-encoded and
+stripped of all metadata (EXIF, GPS, ICC profiles) before being uploaded.
+"""
+import io
+import os
+import logging
+from dataclasses import dataclass
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels of the image sent to the model
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1568"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+
+# Magic bytes of the formats we accept
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+
+# Image info of a JPEG as written by preprocess_image, anything else is metadata to strip
+_PLAIN_JPEG_INFO = {"jfif", "jfif_version", "jfif_unit", "jfif_density", "dpi", "progressive", "progression"}
+
+
+class UnsupportedImageError(ValueError):
+    """Raised when the uploaded bytes are not an image we can process."""
+
+
+@dataclass
+class PreparedImage:
+    """An image ready to be sent to the model."""
+    data: bytes
+    mime_type: str
+    original_size: int
+    width: int
+    height: int
+
+
+def sniff_image_type(data: bytes) -> str | None:
+    """Detect the image format from its leading bytes, ignoring any client supplied type."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mime_type in _SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    return None
+
+
+def _is_prepared(image: Image.Image, source_type: str, max_edge: int) -> bool:
+    """Whether an opened image already is what preprocess_image would produce, judged from its header."""
+    if max(image.size) > max_edge:
+        return False
+    if source_type == "image/jpeg":
+        return image.mode in ("RGB", "L") and image.info.keys() <= _PLAIN_JPEG_INFO
+    if source_type == "image/png":
+        return image.mode in ("RGBA", "LA") and not image.info
+    return False
+
+
+def preprocess_image(data: bytes, max_edge: int = IMAGE_MAX_EDGE, quality: int = IMAGE_JPEG_QUALITY) -> PreparedImage:
+    """Downscale, re-encode and strip metadata from an uploaded image.
+
+    Images with transparency are encoded as PNG, everything else as JPEG.
+    Images that already are in that form, e.g. uploads that were prepared when they arrived,
+    are passed through without re-encoding them again.
+    This is CPU bound and should be run in a thread pool from async code.
+    """
+    source_type = sniff_image_type(data)
+    if source_type is None:
+        logger.warning(f"Rejected upload of unknown format ({len(data)} bytes)")
+        raise UnsupportedImageError("Unsupported image format. Please upload a JPEG, PNG, WebP, GIF or BMP image.")
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        if _is_prepared(image, source_type, max_edge):
+            # Decode it, so a corrupt image is rejected here instead of by the model
+            image.load()
+            logger.debug(f"Passing through prepared {source_type} image {image.width}x{image.height} ({len(data)} bytes)")
+            return PreparedImage(data=data, mime_type=source_type, original_size=len(data), width=image.width, height=image.height)
+        # Let the JPEG decoder scale down while decoding, much cheaper than a full decode
+        image.draft("RGB", (max_edge, max_edge))
+        # Apply the EXIF orientation before the metadata is dropped
+        image = ImageOps.exif_transpose(image)
+
+        # Resizing and encoding can still fail on malformed image data
+        original_width, original_height = image.size
+        image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        output = io.BytesIO()
+        if has_alpha:
+            image.save(output, format="PNG", optimize=True)
+            mime_type = "image/png"
+        else:
+            image.convert("RGB").save(output, format="JPEG", quality=quality, optimize=True, progressive=True)
+            mime_type = "image/jpeg"
+        processed = output.getvalue()
+    except Image.DecompressionBombError as e:
+        logger.warning(f"Rejected {source_type} upload with too many pixels: {str(e)}")
+        raise UnsupportedImageError("The uploaded image has too many pixels.")
+    except (UnidentifiedImageError, OSError) as e:
+        logger.warning(f"Failed to decode {source_type} upload: {str(e)}")
+        raise UnsupportedImageError("The uploaded image could not be read.")
+
+    logger.info(
+        f"Preprocessed {source_type} image {original_width}x{original_height} -> "
+        f"{mime_type} {image.width}x{image.height}: {len(data)} -> {len(processed)} bytes"
+    )
+    return PreparedImage(
+        data=processed,
+        mime_type=mime_type,
+        original_size=len(data),
+        width=image.width,
+        height=image.height,
+    )
@@ -2,14 +2,48 @@
 LLM service for generating flashcards using Gemini API via LangChain.
 """
 import os
+import re
+import json
+import math
+import time
+import asyncio
 import base64
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import AsyncIterator
 from pydantic import BaseModel, Field
+from sqlalchemy import delete
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage
 
+from src.database import SessionLocal
+from src.image_processing import preprocess_image, PreparedImage
+from src.models import DBGenerationCacheEntry
+
 logger = logging.getLogger(__name__)
 
+# Maximum number of model calls running at the same time per process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+
+# Bump whenever the prompts change so cached responses of the old prompts are not reused
+PROMPT_VERSION = "1"
+
+# Texts longer than LLM_CHUNK_CHARS are split into overlapping chunks that are generated in parallel
+LLM_CHUNK_CHARS = int(os.getenv("LLM_CHUNK_CHARS", "6000"))
+LLM_CHUNK_OVERLAP = int(os.getenv("LLM_CHUNK_OVERLAP", "300"))
+LLM_CHUNK_FANOUT = int(os.getenv("LLM_CHUNK_FANOUT", "4"))
+
+# Maximum number of images sent to the model in one multimodal message
+LLM_IMAGES_PER_CALL = int(os.getenv("LLM_IMAGES_PER_CALL", "5"))
+
+# Response cache settings, a max entries of 0 disables the in-process tier
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+LLM_CACHE_PERSISTENT = os.getenv("LLM_CACHE_PERSISTENT", "false").lower() in ("1", "true", "yes")
+
 
 class GeneratedFlashcard(BaseModel):
     """Schema for a single generated flashcard."""
@@ -22,13 +56,316 @@ class FlashcardBatch(BaseModel):
     flashcards: list[GeneratedFlashcard] = Field(description="List of generated flashcards")
 
 
+# Paragraph breaks, Japanese sentence endings (no whitespace needed after them) and
+# western sentence endings followed by whitespace
+_SENTENCE_BOUNDARY = re.compile(r"\n\s*\n|(?<=[。！？])|(?<=[.!?])\s+")
+
+
+def split_into_chunks(text: str, max_chars: int = LLM_CHUNK_CHARS, overlap: int = LLM_CHUNK_OVERLAP) -> list[str]:
+    """Split text into chunks of at most max_chars characters.
+
+    Chunks end on paragraph or sentence boundaries where possible. Each chunk
+    starts with the last sentences (up to `overlap` characters) of the previous
+    chunk so concepts spanning a boundary are not lost.
+    """
+    if len(text) <= max_chars:
+        return [text]
+
+    sentences = []
+    for sentence in _SENTENCE_BOUNDARY.split(text):
+        sentence = sentence.strip()
+        # Hard split sentences that do not fit into a chunk on their own
+        while len(sentence) > max_chars:
+            sentences.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if sentence:
+            sentences.append(sentence)
+
+    chunks = []
+    current: list[str] = []
+    current_len = 0
+    for sentence in sentences:
+        if current and current_len + len(sentence) + 1 > max_chars:
+            chunks.append(" ".join(current))
+            # Carry the tail of the finished chunk over into the next one
+            carried: list[str] = []
+            carried_len = 0
+            for previous in reversed(current):
+                if carried_len + len(previous) + 1 > overlap or carried_len + len(previous) + len(sentence) + 2 > max_chars:
+                    break
+                carried.insert(0, previous)
+                carried_len += len(previous) + 1
+            current, current_len = carried, carried_len
+        current.append(sentence)
+        current_len += len(sentence) + 1
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def merge_batches(batches: list[FlashcardBatch], count: int) -> FlashcardBatch:
+    """Merge per-chunk batches into one, dropping duplicate fronts and keeping at most count cards.
+
+    Cards are taken from the batches in turn so every chunk is represented.
+    """
+    seen = set()
+    merged = []
+    queues = [list(batch.flashcards) for batch in batches]
+    while len(merged) < count and any(queues):
+        for queue in queues:
+            if not queue or len(merged) >= count:
+                continue
+            card = queue.pop(0)
+            normalized = re.sub(r"[\W_]+", "", card.front.casefold())
+            if normalized in seen:
+                continue
+            seen.add(normalized)
+            merged.append(card)
+    return FlashcardBatch(flashcards=merged)
+
+
+# Appended to the prompt for streamed generation so every card can be parsed as soon as its line is complete
+JSON_LINES_INSTRUCTION = """
+            Output format: write each flashcard as one JSON object on its own line, with the keys "front" and "back".
+            Do not wrap the output in a list, code block or any other text.
+            """
+
+
+class JsonLinesCardParser:
+    """Incrementally parses flashcards from streamed JSON lines output."""
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text: str) -> list[GeneratedFlashcard]:
+        """Add streamed text and return the flashcards of all lines completed by it."""
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        return [card for card in map(self._parse_line, lines) if card is not None]
+
+    def close(self) -> list[GeneratedFlashcard]:
+        """Parse whatever is left once the stream has ended."""
+        line, self._buffer = self._buffer, ""
+        card = self._parse_line(line)
+        return [card] if card is not None else []
+
+    @staticmethod
+    def _parse_line(line: str) -> GeneratedFlashcard | None:
+        line = line.strip().rstrip(",")
+        if not line.startswith("{"):
+            # Code fences, list brackets or chatter around the cards
+            return None
+        try:
+            data = json.loads(line)
+            return GeneratedFlashcard(front=str(data["front"]), back=str(data["back"]))
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Skipping unparseable streamed flashcard line: {line[:100]}")
+            return None
+
+
+def chunk_text(content) -> str:
+    """Extract the text of a streamed message chunk, which may be a string or a list of parts."""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part if isinstance(part, str) else part.get("text", "")
+        for part in content
+    )
+
+
+class GenerationCache:
+    """Cache of generated flashcard batches keyed by a hash of the input.
+
+    The in-process tier is an LRU with a TTL. If `persistent` is set, entries
+    are also written to the llm_generation_cache table so they survive restarts
+    and are shared between worker processes. Every write there also deletes the
+    expired rows, so the table does not grow forever.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        persistent: bool = LLM_CACHE_PERSISTENT,
+        session_factory=SessionLocal,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self.session_factory = session_factory
+        self._entries: OrderedDict[str, tuple[float, FlashcardBatch]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(text: str | None, image: bytes | None, count: int) -> str:
+        """Build the cache key from the prompt version, the card count and the input content."""
+        digest = hashlib.sha256()
+        digest.update(f"v{PROMPT_VERSION}:{count}:".encode())
+        if text is not None:
+            digest.update(b"text:" + text.encode())
+        else:
+            digest.update(b"image:" + image)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> FlashcardBatch | None:
+        """Look up a batch in the in-process tier, then in the persistent tier."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, batch = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    logger.debug(f"LLM cache hit (memory) for key {key[:12]}")
+                    return batch.model_copy(deep=True)
+                del self._entries[key]
+
+        if self.persistent:
+            batch = self._get_persistent(key)
+            if batch is not None:
+                self._set_memory(key, batch)
+                with self._lock:
+                    self.persistent_hits += 1
+                logger.debug(f"LLM cache hit (database) for key {key[:12]}")
+                return batch.model_copy(deep=True)
+
+        with self._lock:
+            self.misses += 1
+        logger.debug(f"LLM cache miss for key {key[:12]}")
+        return None
+
+    def set(self, key: str, batch: FlashcardBatch):
+        """Store a batch in both tiers."""
+        self._set_memory(key, batch)
+        if self.persistent:
+            self._set_persistent(key, batch)
+
+    def _set_memory(self, key: str, batch: FlashcardBatch):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), batch.model_copy(deep=True))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_persistent(self, key: str) -> FlashcardBatch | None:
+        try:
+            db = self.session_factory()
+            try:
+                entry = db.get(DBGenerationCacheEntry, key)
+                if entry is None:
+                    return None
+                if (datetime.now() - entry.created_at).total_seconds() > self.ttl_seconds:
+                    db.delete(entry)
+                    db.commit()
+                    return None
+                return FlashcardBatch.model_validate_json(entry.response)
+            finally:
+                db.close()
+        except Exception as e:
+            logger.warning(f"LLM cache database lookup failed: {str(e)}")
+            return None
+
+    def _set_persistent(self, key: str, batch: FlashcardBatch):
+        try:
+            db = self.session_factory()
+            try:
+                now = datetime.now()
+                db.merge(DBGenerationCacheEntry(
+                    key=key,
+                    response=batch.model_dump_json(),
+                    created_at=now,
+                ))
+                # Expired rows are otherwise only deleted when their key is looked up again
+                db.execute(
+                    delete(DBGenerationCacheEntry)
+                    .where(DBGenerationCacheEntry.created_at < now - timedelta(seconds=self.ttl_seconds))
+                    .execution_options(synchronize_session=False)
+                )
+                db.commit()
+            finally:
+                db.close()
+        except Exception as e:
+            logger.warning(f"LLM cache database write failed: {str(e)}")
+
+    def stats(self) -> dict:
+        """Return the hit/miss counters and the size of the in-process tier."""
+        with self._lock:
+            lookups = self.hits + self.persistent_hits + self.misses
+            return {
+                "hits": self.hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.persistent_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "persistent": self.persistent,
+            }
+
+    def clear(self):
+        """Drop all in-process entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.persistent_hits = 0
+            self.misses = 0
+
+
 class LLMService:
     """Service for interacting with Gemini API to generate flashcards."""
 
     def __init__(self):
         """Initialize the LLM service with Gemini model."""
         self.model = None
+        self.stream_model = None  # plain chat model, its output is streamed as JSON lines
         self._initializing = False
+        self.max_concurrency = LLM_MAX_CONCURRENCY
+        self._semaphore = None
+        self._semaphore_loop = None
+        self.cache = GenerationCache()
+        self.chunk_chars = LLM_CHUNK_CHARS
+        self.chunk_overlap = LLM_CHUNK_OVERLAP
+        self.chunk_fanout = LLM_CHUNK_FANOUT
+        self.images_per_call = LLM_IMAGES_PER_CALL
+
+    async def _cache_get(self, key: str) -> FlashcardBatch | None:
+        """Look up a cached batch, the persistent tier is queried in a worker thread."""
+        if self.cache.persistent:
+            return await asyncio.to_thread(self.cache.get, key)
+        return self.cache.get(key)
+
+    async def _cache_set(self, key: str, batch: FlashcardBatch):
+        """Cache a batch, the persistent tier is written in a worker thread."""
+        if self.cache.persistent:
+            await asyncio.to_thread(self.cache.set, key, batch)
+        else:
+            self.cache.set(key, batch)
+
+    def _cache_key(self, text: str | None, images: list[bytes], count: int) -> str:
+        """Cache key of a generation, the same for the streamed and the non-streamed methods."""
+        if len(images) > 1:
+            combined = b"".join(hashlib.sha256(image).digest() for image in images)
+            return self.cache.make_key(None, b"images:" + combined, count)
+        return self.cache.make_key(text, images[0] if images else None, count)
+
+    def _text_parts(self, text: str, count: int) -> list[tuple[str, int]]:
+        """Split a long text into chunks, each with a share of the cards proportional to its length."""
+        chunks = split_into_chunks(text, self.chunk_chars, self.chunk_overlap)
+        total_chars = sum(len(chunk) for chunk in chunks)
+        # Ask for slightly more cards than needed so duplicates can be dropped
+        return [(chunk, max(1, math.ceil(count * len(chunk) / total_chars))) for chunk in chunks]
+
+    def _image_parts(self, images: list[bytes], count: int) -> list[tuple[list[bytes], int]]:
+        """Group images by `images_per_call`, each group with a share of the cards proportional to its size."""
+        groups = [images[i:i + self.images_per_call] for i in range(0, len(images), self.images_per_call)]
+        # Ask for slightly more cards than needed so duplicates can be dropped
+        return [(group, max(1, math.ceil(count * len(group) / len(images)))) for group in groups]
 
     def _ensure_initialized(self):
         """Lazy initialization of the model."""
@@ -52,25 +389,14 @@ class LLMService:
                 )
 
                 self.model = base_model.with_structured_output(FlashcardBatch)
+                self.stream_model = base_model
                 logger.info("LLM service initialized successfully")
 
             finally:
                 self._initializing = False
 
-    def generate_flashcards(self, text: str | None = None, image: bytes | None = None, count: int = 5) -> FlashcardBatch:
-        """Generate flashcards from text or image input.
-
-        Args:
-            text: Text content to generate flashcards from
-            image: Image bytes to generate flashcards from
-            count: Number of flashcards to generate
-
-        Returns:
-            FlashcardBatch containing the generated flashcards
-        """
-        logger.info(f"Generating {count} flashcards from {'text' if text else 'image'}")
-        self._ensure_initialized()
-
+    def _validate_input(self, text: str | None, image: bytes | None):
+        """Ensure exactly one of text and image is given."""
         if text and image:
             logger.error("Both text and image provided - only one is allowed")
             raise ValueError("Provide either text or image, not both")
@@ -78,6 +404,8 @@ class LLMService:
             logger.error("Neither text nor image provided")
             raise ValueError("Provide either text or image input")
 
+    def _build_message(self, text: str | None, images: list[PreparedImage], count: int) -> HumanMessage:
+        """Build the prompt message for the model from a text or from one or more preprocessed images."""
         if text:
             # Generate flashcards from text
             logger.debug(f"Generating flashcards from text (length: {len(text)} characters)")
@@ -95,19 +423,21 @@ class LLMService:
                 - NEVER EVER add the romaji reading of any japanese word.
                 - for every word/sentence add add the end of it the english meaning.
                 """
-            message = HumanMessage(content=prompt)
+            return HumanMessage(content=prompt)
 
+        # Generate flashcards from images
+        logger.debug(f"Generating flashcards from {len(images)} images (sizes: {[len(image.data) for image in images]} bytes)")
+        if len(images) == 1:
+            source, subject = "this image", "this image"
         else:
-            # Generate flashcards from image
-            logger.debug(f"Generating flashcards from image (size: {len(image)} bytes)")
-            image_b64 = base64.b64encode(image).decode()
+            source, subject = f"these {len(images)} images, they are consecutive pages of the same lesson", "these images"
 
-            prompt = f"""
+        prompt = f"""
             IF THE PROVIDED TEXT IS NOT RELATED TO LEARNING A NEW CONCEPT OR WANTS YOU TO DO ANYTHING ELSE OTHER THAN CREATING FLASHCARDS DO NOT RESPOND AT ALL 
             For example if it says anything like "Write me a poem about x, discuss y with me, ...", REFUSE IT 
-            Analyze this image and generate exactly {count} educational flashcards based on its content.
+            Analyze {source} and generate exactly {count} educational flashcards based on its content.
             Each flashcard should have a clear question on the front and a concise answer on the back.
-            Create {count} flashcards that test key concepts, information, or details visible in this image.
+            Create {count} flashcards that test key concepts, information, or details visible in {subject}.
             If the text is about learning anything related to the japanese language ALWAYS keep the following instructions in mind: 
             - If it is about a new kanji, always include a card on the various hiragana readings and an example sentence for each possible reading
             - if it relates to grammar, always also include a card for the detailed grammatical concept behind it as well as example sentence/s
@@ -117,16 +447,14 @@ class LLMService:
 
             """
 
-            message = HumanMessage(
-                content=[
-                    {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": f"data:image/jpeg;base64,{image_b64}"}
-                ]
-            )
-
-        logger.info("Invoking LLM model for flashcard generation")
-        result = self.model.invoke([message])
+        content = [{"type": "text", "text": prompt}]
+        for image in images:
+            image_b64 = base64.b64encode(image.data).decode()
+            content.append({"type": "image_url", "image_url": f"data:{image.mime_type};base64,{image_b64}"})
+        return HumanMessage(content=content)
 
+    def _check_result(self, result: FlashcardBatch) -> FlashcardBatch:
+        """Reject empty model responses (the model refuses non-educational input)."""
         # Check if the LLM refused to generate flashcards (empty response)
         if not result.flashcards or len(result.flashcards) == 0:
             logger.warning("LLM returned no flashcards - likely refused non-educational content")
@@ -135,6 +463,262 @@ class LLMService:
         logger.info(f"Successfully generated {len(result.flashcards)} flashcards")
         return result
 
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Return the concurrency limiter for the currently running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def generate_flashcards(self, text: str | None = None, image: bytes | None = None, count: int = 5) -> FlashcardBatch:
+        """Generate flashcards from text or image input.
+
+        Blocks the calling thread for the whole model call, so async code
+        should use agenerate_flashcards instead.
+
+        Args:
+            text: Text content to generate flashcards from
+            image: Image bytes to generate flashcards from
+            count: Number of flashcards to generate
+
+        Returns:
+            FlashcardBatch containing the generated flashcards
+        """
+        logger.info(f"Generating {count} flashcards from {'text' if text else 'image'}")
+        self._validate_input(text, image)
+
+        cache_key = self._cache_key(text, [image] if image else [], count)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Returning {len(cached.flashcards)} cached flashcards")
+            return cached
+
+        self._ensure_initialized()
+        images = [preprocess_image(image)] if image else []
+        message = self._build_message(text, images, count)
+
+        logger.info("Invoking LLM model for flashcard generation")
+        result = self._check_result(self.model.invoke([message]))
+        self.cache.set(cache_key, result)
+        return result
+
+    async def _ainvoke_model(self, text: str | None, images: list[bytes], count: int) -> FlashcardBatch:
+        """Run a single model call, waiting for a free concurrency slot.
+
+        Images are downscaled and re-encoded in worker threads first.
+        """
+        self._ensure_initialized()
+        prepared = await asyncio.gather(*[asyncio.to_thread(preprocess_image, image) for image in images])
+        message = self._build_message(text, list(prepared), count)
+
+        async with self._get_semaphore():
+            logger.info("Invoking LLM model for flashcard generation (async)")
+            return self._check_result(await self.model.ainvoke([message]))
+
+    async def _agenerate_chunked(self, text: str, count: int) -> FlashcardBatch:
+        """Map-reduce generation for long texts.
+
+        The text is split into chunks, each chunk gets a share of the cards
+        proportional to its length and at most `chunk_fanout` chunks are
+        generated at the same time. The results are merged and deduplicated.
+        """
+        parts = self._text_parts(text, count)
+        logger.info(f"Splitting {len(text)} characters into {len(parts)} chunks (fan-out: {self.chunk_fanout})")
+
+        fanout = asyncio.Semaphore(self.chunk_fanout)
+
+        async def generate_chunk(chunk: str, chunk_count: int) -> FlashcardBatch:
+            async with fanout:
+                return await self._ainvoke_model(chunk, [], chunk_count)
+
+        results = await asyncio.gather(
+            *[generate_chunk(chunk, chunk_count) for chunk, chunk_count in parts],
+            return_exceptions=True,
+        )
+        batches = [result for result in results if isinstance(result, FlashcardBatch)]
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if not batches:
+            raise errors[0]
+        if errors:
+            logger.warning(f"{len(errors)} of {len(parts)} chunks failed: {str(errors[0])}")
+
+        merged = merge_batches(batches, count)
+        logger.info(f"Merged {sum(len(batch.flashcards) for batch in batches)} chunk flashcards into {len(merged.flashcards)}")
+        return merged
+
+    async def agenerate_flashcards(self, text: str | None = None, image: bytes | None = None, count: int = 5) -> FlashcardBatch:
+        """Generate flashcards from text or image input without blocking the event loop.
+
+        At most `max_concurrency` model calls run at the same time per process,
+        further calls wait for a free slot. Texts longer than `chunk_chars` are
+        generated chunk by chunk in parallel and merged.
+
+        Args:
+            text: Text content to generate flashcards from
+            image: Image bytes to generate flashcards from
+            count: Number of flashcards to generate
+
+        Returns:
+            FlashcardBatch containing the generated flashcards
+        """
+        logger.info(f"Generating {count} flashcards from {'text' if text else 'image'} (async)")
+        self._validate_input(text, image)
+
+        cache_key = self._cache_key(text, [image] if image else [], count)
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            logger.info(f"Returning {len(cached.flashcards)} cached flashcards")
+            return cached
+
+        if text and len(text) > self.chunk_chars:
+            result = await self._agenerate_chunked(text, count)
+        else:
+            result = await self._ainvoke_model(text, [image] if image else [], count)
+
+        await self._cache_set(cache_key, result)
+        return result
+
+    async def agenerate_flashcards_from_images(self, images: list[bytes], count: int = 5) -> FlashcardBatch:
+        """Generate one deduplicated batch of flashcards from several images.
+
+        Up to `images_per_call` images are sent together in one multimodal
+        message, so a multi-page lesson needs one or a few model calls instead
+        of one call per page, and the prompt is only sent once per group.
+
+        Args:
+            images: Image bytes of the lesson pages, in order
+            count: Total number of flashcards to generate
+
+        Returns:
+            FlashcardBatch containing the generated flashcards
+        """
+        logger.info(f"Generating {count} flashcards from {len(images)} images (async)")
+        if not images:
+            logger.error("No images provided")
+            raise ValueError("Provide at least one image")
+        if len(images) == 1:
+            return await self.agenerate_flashcards(image=images[0], count=count)
+
+        cache_key = self._cache_key(None, images, count)
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            logger.info(f"Returning {len(cached.flashcards)} cached flashcards")
+            return cached
+
+        parts = self._image_parts(images, count)
+        logger.info(f"Sending {len(images)} images in {len(parts)} model calls")
+
+        batches = await asyncio.gather(*[
+            self._ainvoke_model(None, group, group_count) for group, group_count in parts
+        ])
+        result = merge_batches(list(batches), count)
+        logger.info(f"Merged {sum(len(batch.flashcards) for batch in batches)} flashcards into {len(result.flashcards)}")
+
+        await self._cache_set(cache_key, result)
+        return result
+
+    async def astream_flashcards(self, text: str | None = None, images: list[bytes] | None = None, count: int = 5) -> AsyncIterator[GeneratedFlashcard]:
+        """Generate flashcards and yield each one as soon as it has been parsed from the model output.
+
+        Long texts and more than `images_per_call` images are split over several
+        model calls and the cards of each call are yielded when that call is
+        done. Duplicate fronts are skipped and at most `count` cards are
+        yielded. The complete result is cached like the non-streaming methods.
+
+        Args:
+            text: Text content to generate flashcards from
+            images: Image bytes of one or more lesson pages
+            count: Number of flashcards to generate
+        """
+        images = images or []
+        logger.info(f"Streaming {count} flashcards from {'text' if text else f'{len(images)} images'}")
+        if text and images:
+            logger.error("Both text and images provided - only one is allowed")
+            raise ValueError("Provide either text or image, not both")
+        if not text and not images:
+            logger.error("Neither text nor images provided")
+            raise ValueError("Provide either text or image input")
+
+        cache_key = self._cache_key(text, images, count)
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            logger.info(f"Streaming {len(cached.flashcards)} cached flashcards")
+            for card in cached.flashcards:
+                yield card
+            return
+
+        seen = set()
+        cards = []
+
+        def accept(card: GeneratedFlashcard) -> bool:
+            normalized = re.sub(r"[\W_]+", "", card.front.casefold())
+            if len(cards) >= count or normalized in seen:
+                return False
+            seen.add(normalized)
+            cards.append(card)
+            return True
+
+        calls = []
+        if text and len(text) > self.chunk_chars:
+            calls = [(chunk, [], chunk_count) for chunk, chunk_count in self._text_parts(text, count)]
+        elif len(images) > self.images_per_call:
+            calls = [(None, group, group_count) for group, group_count in self._image_parts(images, count)]
+
+        if calls:
+            # Too much input for one call: yield the cards of each call as soon as it finishes
+            fanout = asyncio.Semaphore(self.chunk_fanout)
+
+            async def generate_part(part_text, part_images, part_count) -> FlashcardBatch:
+                async with fanout:
+                    return await self._ainvoke_model(part_text, part_images, part_count)
+
+            logger.info(f"Streaming flashcards from {len(calls)} model calls")
+            tasks = [asyncio.ensure_future(generate_part(*call)) for call in calls]
+            last_error = None
+            try:
+                for finished in asyncio.as_completed(tasks):
+                    try:
+                        batch = await finished
+                    except Exception as e:
+                        logger.warning(f"Model call failed during streamed generation: {str(e)}")
+                        last_error = e
+                        continue
+                    for card in batch.flashcards:
+                        if accept(card):
+                            yield card
+            finally:
+                for task in tasks:
+                    task.cancel()
+            if not cards and last_error is not None:
+                # Every call failed, report why instead of an empty result
+                raise last_error
+        else:
+            self._ensure_initialized()
+            prepared = await asyncio.gather(*[asyncio.to_thread(preprocess_image, image) for image in images])
+            message = self._build_message(text, list(prepared), count)
+            if isinstance(message.content, str):
+                message = HumanMessage(content=message.content + JSON_LINES_INSTRUCTION)
+            else:
+                message = HumanMessage(content=message.content + [{"type": "text", "text": JSON_LINES_INSTRUCTION}])
+
+            parser = JsonLinesCardParser()
+            async with self._get_semaphore():
+                logger.info("Streaming LLM model output for flashcard generation")
+                async for chunk in self.stream_model.astream([message]):
+                    for card in parser.feed(chunk_text(chunk.content)):
+                        if accept(card):
+                            yield card
+                    if len(cards) >= count:
+                        # Enough cards, stop paying for output we would drop
+                        break
+                for card in parser.close():
+                    if accept(card):
+                        yield card
+
+        result = self._check_result(FlashcardBatch(flashcards=cards))
+        await self._cache_set(cache_key, result)
+
 
 _llm_service = None
 
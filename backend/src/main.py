@@ -1,6 +1,7 @@
 import sys
 import os
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
@@ -21,9 +22,24 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-from routers import authentication, decks, flashcards, llm
+from routers import authentication, decks, flashcards, llm, reviews, metrics
+from routers import authentication_async, decks_async, flashcards_async
+from src.database import USE_ASYNC_DB, dispose_async_engine
+from src.generation_jobs import get_job_queue
+from src.request_limits import BodySizeLimitMiddleware
+from src.utils import get_password_hasher
 
-app = FastAPI(title="BetterAnk API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the background generation workers for the lifetime of the app and stop all worker pools on shutdown."""
+    job_queue = get_job_queue()
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    get_password_hasher().shutdown()
+    await dispose_async_engine()
+
+app = FastAPI(title="BetterAnk API", lifespan=lifespan)
 
 # Request logging middleware
 @app.middleware("http")
@@ -41,10 +57,22 @@ async def log_requests(request: Request, call_next):
 
     return response
 
-app.include_router(authentication.router)
-app.include_router(decks.router)
-app.include_router(flashcards.router)
+# Oversized image uploads are rejected while they arrive, not after they were spooled to disk
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=llm.LLM_MAX_UPLOAD_REQUEST_BYTES, paths=llm.UPLOAD_PATHS)
+
+if USE_ASYNC_DB:
+    # Same endpoints, served from the async engine instead of the threadpool
+    logger.info("Serving authentication, decks and flashcards from the async database engine")
+    app.include_router(authentication_async.router)
+    app.include_router(decks_async.router)
+    app.include_router(flashcards_async.router)
+else:
+    app.include_router(authentication.router)
+    app.include_router(decks.router)
+    app.include_router(flashcards.router)
+app.include_router(reviews.router)
 app.include_router(llm.router)
+app.include_router(metrics.router)
 
 # we serve frontend as static files from the same server 
 frontend_path = os.path.join(os.path.dirname(__file__), "../../frontend/src")
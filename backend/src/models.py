@@ -1,9 +1,10 @@
 from datetime import datetime
 from pydantic import BaseModel, ConfigDict, EmailStr, Field
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLAlchemyEnum, Float
+from sqlalchemy import Column, Integer, String, Text, LargeBinary, DateTime, ForeignKey, Enum as SQLAlchemyEnum, Float, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 from enum import Enum
+from uuid import uuid4
 
 class Message(BaseModel):
     message: str
@@ -14,6 +15,22 @@ class ReviewFeedback(str, Enum):
     MID = "mid"
     BAD = "bad"
 
+class FlashcardOrder(str, Enum):
+    """Sort orders of flashcard listings."""
+    CREATED_AT = "created_at"
+    NEXT_REVIEW_AT = "next_review_at"
+
+class SchedulerName(str, Enum):
+    """Spaced repetition algorithms a user or deck can choose, see src/spaced_repetition.py."""
+    SM2 = "sm2"
+    FSRS = "fsrs"
+
+class GenerationJobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
 ### Database models ###
 class DBFlashcard(Base):
     """SQLAlchemy model for flashcards table in the database."""
@@ -22,38 +39,59 @@ class DBFlashcard(Base):
     id = Column(Integer, primary_key=True, index=True)
     front = Column(String, nullable=False)
     back = Column(String, nullable=False)
-    created_at = Column(DateTime, default=datetime.now)
+    # Sort keys of the cursor pagination, which cannot continue after a NULL
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
     last_reviewed_at = Column(DateTime, nullable=True)
-    next_review_at = Column(DateTime, default=datetime.now, index=True)
+    next_review_at = Column(DateTime, default=datetime.now, nullable=False, index=True)
     review_count = Column(Integer, default=0)
     easiness_factor = Column(Float, default=2.5, nullable=False)
     interval = Column(Integer, default=1, nullable=False)
     repetitions = Column(Integer, default=0, nullable=False)
-    reviews = relationship("DBReview", back_populates="flashcard", cascade="all, delete-orphan") # cascade means that if a flashcard is deleted, all its reviews will also be deleted
+    # FSRS memory state, NULL until the card is reviewed with FSRS
+    stability = Column(Float, nullable=True)   # days until recall probability drops to 90%
+    difficulty = Column(Float, nullable=True)  # 1 (easy) to 10 (hard)
+    # The database deletes the reviews of a deleted flashcard (ON DELETE CASCADE), passive_deletes keeps the ORM from loading them first
+    reviews = relationship("DBReview", back_populates="flashcard", cascade="all, delete-orphan", passive_deletes=True)
 
     # Adding deck relationship
-    deck_id = Column(Integer, ForeignKey("decks.id"), nullable=True, index=True)  # Nullable because a card might not belong to a deck initially
+    deck_id = Column(Integer, ForeignKey("decks.id", ondelete="CASCADE"), nullable=True, index=True)  # Nullable because a card might not belong to a deck initially
     deck = relationship("DBDeck", back_populates="flashcards")
 
     # Adding user relationship
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     user = relationship("DBUser", back_populates="flashcards")
 
+    __table_args__ = (
+        # Due cards of a deck: user_id = ? AND deck_id = ? AND next_review_at <= now
+        Index("ix_flashcards_user_deck_next_review", "user_id", "deck_id", "next_review_at"),
+        # Due cards of a user across all decks
+        Index("ix_flashcards_user_next_review", "user_id", "next_review_at"),
+        # Card listings of a deck and of a user, paged by (created_at, id)
+        Index("ix_flashcards_user_deck_created", "user_id", "deck_id", "created_at"),
+        Index("ix_flashcards_user_created", "user_id", "created_at"),
+    )
+
 class DBReview(Base):
     """SQLAlchemy model for reviews table in the database."""
     __tablename__ = "reviews"
 
     id = Column(Integer, primary_key=True, index=True)
-    flashcard_id = Column(Integer, ForeignKey("flashcards.id"), nullable=False, index=True)
+    flashcard_id = Column(Integer, ForeignKey("flashcards.id", ondelete="CASCADE"), nullable=False, index=True)
     review_at = Column(DateTime, default=datetime.now, nullable=False)
     feedback = Column(SQLAlchemyEnum(ReviewFeedback), nullable=False)
+    elapsed_ms = Column(Integer, nullable=True)  # time the user needed to answer, if the client measured it
 
     flashcard = relationship("DBFlashcard", back_populates="reviews")
 
     # Adding user relationship
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     user = relationship("DBUser", back_populates="reviews")
 
+    __table_args__ = (
+        # Review history of a user by card and time, streamed by src/replay_reviews.py
+        Index("ix_reviews_user_flashcard_review_at", "user_id", "flashcard_id", "review_at"),
+    )
+
 class DBDeck(Base):
     """SQLAlchemy model for decks table in the database."""
     __tablename__ = "decks"
@@ -61,15 +99,22 @@ class DBDeck(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
     description = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.now)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)  # Sort key of the cursor pagination
+    scheduler = Column(SQLAlchemyEnum(SchedulerName), nullable=True)  # NULL uses the user's scheduler
     
     # Relationship with flashcards
-    flashcards = relationship("DBFlashcard", back_populates="deck", cascade="all, delete-orphan")  # cascade means that if a deck is deleted, all its flashcards will also be deleted
+    # The database deletes the flashcards of a deleted deck, and their reviews (ON DELETE CASCADE)
+    flashcards = relationship("DBFlashcard", back_populates="deck", cascade="all, delete-orphan", passive_deletes=True)
 
     # Adding user relationship
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     user = relationship("DBUser", back_populates="decks")
 
+    __table_args__ = (
+        # Deck listing, paged by (created_at, id)
+        Index("ix_decks_user_created", "user_id", "created_at"),
+    )
+
 class DBUser(Base):
     """SQLAlchemy model for users table in the database."""
     __tablename__ = "users"
@@ -79,10 +124,55 @@ class DBUser(Base):
     email = Column(String, unique=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.now)
+    scheduler = Column(SQLAlchemyEnum(SchedulerName), nullable=True)  # NULL uses DEFAULT_SCHEDULER
+
+    # Everything of a deleted user is deleted by the database (ON DELETE CASCADE)
+    decks = relationship("DBDeck", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    flashcards = relationship("DBFlashcard", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    reviews = relationship("DBReview", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    generation_jobs = relationship("DBGenerationJob", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+
+class DBGenerationJob(Base):
+    """SQLAlchemy model for background LLM flashcard generation jobs."""
+    __tablename__ = "generation_jobs"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    source = Column(String, nullable=False)  # "text", "image" or "images"
+    text = Column(Text, nullable=True)
+    image = Column(LargeBinary, nullable=True)  # cleared once the job has finished
+    num_cards = Column(Integer, nullable=False)
+    deck_id = Column(Integer, nullable=True)  # deck the cards are meant for, only informational
+    status = Column(SQLAlchemyEnum(GenerationJobStatus), default=GenerationJobStatus.PENDING, nullable=False, index=True)
+    result = Column(Text, nullable=True)  # FlashcardBatch serialized as JSON
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    started_at = Column(DateTime, nullable=True)  # time of the current claim by a worker
+    heartbeat_at = Column(DateTime, nullable=True)  # refreshed by the worker running the job, see GENERATION_JOB_LEASE_SECONDS
+    finished_at = Column(DateTime, nullable=True)
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user = relationship("DBUser", back_populates="generation_jobs")
+    images = relationship(
+        "DBGenerationJobImage", order_by="DBGenerationJobImage.position",
+        cascade="all, delete-orphan", passive_deletes=True
+    )
 
-    decks = relationship("DBDeck", back_populates="user", cascade="all, delete-orphan")
-    flashcards = relationship("DBFlashcard", back_populates="user", cascade="all, delete-orphan")
-    reviews = relationship("DBReview", back_populates="user", cascade="all, delete-orphan") 
+class DBGenerationJobImage(Base):
+    """SQLAlchemy model for the uploaded pages of an "images" generation job, deleted once the job has finished."""
+    __tablename__ = "generation_job_images"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String(36), ForeignKey("generation_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    position = Column(Integer, nullable=False)  # page order of the upload
+    data = Column(LargeBinary, nullable=False)  # downscaled image, see preprocess_image
+
+class DBGenerationCacheEntry(Base):
+    """SQLAlchemy model for the persistent tier of the LLM response cache."""
+    __tablename__ = "llm_generation_cache"
+
+    key = Column(String(64), primary_key=True)  # sha256 of prompt version, card count and input
+    response = Column(Text, nullable=False)  # FlashcardBatch serialized as JSON
+    created_at = Column(DateTime, default=datetime.now, nullable=False, index=True)  # Expired rows are pruned by age
 
 ### Pydantic models ###
 
@@ -93,11 +183,35 @@ class Deck(BaseModel):
     name: str
     description: str | None = None
     created_at: datetime | None = None
+    scheduler: SchedulerName | None = None  # None uses the user's scheduler
 
 class UpdateDeck(BaseModel):
-    """Update the name and/or description of a Deck."""
+    """Update the name, description and/or scheduler of a Deck."""
     name: str | None = None
     description: str | None = None
+    scheduler: SchedulerName | None = None  # set to null explicitly to use the user's scheduler again
+
+class DeckStats(BaseModel):
+    """Card counts of a deck."""
+    deck_id: int
+    total: int
+    due: int       # next review is now or in the past
+    new: int       # never reviewed
+    learning: int  # reviewed, interval shorter than 21 days
+    mature: int    # interval of 21 days or more
+
+class BulkMoveFlashcards(BaseModel):
+    """Flashcards to move into a deck: the given ids, or all cards of another deck."""
+    flashcard_ids: list[int] | None = Field(default=None, min_length=1, max_length=5000)
+    from_deck_id: int | None = None
+
+class BulkRemoveFlashcards(BaseModel):
+    """Flashcards to remove from a deck, all cards of the deck if no ids are given."""
+    flashcard_ids: list[int] | None = Field(default=None, min_length=1, max_length=5000)
+
+class BulkUpdateResult(BaseModel):
+    """Number of flashcards changed by a bulk operation."""
+    updated: int
 
 class UpdateFlashcard(BaseModel):
     """Update the front and/or back of a flashcard."""
@@ -111,11 +225,44 @@ class Review(BaseModel):
     flashcard_id: int
     review_at: datetime = datetime.now()
     feedback: ReviewFeedback
+    elapsed_ms: int | None = None
 
 class ReviewCreate(BaseModel):
     """Request body for creating a review."""
     feedback: ReviewFeedback
 
+class ReviewBatchItem(BaseModel):
+    """One review in a batch, as recorded by the client."""
+    flashcard_id: int
+    feedback: ReviewFeedback
+    reviewed_at: datetime | None = None  # defaults to the time the batch is received
+    elapsed_ms: int | None = Field(default=None, ge=0)
+
+class ReviewBatchCreate(BaseModel):
+    """Request body for submitting several reviews at once, in the order they happened."""
+    reviews: list[ReviewBatchItem] = Field(min_length=1, max_length=1000)
+
+class ReviewBatchResponse(BaseModel):
+    """Result of a batch review submission."""
+    reviewed: int
+    # Flashcards whose reviews were not stored because they do not exist or belong to another user
+    skipped: list[int] = []
+    message: str
+
+class ReviewQueueCard(BaseModel):
+    """A due card as shown on the review page."""
+    id: int
+    front: str
+    back: str
+    is_new: bool  # never reviewed before
+
+class ReviewQueuePage(BaseModel):
+    """One page of a deck's due cards, most overdue first."""
+    cards: list[ReviewQueueCard]
+    next_cursor: str | None  # pass as cursor to get the next page, None on the last page
+    new_remaining: int       # new cards left in today's allowance after this page
+    reviews_remaining: int   # review cards left in today's allowance after this page
+
 class Flashcard(BaseModel):
     """Represents a flashcard."""
     model_config = ConfigDict(from_attributes=True) # to allow conversion from SQLAlchemy model
@@ -129,13 +276,29 @@ class Flashcard(BaseModel):
     easiness_factor: float = 2.5
     interval: int = 1
     repetitions: int = 0
+    stability: float | None = None
+    difficulty: float | None = None
     deck_id: int | None = None  
 
+class BulkFlashcardItem(BaseModel):
+    """Front and back of one flashcard in a bulk create request."""
+    front: str
+    back: str
+
+class BulkFlashcardCreate(BaseModel):
+    """Request body for creating many flashcards in one deck at once."""
+    deck_id: int | None = None
+    flashcards: list[BulkFlashcardItem] = Field(min_length=1, max_length=5000)
+
 class UserCreate(BaseModel):
     username: str
     email: EmailStr
     password: str
 
+class UpdateScheduler(BaseModel):
+    """Request body for choosing the scheduler of the current user, null for the server default."""
+    scheduler: SchedulerName | None
+
 class UserLogin(BaseModel):
     username: str
     password: str
@@ -145,6 +308,7 @@ class UserResponse(BaseModel):
     username: str
     email: str
     created_at: datetime
+    scheduler: SchedulerName | None = None  # None uses the server default
 
     class Config:
         from_attributes = True
@@ -163,6 +327,12 @@ class LLMGenerateFromImageRequest(BaseModel):
     deck_id: int | None = None
     additional_text: str | None = None
 
+class LLMGenerateFromImagesRequest(BaseModel):
+    """Request body for LLM flashcard generation from several images of one lesson."""
+    images_base64: list[str] = Field(min_length=1)  # Base64 encoded images, in page order
+    num_cards: int = 2
+    deck_id: int | None = None
+
 class LLMGeneratedFlashcardResponse(BaseModel):
     """Response for a single generated flashcard (not yet saved to DB)."""
     front: str
@@ -172,3 +342,58 @@ class LLMGenerateBatchResponse(BaseModel):
     """Response containing a batch of generated flashcards."""
     flashcards: list[LLMGeneratedFlashcardResponse]
     message: str
+
+class GenerationJob(BaseModel):
+    """Status of a background flashcard generation job."""
+    id: str
+    status: GenerationJobStatus
+    source: str
+    num_cards: int
+    deck_id: int | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    flashcards: list[LLMGeneratedFlashcardResponse] | None = None  # set once the job succeeded
+    error: str | None = None
+
+class LLMCacheStats(BaseModel):
+    """Counters of the LLM response cache."""
+    hits: int
+    persistent_hits: int
+    misses: int
+    hit_rate: float
+    entries: int
+    max_entries: int
+    ttl_seconds: int
+    persistent: bool
+
+class PasswordHashingStats(BaseModel):
+    """Queue depth and counters of the password hashing pool."""
+    workers: int
+    bcrypt_rounds: int
+    pending: int  # hashes submitted and not yet finished
+    queued: int   # pending hashes waiting for a free worker
+    max_pending: int
+    completed: int
+
+class DatabasePoolStats(BaseModel):
+    """Usage and checkout wait times of a database connection pool."""
+    pool_class: str
+    size: int
+    max_overflow: int
+    in_use: int          # connections currently checked out
+    max_in_use: int
+    idle: int            # pooled connections not checked out
+    checkouts: int
+    connects: int        # new connections opened
+    overflow_connects: int  # connections opened beyond the pool size
+    invalidations: int
+    timeouts: int        # checkouts that gave up waiting for a connection
+    wait_ms_avg: float
+    wait_ms_max: float
+
+class Metrics(BaseModel):
+    """Runtime metrics of this process."""
+    password_hashing: PasswordHashingStats
+    database_pools: dict[str, DatabasePoolStats]
+    llm_cache: LLMCacheStats
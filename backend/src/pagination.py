@@ -0,0 +1,69 @@
+"""
+Opaque cursors for keyset pagination.
+
+A cursor holds the sort key of the last row of a page, the next page continues after it
+with a WHERE (sort key) > (cursor) condition instead of an OFFSET, so every page is an
+index range scan no matter how deep the client has paged.
+"""
+import json
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_
+
+from src.models import DBFlashcard, FlashcardOrder
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor was not created by encode_cursor or has the wrong shape."""
+
+
+def encode_cursor(*values) -> str:
+    """Encode the sort key values of the last row of a page. Datetimes are stored as ISO strings."""
+    payload = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types: type) -> tuple:
+    """Decode a cursor into values of the given types, e.g. decode_cursor(c, datetime, int)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise InvalidCursor("Invalid cursor")
+        return tuple(
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value_type, value in zip(types, values)
+        )
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+def paginate(query, sort_column, id_column, cursor: str | None, limit: int):
+    """Order a query by (sort_column, id_column) and continue after the row the cursor points to.
+
+    Works for both Query and select(). The cursor names the sort column, a cursor of a
+    differently ordered listing is rejected.
+    """
+    if cursor is not None:
+        sort_key, after_value, after_id = decode_cursor(cursor, str, sort_column.type.python_type, int)
+        if sort_key != sort_column.key:
+            raise InvalidCursor("Cursor belongs to a different ordering")
+        query = query.where(tuple_(sort_column, id_column) > tuple_(after_value, after_id))
+    return query.order_by(sort_column, id_column).limit(limit)
+
+def next_page_cursor(items: list, limit: int, sort_column) -> str | None:
+    """Cursor after the last item of a page, None if the page was not full and therefore the last one."""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(sort_column.key, getattr(last, sort_column.key), last.id)
+
+def set_next_cursor(response, items: list, limit: int, sort_column):
+    """Put the cursor of the next page into the X-Next-Cursor header of a listing, if there is a next page."""
+    next_cursor = next_page_cursor(items, limit, sort_column)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+def flashcard_sort_column(order_by: FlashcardOrder | None, due: bool):
+    """Sort column of a flashcard listing, due cards default to the most overdue first."""
+    if order_by is None:
+        order_by = FlashcardOrder.NEXT_REVIEW_AT if due else FlashcardOrder.CREATED_AT
+    return getattr(DBFlashcard, order_by.value)
@@ -0,0 +1,186 @@
+"""
+Rebuild the scheduling state of flashcards from the reviews table.
+
+The schedule columns of a card (easiness_factor, interval, repetitions, review_count,
+stability, difficulty, next_review_at, last_reviewed_at) are updated in place on every
+review, so after a fix to an algorithm or a change of scheduler they can only be corrected
+by replaying the stored reviews. The replay streams each user's reviews ordered by card and
+time through a server-side cursor, schedules them chunk by chunk with the current scheduler
+of each card's deck or user and writes the cards back with bulk UPDATEs, so memory stays
+bounded by the chunk size however long the history is. Each user's cards are rebuilt in one
+transaction.
+
+Cards without reviews are left as they are. Reviews submitted while a user's history is
+replayed can be overwritten, run it while the API is stopped or at a quiet time.
+
+Usage (from backend/):
+    python -m src.replay_reviews [--user-id ID] [--chunk-size 10000] [--dry-run]
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Callable, NamedTuple
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from src.models import DBDeck, DBFlashcard, DBReview, DBUser
+from src.spaced_repetition import BatchState, Scheduler, feedback_array, schedule_in_rounds, scheduler_for
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class ReplayStats(NamedTuple):
+    """Totals of a replay run."""
+    users: int
+    reviews: int
+    cards: int
+    seconds: float
+
+    @property
+    def reviews_per_second(self) -> float:
+        return self.reviews / self.seconds if self.seconds else 0.0
+
+
+class CardStates(NamedTuple):
+    """Schedule of the cards of one chunk, one element per card in stream order."""
+    card_ids: np.ndarray
+    state: BatchState
+
+    def update_rows(self, positions: slice) -> list[dict]:
+        """Rows for a bulk UPDATE of flashcards by primary key."""
+        return [
+            {"id": card_id, **values}
+            for card_id, values in zip(self.card_ids[positions].tolist(), self.state.take(positions).rows())
+        ]
+
+
+def review_history_statement(user_id: int):
+    """A user's reviews ordered by card and time, an ordered scan of ix_reviews_user_flashcard_review_at."""
+    return (
+        select(DBReview.flashcard_id, DBReview.review_at, DBReview.feedback)
+        .where(DBReview.user_id == user_id)
+        .order_by(DBReview.flashcard_id, DBReview.review_at, DBReview.id)
+    )
+
+def replay_chunk(rows: list, carried: CardStates | None, schedulers_of: Callable[[np.ndarray], list[Scheduler]]) -> CardStates:
+    """
+    Apply a chunk of reviews, ordered by card and time, to the initial schedule of their cards.
+    The first card continues from `carried` if its reviews started in the previous chunk.
+    `schedulers_of` returns the scheduler of each of the given card ids.
+    """
+    card_ids, review_times, feedback = zip(*rows)
+    card = np.array(card_ids, dtype=np.int64)
+    # Much faster than letting NumPy convert each datetime object
+    review_at = np.array([(time - EPOCH) // MICROSECOND for time in review_times], dtype=np.int64).view("datetime64[us]")
+
+    # Rows of a card are consecutive, number each card's reviews 0, 1, 2, ...
+    is_first = np.empty(len(rows), dtype=bool)
+    is_first[0] = True
+    np.not_equal(card[1:], card[:-1], out=is_first[1:])
+    first_row = np.flatnonzero(is_first)
+    position = np.cumsum(is_first) - 1
+    occurrence = np.arange(len(rows)) - first_row[position]
+
+    states = CardStates(card[first_row], BatchState.new(len(first_row)))
+    if carried is not None and carried.card_ids[-1] == states.card_ids[0]:
+        states.state.put(0, carried.state.take(-1))
+
+    schedule_in_rounds(states.state, position, occurrence, feedback_array(feedback), review_at, schedulers_of(states.card_ids))
+    return states
+
+def replay_user(db: Session, user_id: int, chunk_size: int = 10000) -> tuple[int, int]:
+    """
+    Rebuild the schedule of every reviewed card of a user. Returns (reviews, cards).
+    The caller commits, the UPDATEs run on the same connection as the open cursor.
+    """
+    user_scheduler = db.scalar(select(DBUser.scheduler).where(DBUser.id == user_id))
+    deck_schedulers = dict(db.execute(
+        select(DBDeck.id, DBDeck.scheduler).where(DBDeck.user_id == user_id, DBDeck.scheduler.is_not(None))
+    ).all())
+
+    def schedulers_of(card_ids: np.ndarray) -> list[Scheduler]:
+        if not deck_schedulers:
+            return [scheduler_for(user_scheduler)] * len(card_ids)
+        # Only users with a deck of its own scheduler need the decks of the chunk's cards
+        deck_of = dict(db.connection().execute(
+            select(DBFlashcard.id, DBFlashcard.deck_id).where(DBFlashcard.id.in_(card_ids.tolist()))
+        ).all())
+        return [scheduler_for(deck_schedulers.get(deck_of.get(card_id)), user_scheduler) for card_id in card_ids.tolist()]
+
+    # Core execution on the session's connection, the rows are plain tuples without ORM loading
+    result = db.connection().execute(review_history_statement(user_id).execution_options(yield_per=chunk_size))
+    reviews = cards = 0
+    states = None
+    for rows in result.partitions():
+        chunk_states = replay_chunk(rows, states, schedulers_of)
+        reviews += len(rows)
+        # The last card of a chunk may have more reviews in the next one, so it is written one chunk later
+        if states is not None and states.card_ids[-1] != chunk_states.card_ids[0]:
+            db.execute(update(DBFlashcard), states.update_rows(slice(-1, None)))
+            cards += 1
+        finished = slice(0, len(chunk_states.card_ids) - 1)
+        if finished.stop:
+            db.execute(update(DBFlashcard), chunk_states.update_rows(finished))
+            cards += finished.stop
+        states = chunk_states
+    if states is not None:
+        db.execute(update(DBFlashcard), states.update_rows(slice(-1, None)))
+        cards += 1
+    return reviews, cards
+
+def replay(db: Session, user_ids: list[int] | None = None, chunk_size: int = 10000, dry_run: bool = False) -> ReplayStats:
+    """Replay the review history of the given users, or of all users, committing once per user."""
+    if user_ids is None:
+        user_ids = db.scalars(select(DBUser.id).order_by(DBUser.id)).all()
+
+    start = time.perf_counter()
+    total_reviews = total_cards = 0
+    for user_id in user_ids:
+        try:
+            # A dry run undoes the UPDATEs by rolling back to a savepoint
+            savepoint = db.begin_nested() if dry_run else None
+            reviews, cards = replay_user(db, user_id, chunk_size)
+            if savepoint is not None:
+                savepoint.rollback()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Replaying the reviews of user {user_id} failed: {str(e)}", exc_info=True)
+            raise
+        total_reviews += reviews
+        total_cards += cards
+        logger.info(f"User {user_id}: replayed {reviews} reviews of {cards} flashcards")
+
+    return ReplayStats(len(user_ids), total_reviews, total_cards, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    from src.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=int, action="append", help="replay only this user, can be repeated")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="reviews fetched and scheduled at a time")
+    parser.add_argument("--dry-run", action="store_true", help="compute the schedules but roll back instead of writing them")
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+
+    db = SessionLocal()
+    try:
+        stats = replay(db, args.user_id, args.chunk_size, args.dry_run)
+    finally:
+        db.close()
+    print(
+        f"Replayed {stats.reviews} reviews of {stats.cards} flashcards for {stats.users} users "
+        f"in {stats.seconds:.1f}s ({stats.reviews_per_second:,.0f} reviews/s)"
+        + (", dry run, nothing written" if args.dry_run else "")
+    )
@@ -0,0 +1,56 @@
+"""
+Request body limits enforced before the body is parsed.
+
+FastAPI parses multipart forms, and spools the uploaded files to disk, before
+the endpoint runs, so a size check in the endpoint only happens after the
+whole body has been received. This middleware rejects oversized bodies while
+they arrive instead.
+"""
+import logging
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+
+class BodySizeLimitMiddleware:
+    """Reject request bodies larger than max_bytes on the given path prefixes with 413.
+
+    A Content-Length over the limit is rejected before any of the body is read,
+    bodies without one (chunked) are counted while they are received.
+    """
+
+    def __init__(self, app, max_bytes: int, paths: tuple[str, ...]):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = paths
+
+    def _too_large(self) -> str:
+        return f"Request body exceeds the limit of {self.max_bytes} bytes"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            logger.warning(f"Rejected {scope['method']} {scope['path']} with a body of {int(content_length)} bytes")
+            response = JSONResponse({"detail": self._too_large()}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    logger.warning(f"Rejected {scope['method']} {scope['path']} after {received} bytes of its body")
+                    # Raised inside the body parsing of the endpoint, which turns it into the response
+                    raise HTTPException(status_code=413, detail=self._too_large())
+            return message
+
+        await self.app(scope, limited_receive, send)
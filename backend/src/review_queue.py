@@ -0,0 +1,124 @@
+"""
+Due-card queue of a deck for the review page.
+
+Cards are served in order of urgency (next_review_at, then id) with keyset pagination.
+Daily limits cap how many new cards (never reviewed) and how many review cards are
+studied per deck and day. The statements are shared by the sync and the async decks router.
+"""
+import os
+import hmac
+import hashlib
+from datetime import datetime, time
+from sqlalchemy import select, func, distinct, exists, tuple_
+from sqlalchemy.orm import aliased
+
+from src.models import DBFlashcard, DBReview, ReviewQueueCard, ReviewQueuePage
+from src.pagination import InvalidCursor, encode_cursor, decode_cursor
+from src.auth import JWT_SECRET_KEY
+
+# Cards per deck and day, counted from local midnight
+REVIEW_QUEUE_NEW_PER_DAY = int(os.getenv("REVIEW_QUEUE_NEW_PER_DAY", "20"))
+REVIEW_QUEUE_REVIEWS_PER_DAY = int(os.getenv("REVIEW_QUEUE_REVIEWS_PER_DAY", "200"))
+
+
+def studied_today_statement(user_id: int, deck_id: int, now: datetime):
+    """Count the cards of a deck reviewed today, and how many of them were reviewed for the first time."""
+    day_start = datetime.combine(now.date(), time.min)
+    earlier = aliased(DBReview)
+    first_review_today = ~exists().where(
+        earlier.flashcard_id == DBReview.flashcard_id,
+        earlier.review_at < day_start,
+    )
+    return (
+        select(
+            func.count(distinct(DBReview.flashcard_id)),
+            func.count(distinct(DBReview.flashcard_id)).filter(first_review_today),
+        )
+        .join(DBFlashcard, DBFlashcard.id == DBReview.flashcard_id)
+        .where(
+            DBReview.user_id == user_id,
+            DBReview.review_at >= day_start,
+            DBFlashcard.deck_id == deck_id,
+        )
+    )
+
+def remaining_today(studied: int, studied_new: int) -> tuple[int, int]:
+    """New and review cards left in today's allowance."""
+    return (
+        max(REVIEW_QUEUE_NEW_PER_DAY - studied_new, 0),
+        max(REVIEW_QUEUE_REVIEWS_PER_DAY - (studied - studied_new), 0),
+    )
+
+def cursor_signature(user_id: int, deck_id: int, now: datetime, after_due: datetime, after_id: int,
+                     new_left: int, reviews_left: int) -> str:
+    """HMAC of a cursor's values, bound to the user, the deck and the day the allowance was counted on."""
+    message = f"{user_id}:{deck_id}:{now.date().isoformat()}:{after_due.isoformat()}:{after_id}:{new_left}:{reviews_left}"
+    return hmac.new(JWT_SECRET_KEY.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+def read_cursor(cursor: str, user_id: int, deck_id: int, now: datetime) -> tuple[tuple[datetime, int], int, int]:
+    """Position and remaining allowance stored in a cursor. The allowance is fixed by the first
+    page, so cards reviewed while the client pages through the queue are not counted twice.
+
+    The cursor is signed, an edited allowance or a cursor of another user, deck or day is rejected.
+    """
+    after_due, after_id, new_left, reviews_left, signature = decode_cursor(cursor, datetime, int, int, int, str)
+    expected = cursor_signature(user_id, deck_id, now, after_due, after_id, new_left, reviews_left)
+    if not hmac.compare_digest(signature, expected):
+        raise InvalidCursor("Invalid cursor signature")
+    return (after_due, after_id), new_left, reviews_left
+
+def page_statement(user_id: int, deck_id: int, now: datetime, limit: int,
+                   after: tuple[datetime, int] | None, new_left: int, reviews_left: int):
+    """Select the next due cards in order of (next_review_at, id), only the columns the review page needs.
+
+    The WHERE and ORDER BY match ix_flashcards_user_deck_next_review, so the due range is read
+    in order from the index instead of being sorted.
+    """
+    query = select(
+        DBFlashcard.id,
+        DBFlashcard.front,
+        DBFlashcard.back,
+        DBFlashcard.next_review_at,
+        DBFlashcard.review_count,
+    ).where(
+        DBFlashcard.user_id == user_id,
+        DBFlashcard.deck_id == deck_id,
+        DBFlashcard.next_review_at <= now,
+    )
+    if after is not None:
+        query = query.where(tuple_(DBFlashcard.next_review_at, DBFlashcard.id) > tuple_(*after))
+
+    # A kind whose allowance is used up is not read at all
+    if new_left <= 0:
+        query = query.where(DBFlashcard.review_count > 0)
+    if reviews_left <= 0:
+        query = query.where(DBFlashcard.review_count == 0)
+
+    return query.order_by(DBFlashcard.next_review_at, DBFlashcard.id).limit(limit)
+
+def build_page(rows, limit: int, new_left: int, reviews_left: int,
+               user_id: int, deck_id: int, now: datetime) -> ReviewQueuePage:
+    """Apply the daily allowance to the rows of a page and create the cursor of the next page."""
+    cards = []
+    for row in rows:
+        is_new = not row.review_count
+        if is_new and new_left > 0:
+            new_left -= 1
+        elif not is_new and reviews_left > 0:
+            reviews_left -= 1
+        else:
+            continue
+        cards.append(ReviewQueueCard(id=row.id, front=row.front, back=row.back, is_new=is_new))
+
+    next_cursor = None
+    if len(rows) == limit and (new_left > 0 or reviews_left > 0):
+        last = rows[-1]
+        signature = cursor_signature(user_id, deck_id, now, last.next_review_at, last.id, new_left, reviews_left)
+        next_cursor = encode_cursor(last.next_review_at, last.id, new_left, reviews_left, signature)
+
+    return ReviewQueuePage(
+        cards=cards,
+        next_cursor=next_cursor,
+        new_remaining=new_left,
+        reviews_remaining=reviews_left,
+    )
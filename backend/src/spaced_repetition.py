@@ -1,10 +1,135 @@
+"""
+Spaced repetition schedulers.
+
+A scheduler turns the state of a card and a review into the card's next state, one card
+at a time with `schedule` or many cards at once over NumPy arrays with `schedule_batch`.
+SM-2 and FSRS are available, users and decks choose one (SchedulerName), see scheduler_for.
+"""
+import os
 import logging
-from src.models import DBFlashcard, ReviewFeedback
+from typing import NamedTuple, Iterable, Protocol
+import numpy as np
+from src.models import DBFlashcard, ReviewFeedback, SchedulerName
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
-class SM2Algo: 
+# Scheduler of users and decks that did not choose one
+DEFAULT_SCHEDULER = SchedulerName(os.getenv("DEFAULT_SCHEDULER", "sm2"))
+
+# Recall probability FSRS schedules the next review at, higher means shorter intervals and more reviews
+FSRS_DESIRED_RETENTION = float(os.getenv("FSRS_DESIRED_RETENTION", "0.9"))
+FSRS_MAXIMUM_INTERVAL = int(os.getenv("FSRS_MAXIMUM_INTERVAL", "36500"))
+
+# Latest next review time a datetime can hold
+LATEST_REVIEW_AT = np.datetime64(datetime.max, "us")
+
+# Feedback as array indexes for the batch schedulers
+FEEDBACK_CODES = {ReviewFeedback.BAD: 0, ReviewFeedback.MID: 1, ReviewFeedback.GOOD: 2}
+
+def feedback_array(feedback: Iterable[ReviewFeedback]) -> np.ndarray:
+    """FEEDBACK_CODES of each feedback, also of the stored string values, as input for schedule_batch."""
+    # Members hash by name, also map their values so stored strings are looked up directly
+    codes = {**{item.value: code for item, code in FEEDBACK_CODES.items()}, **FEEDBACK_CODES}
+    return np.array([codes[item] for item in feedback], dtype=np.int64)
+
+class CardState(NamedTuple):
+    """Scheduling state of one card, the DBFlashcard columns a scheduler reads and writes."""
+    easiness_factor: float
+    interval: int
+    repetitions: int
+    review_count: int
+    stability: float | None
+    difficulty: float | None
+    next_review_at: datetime | None
+    last_reviewed_at: datetime | None
+
+    @classmethod
+    def of(cls, card) -> "CardState":
+        """State of a DBFlashcard or of a row with the same columns."""
+        return cls(*(getattr(card, column) for column in cls._fields))
+
+    def apply_to(self, card):
+        for column, value in self._asdict().items():
+            setattr(card, column, value)
+
+class BatchState(NamedTuple):
+    """Scheduling state of many cards, one array element per card. NaN and NaT stand for NULL."""
+    easiness_factor: np.ndarray   # float64
+    interval: np.ndarray          # int64, days
+    repetitions: np.ndarray       # int64
+    review_count: np.ndarray      # int64
+    stability: np.ndarray         # float64
+    difficulty: np.ndarray        # float64
+    next_review_at: np.ndarray    # datetime64[us]
+    last_reviewed_at: np.ndarray  # datetime64[us]
+
+    @classmethod
+    def of(cls, cards: list) -> "BatchState":
+        """State of DBFlashcards, CardState tuples or rows with the same columns."""
+        return cls(
+            np.array([card.easiness_factor for card in cards], dtype=np.float64),
+            np.array([card.interval for card in cards], dtype=np.int64),
+            np.array([card.repetitions for card in cards], dtype=np.int64),
+            np.array([card.review_count for card in cards], dtype=np.int64),
+            np.array([card.stability for card in cards], dtype=np.float64),  # None becomes NaN
+            np.array([card.difficulty for card in cards], dtype=np.float64),
+            np.array([card.next_review_at for card in cards], dtype="datetime64[us]"),  # None becomes NaT
+            np.array([card.last_reviewed_at for card in cards], dtype="datetime64[us]"),
+        )
+
+    @classmethod
+    def new(cls, count: int) -> "BatchState":
+        """State of cards that were never reviewed, see the column defaults of DBFlashcard."""
+        return cls(
+            np.full(count, 2.5),
+            np.ones(count, dtype=np.int64),
+            np.zeros(count, dtype=np.int64),
+            np.zeros(count, dtype=np.int64),
+            np.full(count, np.nan),
+            np.full(count, np.nan),
+            np.full(count, np.datetime64("NaT"), dtype="datetime64[us]"),
+            np.full(count, np.datetime64("NaT"), dtype="datetime64[us]"),
+        )
+
+    def take(self, index) -> "BatchState":
+        return BatchState(*(column[index] for column in self))
+
+    def put(self, index, other: "BatchState"):
+        for column, values in zip(self, other):
+            column[index] = values
+
+    def rows(self) -> list[dict]:
+        """Plain Python values per card, with None for NaN and NaT."""
+        columns = [
+            np.where(np.isnan(column), None, column).tolist() if name in ("stability", "difficulty") else column.tolist()
+            for name, column in zip(self._fields, self)
+        ]
+        return [dict(zip(self._fields, values)) for values in zip(*columns)]
+
+class Scheduler(Protocol):
+    """A spaced repetition algorithm."""
+    name: SchedulerName
+
+    def schedule(self, state: CardState, feedback: ReviewFeedback, now: datetime) -> CardState:
+        """State of a card after a review at `now`."""
+        ...
+
+    def schedule_batch(self, state: BatchState, feedback: np.ndarray, now: datetime | np.ndarray) -> BatchState:
+        """
+        State of each card after one review, `feedback` holds FEEDBACK_CODES and `now` is one
+        review time for all cards or one per card. Each card must appear once.
+        """
+        ...
+
+class SM2Batch(NamedTuple):
+    """New schedule of a batch of cards, one array element per card."""
+    easiness_factor: np.ndarray  # float64
+    interval: np.ndarray         # int64, days
+    repetitions: np.ndarray      # int64
+    next_review_at: np.ndarray   # datetime64[us]
+
+class SM2Algo:
 
     QUALITY = {
         ReviewFeedback.BAD: 0,
@@ -13,36 +138,212 @@ class SM2Algo:
     }
 
     @classmethod
-    def update_flashcard(cls, feedback: ReviewFeedback, flashcard: DBFlashcard):
-        quality = cls.QUALITY[feedback]
-        logger.debug(f"Updating flashcard {flashcard.id} with feedback: {feedback} (quality: {quality})")
-        logger.debug(f"Current state - repetitions: {flashcard.repetitions}, interval: {flashcard.interval}, EF: {flashcard.easiness_factor}")
+    def update_flashcard(cls, feedback: ReviewFeedback, flashcard: DBFlashcard, now: datetime | None = None):
+        """Apply one review to the flashcard's schedule. `now` is the review time, defaulting to the current time."""
+        SM2_SCHEDULER.schedule(CardState.of(flashcard), feedback, now or datetime.now()).apply_to(flashcard)
+        logger.debug(f"Flashcard {flashcard.id} reviewed with {feedback}: EF {flashcard.easiness_factor}, next review in {flashcard.interval} days")
+
+    @classmethod
+    def quality_array(cls, feedback: Iterable[ReviewFeedback]) -> np.ndarray:
+        """SM-2 quality of each feedback, as input for update_batch."""
+        # Members hash by name, also map their values so stored strings are looked up directly
+        quality = {**{item.value: value for item, value in cls.QUALITY.items()}, **cls.QUALITY}
+        return np.array([quality[item] for item in feedback], dtype=np.int64)
+
+    @classmethod
+    def update_batch(
+        cls,
+        quality: np.ndarray,
+        easiness_factor: np.ndarray,
+        interval: np.ndarray,
+        repetitions: np.ndarray,
+        now: datetime | np.ndarray,
+    ) -> SM2Batch:
+        """
+        Apply one review to each card of a batch in a single vectorized pass, with the same
+        results as update_flashcard. `now` is one review time for all cards or one per card.
+        Each card must appear once, apply the reviews of a card in several batches in order.
+        """
+        quality = np.asarray(quality, dtype=np.int64)
+        easiness_factor = np.asarray(easiness_factor, dtype=np.float64)
+        interval = np.asarray(interval, dtype=np.int64)
+        repetitions = np.asarray(repetitions, dtype=np.int64)
+
+        bad = quality == 0
+        # Same float operations in the same order as the scalar path, so the results are bit for bit equal
+        new_ef = np.maximum(1.3, easiness_factor + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)))
+        # np.rint rounds half to even like round()
+        grown = np.rint(interval * new_ef).astype(np.int64)
+        new_interval = np.select([repetitions == 0, repetitions == 1], [1, 6], grown)
+
+        easiness_factor = np.where(bad, easiness_factor, new_ef)
+        interval = np.where(bad, 1, new_interval)
+        repetitions = np.where(bad, 0, repetitions + 1)
+        now = np.asarray(now, dtype="datetime64[us]")
+        # datetime64 would wrap around silently where the scalar path raises
+        if (interval > (LATEST_REVIEW_AT - now) // np.timedelta64(1, "D")).any():
+            raise OverflowError("date value out of range")
+        next_review_at = now + interval.astype("timedelta64[D]")
+        return SM2Batch(easiness_factor, interval, repetitions, next_review_at)
+
+class SM2Scheduler:
+    """SM-2, the interval grows by the card's easiness factor on every successful review."""
+    name = SchedulerName.SM2
+
+    # SM-2 quality by FEEDBACK_CODES
+    QUALITY = np.array([0, 3, 5])
+
+    def schedule(self, state: CardState, feedback: ReviewFeedback, now: datetime) -> CardState:
+        quality = SM2Algo.QUALITY[feedback]
+        easiness_factor, interval, repetitions = state.easiness_factor, state.interval, state.repetitions
 
         ### SM-2 Algorithm Implementation ###
         # 1. If quality is BAD reset repetitions
         if quality == 0:
-            logger.debug(f"Flashcard {flashcard.id}: BAD feedback - resetting repetitions")
-            flashcard.repetitions = 0
-            flashcard.interval = 1
+            repetitions = 0
+            interval = 1
         else:
             # 2. Update Easiness Factor
-            new_ef = flashcard.easiness_factor + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
-            flashcard.easiness_factor = max(1.3, new_ef)  # Easiness factor should not be less than 1.3
-            logger.debug(f"Flashcard {flashcard.id}: Updated EF to {flashcard.easiness_factor}")
+            new_ef = easiness_factor + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+            easiness_factor = max(1.3, new_ef)  # Easiness factor should not be less than 1.3
 
             # 3. Update repetitions and interval
-            if flashcard.repetitions == 0:
-                flashcard.interval = 1
-            elif flashcard.repetitions == 1:
-                flashcard.interval = 6
+            if repetitions == 0:
+                interval = 1
+            elif repetitions == 1:
+                interval = 6
             else:
-                flashcard.interval = round(flashcard.interval * flashcard.easiness_factor)
+                interval = round(interval * easiness_factor)
+
+            repetitions += 1
+
+        # 4. Set next review date. SM-2 does not keep the FSRS state, a later switch to FSRS starts from the SM-2 state
+        return CardState(
+            easiness_factor, interval, repetitions, state.review_count + 1,
+            None, None, now + timedelta(days=interval), now
+        )
+
+    def schedule_batch(self, state: BatchState, feedback: np.ndarray, now: datetime | np.ndarray) -> BatchState:
+        now = np.broadcast_to(np.asarray(now, dtype="datetime64[us]"), feedback.shape)
+        result = SM2Algo.update_batch(self.QUALITY[feedback], state.easiness_factor, state.interval, state.repetitions, now)
+        return BatchState(
+            result.easiness_factor, result.interval, result.repetitions, state.review_count + 1,
+            np.full(feedback.shape, np.nan), np.full(feedback.shape, np.nan), result.next_review_at, now.copy()
+        )
+
+class FSRSScheduler:
+    """
+    FSRS-4.5 (Free Spaced Repetition Scheduler). Models the memory of a card by its stability,
+    the days until recall probability falls to 90%, and its difficulty, and schedules the next
+    review for when recall probability is expected to fall to the desired retention.
+    BAD, MID and GOOD are FSRS's Again, Hard and Good.
 
-            flashcard.repetitions += 1
-            logger.debug(f"Flashcard {flashcard.id}: Updated interval to {flashcard.interval} days, repetitions: {flashcard.repetitions}")
+    Cards reviewed with SM-2 before start from their SM-2 interval as stability and a
+    difficulty derived from their easiness factor.
+    """
+    name = SchedulerName.FSRS
 
-        # 4. Set next review date
-        flashcard.next_review_at = datetime.now() + timedelta(days=flashcard.interval)
-        flashcard.last_reviewed_at = datetime.now()
-        flashcard.review_count += 1
-        logger.info(f"Flashcard {flashcard.id} updated: next review in {flashcard.interval} days ({flashcard.next_review_at})")
+    # Default parameters of FSRS-4.5, fitted on a large set of Anki review logs
+    DEFAULT_WEIGHTS = (
+        0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474,
+        0.1367, 1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755,
+    )
+    DECAY = -0.5
+    FACTOR = 19 / 81  # 0.9 ** (1 / DECAY) - 1, so recall probability is 90% after `stability` days
+    MINIMUM_STABILITY = 0.01
+    # FSRS grade by FEEDBACK_CODES: Again, Hard, Good
+    GRADES = np.array([1, 2, 3])
+
+    def __init__(
+        self,
+        weights: tuple[float, ...] = DEFAULT_WEIGHTS,
+        desired_retention: float = FSRS_DESIRED_RETENTION,
+        maximum_interval: int = FSRS_MAXIMUM_INTERVAL,
+    ):
+        self.weights = np.array(weights)
+        self.desired_retention = desired_retention
+        self.maximum_interval = maximum_interval
+
+    def schedule(self, state: CardState, feedback: ReviewFeedback, now: datetime) -> CardState:
+        # A batch of one, so both forms give the same results
+        result = self.schedule_batch(BatchState.of([state]), feedback_array([feedback]), now)
+        return CardState(**result.rows()[0])
+
+    def schedule_batch(self, state: BatchState, feedback: np.ndarray, now: datetime | np.ndarray) -> BatchState:
+        w = self.weights
+        grade = self.GRADES[feedback]
+        now = np.broadcast_to(np.asarray(now, dtype="datetime64[us]"), grade.shape)
+
+        stability, difficulty = state.stability, state.difficulty
+        no_memory_state = np.isnan(stability)
+        first_review = no_memory_state & (state.review_count == 0)
+        from_sm2 = no_memory_state & (state.review_count > 0)
+        stability = np.where(from_sm2, np.maximum(state.interval, 1), stability)
+        difficulty = np.where(from_sm2, np.clip(10 - (state.easiness_factor - 1.3) * 5, 1, 10), difficulty)
+
+        elapsed_days = (now - state.last_reviewed_at) / np.timedelta64(1, "D")
+        elapsed_days = np.maximum(np.nan_to_num(elapsed_days), 0)  # NaT (never reviewed) gives NaN
+        # First reviews have a NaN state here, they get the initial state below
+        with np.errstate(invalid="ignore"):
+            retrievability = (1 + self.FACTOR * elapsed_days / stability) ** self.DECAY
+            recalled = stability * (
+                np.exp(w[8]) * (11 - difficulty) * stability ** -w[9] * np.expm1(w[10] * (1 - retrievability))
+                * np.where(grade == 2, w[15], 1) + 1
+            )
+            forgotten = np.minimum(
+                w[11] * difficulty ** -w[12] * ((stability + 1) ** w[13] - 1) * np.exp(w[14] * (1 - retrievability)),
+                stability
+            )
+            next_difficulty = w[7] * w[4] + (1 - w[7]) * (difficulty - w[6] * (grade - 3))
+
+        stability = np.where(first_review, w[grade - 1], np.where(grade == 1, forgotten, recalled))
+        stability = np.maximum(stability, self.MINIMUM_STABILITY)
+        difficulty = np.clip(np.where(first_review, w[4] - (grade - 3) * w[5], next_difficulty), 1, 10)
+
+        days = stability / self.FACTOR * (self.desired_retention ** (1 / self.DECAY) - 1)
+        interval = np.clip(np.rint(days), 1, self.maximum_interval).astype(np.int64)
+        repetitions = np.where(grade == 1, 0, state.repetitions + 1)
+        return BatchState(
+            state.easiness_factor, interval, repetitions, state.review_count + 1,
+            stability, difficulty, now + interval.astype("timedelta64[D]"), now.copy()
+        )
+
+SM2_SCHEDULER = SM2Scheduler()
+SCHEDULERS: dict[SchedulerName, Scheduler] = {
+    SchedulerName.SM2: SM2_SCHEDULER,
+    SchedulerName.FSRS: FSRSScheduler(),
+}
+
+def scheduler_for(*choices: SchedulerName | None) -> Scheduler:
+    """The first scheduler chosen, e.g. scheduler_for(deck.scheduler, user.scheduler), DEFAULT_SCHEDULER if none is."""
+    name = next((choice for choice in choices if choice is not None), DEFAULT_SCHEDULER)
+    return SCHEDULERS[SchedulerName(name)]
+
+def schedule_in_rounds(
+    state: BatchState,
+    card: np.ndarray,
+    occurrence: np.ndarray,
+    feedback: np.ndarray,
+    review_at: np.ndarray,
+    schedulers: list[Scheduler],
+):
+    """
+    Apply a sequence of reviews to `state` in place. Review i is of the card at position card[i]
+    of `state`, and occurrence[i] counts the earlier reviews of that card in the sequence. Round n
+    applies the n-th review of every card, so the reviews of each card apply in order.
+    `schedulers` holds the scheduler of each card of `state`.
+    """
+    uses = {
+        scheduler: np.array([card_scheduler is scheduler for card_scheduler in schedulers])
+        for scheduler in set(schedulers)
+    }
+    order = np.argsort(occurrence, kind="stable")
+    start = 0
+    for end in np.cumsum(np.bincount(occurrence)):
+        in_round = order[start:end]
+        for scheduler, uses_scheduler in uses.items():
+            review = in_round[uses_scheduler[card[in_round]]]
+            if review.size:
+                cards = card[review]
+                state.put(cards, scheduler.schedule_batch(state.take(cards), feedback[review], review_at[review]))
+        start = end
@@ -3,7 +3,7 @@ import os
 import sys
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 
@@ -12,6 +12,12 @@ backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if backend_path not in sys.path:
     sys.path.insert(0, backend_path)
 
+# Background generation jobs are run explicitly by the tests instead of by workers
+os.environ.setdefault("GENERATION_WORKERS", "0")
+# Hash passwords in the threadpool with the minimum bcrypt cost to keep the suite fast
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
 # Test database URL - using in-memory SQLite for tests
 SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///:memory:"
 
@@ -26,10 +32,17 @@ test_engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
+
+# SQLite only enforces foreign keys, and therefore ON DELETE CASCADE, when asked to
+@event.listens_for(test_engine, "connect")
+def enable_foreign_keys(dbapi_connection, connection_record):
+    dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
 # Import using src.* notation to match how routers import
 from src.database import Base, get_db
 from src.models import DBUser, DBDeck, DBFlashcard # Import all models to register them
 from src.utils import hash_password
+from src.dependencies import get_user_cache
 from src.main import app
 
 
@@ -69,10 +82,13 @@ def client(db_session):
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    # Every test starts with an empty database, so cached identities of earlier tests are stale
+    get_user_cache().clear()
 
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
+    get_user_cache().clear()
 
 
 @pytest.fixture
@@ -0,0 +1,316 @@
+"""Integration tests for the async versions of the authentication, decks and flashcards routers."""
+import pytest
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import select, func, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from routers import authentication_async, decks_async, flashcards_async
+from src.database import Base, get_async_db
+from src.dependencies import get_user_cache
+from src.models import DBFlashcard, DBReview, DBUser
+from src.utils import get_password_hasher
+
+
+@pytest.fixture
+async def async_session_factory():
+    """Create a fresh in-memory SQLite database behind an async engine."""
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    # Enforce foreign keys, the deletes rely on ON DELETE CASCADE
+    @event.listens_for(engine.sync_engine, "connect")
+    def enable_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+async def async_client(async_session_factory):
+    """HTTP client for an app that only serves the async routers."""
+    app = FastAPI()
+    app.include_router(authentication_async.router)
+    app.include_router(decks_async.router)
+    app.include_router(flashcards_async.router)
+
+    async def override_get_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    get_user_cache().clear()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    get_user_cache().clear()
+
+
+@pytest.fixture
+async def async_auth_headers(async_client):
+    """Register and log in a user on the async stack."""
+    await async_client.post(
+        "/register",
+        json={"username": "asyncuser", "email": "async@example.com", "password": "asyncpassword123"}
+    )
+    response = await async_client.post(
+        "/login",
+        data={"username": "asyncuser", "password": "asyncpassword123"}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.mark.integration
+class TestAsyncAuthentication:
+    """Test the async authentication endpoints."""
+
+    async def test_register_login_and_me(self, async_client, async_auth_headers):
+        """Test the full registration flow."""
+        for _ in range(2):
+            # The second request is served from the identity cache
+            response = await async_client.get("/me", headers=async_auth_headers)
+            assert response.status_code == 200
+            assert response.json()["username"] == "asyncuser"
+
+    async def test_duplicate_username(self, async_client, async_auth_headers):
+        """Test registering an existing username."""
+        response = await async_client.post(
+            "/register",
+            json={"username": "asyncuser", "email": "other@example.com", "password": "password123"}
+        )
+        assert response.status_code == 400
+
+    async def test_username_taken_concurrently(self, async_client, async_session_factory, monkeypatch):
+        """Test that a username taken while the password is hashed is rejected with 400 instead of a 500."""
+        hasher = get_password_hasher()
+        original_hash = hasher.hash
+
+        async def hash_while_registering(password):
+            # Another registration of the same username commits first
+            async with async_session_factory() as db:
+                db.add(DBUser(username="racer", email="racer@example.com", hashed_password="x"))
+                await db.commit()
+            return await original_hash(password)
+
+        monkeypatch.setattr(hasher, "hash", hash_while_registering)
+        response = await async_client.post(
+            "/register",
+            json={"username": "racer", "email": "other@example.com", "password": "password123"}
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Username already exists"
+
+    async def test_wrong_password(self, async_client, async_auth_headers):
+        """Test logging in with a wrong password."""
+        response = await async_client.post("/login", data={"username": "asyncuser", "password": "wrong"})
+        assert response.status_code == 401
+
+    async def test_delete_me_removes_data(self, async_client, async_auth_headers, async_session_factory):
+        """Test that deleting the account cascades to decks and flashcards."""
+        deck_id = (await async_client.post("/decks", headers=async_auth_headers, json={"name": "Deck"})).json()["id"]
+        await async_client.post(
+            "/flashcards", headers=async_auth_headers, json={"front": "Q", "back": "A", "deck_id": deck_id}
+        )
+
+        response = await async_client.delete("/me", headers=async_auth_headers)
+        assert response.status_code == 200
+        assert (await async_client.get("/me", headers=async_auth_headers)).status_code == 401
+        async with async_session_factory() as db:
+            assert await db.scalar(select(func.count()).select_from(DBFlashcard)) == 0
+
+
+@pytest.mark.integration
+class TestAsyncDecks:
+    """Test the async deck endpoints."""
+
+    async def test_deck_crud(self, async_client, async_auth_headers):
+        """Test creating, listing, updating and deleting a deck."""
+        response = await async_client.post(
+            "/decks", headers=async_auth_headers, json={"name": "Japanese", "description": "N5"}
+        )
+        assert response.status_code == 200
+        deck_id = response.json()["id"]
+
+        decks = (await async_client.get("/decks", headers=async_auth_headers)).json()
+        assert [deck["name"] for deck in decks] == ["Japanese"]
+
+        response = await async_client.put(f"/decks/{deck_id}", headers=async_auth_headers, json={"name": "Kanji"})
+        assert response.json()["name"] == "Kanji"
+
+        await async_client.post(
+            "/flashcards", headers=async_auth_headers, json={"front": "Q", "back": "A", "deck_id": deck_id}
+        )
+        response = await async_client.delete(f"/decks/{deck_id}", headers=async_auth_headers)
+        assert response.status_code == 200
+        assert (await async_client.get(f"/decks/{deck_id}", headers=async_auth_headers)).status_code == 404
+        assert (await async_client.get("/flashcards", headers=async_auth_headers)).json() == []
+
+    async def test_deck_not_found(self, async_client, async_auth_headers):
+        """Test accessing a deck that does not exist."""
+        response = await async_client.get("/decks/99999/flashcards", headers=async_auth_headers)
+        assert response.status_code == 404
+
+    async def test_add_flashcard_to_deck(self, async_client, async_auth_headers):
+        """Test moving a flashcard into a deck."""
+        deck_id = (await async_client.post("/decks", headers=async_auth_headers, json={"name": "Deck"})).json()["id"]
+        card_id = (await async_client.post(
+            "/flashcards", headers=async_auth_headers, json={"front": "Q", "back": "A"}
+        )).json()["id"]
+
+        response = await async_client.put(f"/decks/{deck_id}/flashcard/{card_id}", headers=async_auth_headers)
+        assert response.status_code == 200
+        cards = (await async_client.get(f"/decks/{deck_id}/flashcards", headers=async_auth_headers)).json()
+        assert [card["id"] for card in cards] == [card_id]
+
+    async def test_bulk_move_and_remove(self, async_client, async_auth_headers):
+        """Test moving all cards of a deck into another and removing some of them."""
+        from_id = (await async_client.post("/decks", headers=async_auth_headers, json={"name": "From"})).json()["id"]
+        to_id = (await async_client.post("/decks", headers=async_auth_headers, json={"name": "To"})).json()["id"]
+        cards = (await async_client.post("/flashcards/bulk", headers=async_auth_headers, json={
+            "deck_id": from_id, "flashcards": [{"front": f"Q{i}", "back": f"A{i}"} for i in range(3)],
+        })).json()
+
+        response = await async_client.post(
+            f"/decks/{to_id}/flashcards:move", headers=async_auth_headers, json={"from_deck_id": from_id}
+        )
+        assert response.json() == {"updated": 3}
+        response = await async_client.post(
+            f"/decks/{to_id}/flashcards:remove", headers=async_auth_headers, json={"flashcard_ids": [cards[0]["id"]]}
+        )
+        assert response.json() == {"updated": 1}
+        remaining = (await async_client.get(f"/decks/{to_id}/flashcards", headers=async_auth_headers)).json()
+        assert [card["front"] for card in remaining] == ["Q1", "Q2"]
+
+    async def test_deck_stats(self, async_client, async_auth_headers):
+        """Test the card counts of one deck and of all decks."""
+        deck_id = (await async_client.post("/decks", headers=async_auth_headers, json={"name": "Deck"})).json()["id"]
+        await async_client.post("/flashcards", headers=async_auth_headers, json={"front": "Q", "back": "A", "deck_id": deck_id})
+
+        stats = (await async_client.get(f"/decks/{deck_id}/stats", headers=async_auth_headers)).json()
+        assert stats == {"deck_id": deck_id, "total": 1, "due": 1, "new": 1, "learning": 0, "mature": 0}
+        all_stats = (await async_client.get("/decks/stats", headers=async_auth_headers)).json()
+        assert all_stats == [stats]
+
+    async def test_deck_flashcards_cursor_pagination(self, async_client, async_auth_headers):
+        """Test paging through the cards of a deck with the X-Next-Cursor header."""
+        deck_id = (await async_client.post("/decks", headers=async_auth_headers, json={"name": "Deck"})).json()["id"]
+        await async_client.post("/flashcards/bulk", headers=async_auth_headers, json={
+            "deck_id": deck_id, "flashcards": [{"front": f"Q{i}", "back": f"A{i}"} for i in range(3)],
+        })
+
+        first = await async_client.get(f"/decks/{deck_id}/flashcards?limit=2", headers=async_auth_headers)
+        second = await async_client.get(
+            f"/decks/{deck_id}/flashcards", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]}, headers=async_auth_headers
+        )
+        assert [card["front"] for card in first.json() + second.json()] == ["Q0", "Q1", "Q2"]
+        assert "X-Next-Cursor" not in second.headers
+
+    async def test_review_queue(self, async_client, async_auth_headers):
+        """Test paging through the due cards of a deck."""
+        deck_id = (await async_client.post("/decks", headers=async_auth_headers, json={"name": "Deck"})).json()["id"]
+        await async_client.post("/flashcards/bulk", headers=async_auth_headers, json={
+            "deck_id": deck_id, "flashcards": [{"front": f"Q{i}", "back": f"A{i}"} for i in range(3)],
+        })
+
+        page = (await async_client.get(f"/decks/{deck_id}/review-queue?limit=2", headers=async_auth_headers)).json()
+        assert len(page["cards"]) == 2
+        page = (await async_client.get(
+            f"/decks/{deck_id}/review-queue", params={"limit": 2, "cursor": page["next_cursor"]}, headers=async_auth_headers
+        )).json()
+        assert len(page["cards"]) == 1
+        assert page["next_cursor"] is None
+
+
+@pytest.mark.integration
+class TestAsyncFlashcards:
+    """Test the async flashcard endpoints."""
+
+    async def test_bulk_create_and_due_filter(self, async_client, async_auth_headers):
+        """Test bulk creation and listing due cards."""
+        deck_id = (await async_client.post("/decks", headers=async_auth_headers, json={"name": "Deck"})).json()["id"]
+        response = await async_client.post(
+            "/flashcards/bulk",
+            headers=async_auth_headers,
+            json={"deck_id": deck_id, "flashcards": [{"front": f"Q{i}", "back": f"A{i}"} for i in range(5)]}
+        )
+        assert response.status_code == 200
+        assert len(response.json()) == 5
+
+        due = (await async_client.get(f"/decks/{deck_id}/flashcards?due=true", headers=async_auth_headers)).json()
+        assert len(due) == 5
+
+    async def test_review_updates_schedule(self, async_client, async_auth_headers, async_session_factory):
+        """Test that a review stores the review and applies SM-2."""
+        card_id = (await async_client.post(
+            "/flashcards", headers=async_auth_headers, json={"front": "Q", "back": "A"}
+        )).json()["id"]
+
+        response = await async_client.post(
+            f"/flashcards/{card_id}/review", headers=async_auth_headers, json={"feedback": "good"}
+        )
+        assert response.status_code == 200
+        assert response.json()["feedback"] == "good"
+
+        card = (await async_client.get(f"/flashcards/{card_id}", headers=async_auth_headers)).json()
+        assert card["repetitions"] == 1
+        assert card["review_count"] == 1
+        async with async_session_factory() as db:
+            assert await db.scalar(select(func.count()).select_from(DBReview)) == 1
+
+    async def test_review_with_user_and_deck_scheduler(self, async_client, async_auth_headers):
+        """Test that reviews use the deck's scheduler, or else the one the user chose."""
+        response = await async_client.put("/me/scheduler", headers=async_auth_headers, json={"scheduler": "fsrs"})
+        assert response.json()["scheduler"] == "fsrs"
+        deck_id = (await async_client.post(
+            "/decks", headers=async_auth_headers, json={"name": "SM-2 deck", "scheduler": "sm2"}
+        )).json()["id"]
+        fsrs_card, sm2_card = [(await async_client.post(
+            "/flashcards", headers=async_auth_headers, json={"front": "Q", "back": "A", "deck_id": deck}
+        )).json()["id"] for deck in (None, deck_id)]
+
+        for card_id in (fsrs_card, sm2_card):
+            await async_client.post(f"/flashcards/{card_id}/review", headers=async_auth_headers, json={"feedback": "good"})
+
+        fsrs = (await async_client.get(f"/flashcards/{fsrs_card}", headers=async_auth_headers)).json()
+        sm2 = (await async_client.get(f"/flashcards/{sm2_card}", headers=async_auth_headers)).json()
+        assert (fsrs["interval"], fsrs["stability"]) == (4, pytest.approx(3.7145))
+        assert (sm2["interval"], sm2["stability"]) == (1, None)
+
+    async def test_update_and_delete(self, async_client, async_auth_headers):
+        """Test updating and deleting a flashcard."""
+        card_id = (await async_client.post(
+            "/flashcards", headers=async_auth_headers, json={"front": "Q", "back": "A"}
+        )).json()["id"]
+
+        response = await async_client.put(f"/flashcards/{card_id}", headers=async_auth_headers, json={"back": "B"})
+        assert response.json()["back"] == "B"
+
+        assert (await async_client.delete(f"/flashcards/{card_id}", headers=async_auth_headers)).status_code == 200
+        assert (await async_client.get(f"/flashcards/{card_id}", headers=async_auth_headers)).status_code == 404
+
+    async def test_remove_from_deck(self, async_client, async_auth_headers):
+        """Test removing a flashcard from its deck."""
+        deck_id = (await async_client.post("/decks", headers=async_auth_headers, json={"name": "Deck"})).json()["id"]
+        card_id = (await async_client.post(
+            "/flashcards", headers=async_auth_headers, json={"front": "Q", "back": "A", "deck_id": deck_id}
+        )).json()["id"]
+
+        response = await async_client.delete(f"/flashcards/{card_id}/deck", headers=async_auth_headers)
+        assert response.status_code == 200
+        response = await async_client.delete(f"/flashcards/{card_id}/deck", headers=async_auth_headers)
+        assert response.status_code == 400
+
+    async def test_create_in_foreign_deck(self, async_client, async_auth_headers):
+        """Test creating a flashcard in a deck that does not exist."""
+        response = await async_client.post(
+            "/flashcards", headers=async_auth_headers, json={"front": "Q", "back": "A", "deck_id": 99999}
+        )
+        assert response.status_code == 404
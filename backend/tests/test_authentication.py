@@ -1,5 +1,35 @@
 """Integration tests for authentication endpoints."""
+import asyncio
+import multiprocessing
 import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from datetime import timedelta
+
+from src import auth
+from src.database import Base, get_db
+from src.main import app
+from src.auth import create_access_token, verify_access_token, clear_token_cache
+from src.dependencies import get_user_cache, UserIdentityCache
+from src.models import DBUser
+from src.utils import PasswordHasher, get_password_hasher, hash_password
+
+
+@pytest.fixture
+def user_queries(db_session):
+    """Collect the SQL statements that read the users table."""
+    engine = db_session.get_bind().engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
 
 
 @pytest.mark.integration
@@ -51,6 +81,53 @@ class TestRegistration:
         assert response.status_code == 400
         assert "email already exists" in response.json()["detail"].lower()
 
+    def test_register_username_and_email_of_different_users(self, client, test_user):
+        """Test that the taken username is reported when the email belongs to another user."""
+        client.post("/register", json={"username": "otheruser", "email": "other@example.com", "password": "password123"})
+        response = client.post(
+            "/register",
+            json={"username": "testuser", "email": "other@example.com", "password": "password123"}
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Username already exists"
+
+    def test_register_taken_concurrently(self, client, monkeypatch):
+        """Test that a username taken while the password is hashed is rejected with 400 instead of a 500."""
+        # A database of its own, the rollback after the failed commit must not end the test transaction
+        engine = create_engine(
+            "sqlite:///:memory:",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+
+        def override_get_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        hasher = get_password_hasher()
+        original_hash = hasher.hash
+
+        async def hash_while_registering(password):
+            # Another registration of the same username commits first
+            with session_factory() as db:
+                db.add(DBUser(username="racer", email="racer@example.com", hashed_password="x"))
+                db.commit()
+            return await original_hash(password)
+
+        monkeypatch.setitem(app.dependency_overrides, get_db, override_get_db)
+        monkeypatch.setattr(hasher, "hash", hash_while_registering)
+        response = client.post(
+            "/register",
+            json={"username": "racer", "email": "other@example.com", "password": "password123"}
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Username already exists"
+
     def test_register_invalid_email(self, client):
         """Test registration with invalid email format."""
         response = client.post(
@@ -154,6 +231,34 @@ class TestGetMe:
         assert response.status_code == 401
 
 
+@pytest.mark.integration
+class TestUpdateScheduler:
+    """Test choosing the scheduler of the current user."""
+
+    def test_update_scheduler(self, client, auth_headers):
+        """Test that the chosen scheduler is returned and served by /me, also from the identity cache."""
+        assert client.get("/me", headers=auth_headers).json()["scheduler"] is None
+
+        response = client.put("/me/scheduler", headers=auth_headers, json={"scheduler": "fsrs"})
+        assert response.status_code == 200
+        assert response.json()["scheduler"] == "fsrs"
+        assert client.get("/me", headers=auth_headers).json()["scheduler"] == "fsrs"
+
+        response = client.put("/me/scheduler", headers=auth_headers, json={"scheduler": None})
+        assert response.json()["scheduler"] is None
+        assert client.get("/me", headers=auth_headers).json()["scheduler"] is None
+
+    def test_update_scheduler_invalid(self, client, auth_headers):
+        """Test that unknown schedulers are rejected."""
+        response = client.put("/me/scheduler", headers=auth_headers, json={"scheduler": "leitner"})
+        assert response.status_code == 422
+
+    def test_update_scheduler_unauthenticated(self, client):
+        """Test choosing a scheduler without authentication fails."""
+        response = client.put("/me/scheduler", json={"scheduler": "fsrs"})
+        assert response.status_code == 401
+
+
 @pytest.mark.integration
 class TestDeleteMe:
     """Test delete current user endpoint."""
@@ -175,7 +280,205 @@ class TestDeleteMe:
         )
         assert login_response.status_code == 401
 
+    def test_delete_me_cascades(self, client, auth_headers, db_session, test_user, test_flashcard):
+        """Test that deleting the account deletes its decks, flashcards and reviews."""
+        from src.models import DBDeck, DBFlashcard, DBReview, ReviewFeedback
+        db_session.add(DBReview(flashcard_id=test_flashcard.id, user_id=test_user.id, feedback=ReviewFeedback.GOOD))
+        db_session.commit()
+
+        response = client.delete("/me", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert db_session.query(DBDeck).count() == 0
+        assert db_session.query(DBFlashcard).count() == 0
+        assert db_session.query(DBReview).count() == 0
+
+    def test_deleted_user_token_is_rejected(self, client, auth_headers, test_user):
+        """Test that deleting the account removes its cached identity."""
+        assert client.get("/me", headers=auth_headers).status_code == 200
+
+        client.delete("/me", headers=auth_headers)
+
+        assert client.get("/me", headers=auth_headers).status_code == 401
+
     def test_delete_me_unauthenticated(self, client):
         """Test deleting user without authentication fails."""
         response = client.delete("/me")
         assert response.status_code == 401
+
+
+@pytest.mark.integration
+class TestIdentityCache:
+    """Test the cached user lookup of authenticated requests."""
+
+    def test_token_carries_user_id(self, client, auth_headers, test_user):
+        """Test that login tokens contain the user id claim."""
+        token = auth_headers["Authorization"].removeprefix("Bearer ")
+        assert verify_access_token(token)["uid"] == test_user.id
+
+    def test_cache_hit_runs_no_user_query(self, client, auth_headers, db_session, user_queries):
+        """Test that repeated requests are authenticated without querying users."""
+        # The tests share one session with the app, make sure the user is not in its identity map
+        db_session.expunge_all()
+        assert client.get("/me", headers=auth_headers).status_code == 200
+        assert len(user_queries) == 1
+        assert "users.id" in user_queries[0]
+
+        user_queries.clear()
+        for _ in range(3):
+            response = client.get("/me", headers=auth_headers)
+            assert response.status_code == 200
+            assert response.json()["username"] == "testuser"
+        assert user_queries == []
+
+    def test_cached_user_is_usable_in_session(self, client, auth_headers, test_deck):
+        """Test that endpoints can lazy load relations of a cached user."""
+        client.get("/me", headers=auth_headers)
+        response = client.get("/decks", headers=auth_headers)
+        assert response.status_code == 200
+        assert [deck["name"] for deck in response.json()] == ["Test Deck"]
+
+    def test_token_without_user_id(self, client, test_user):
+        """Test that tokens issued before the uid claim still work."""
+        token = create_access_token(data={"sub": test_user.username})
+        response = client.get("/me", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert response.json()["id"] == test_user.id
+
+    def test_mismatching_subject_is_rejected(self, client, test_user):
+        """Test that a user id is only accepted together with its username."""
+        token = create_access_token(data={"sub": "someoneelse", "uid": test_user.id})
+        response = client.get("/me", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 401
+
+    def test_expired_entries_are_reloaded(self, client, auth_headers, db_session, user_queries, monkeypatch):
+        """Test that entries are loaded again once the TTL has passed."""
+        monkeypatch.setattr(get_user_cache(), "ttl_seconds", 0)
+        for _ in range(2):
+            db_session.expunge_all()
+            client.get("/me", headers=auth_headers)
+        assert len(user_queries) == 2
+
+    def test_least_recently_used_user_is_evicted(self):
+        """Test that a full cache evicts the least recently used user instead of all of them."""
+        cache = UserIdentityCache(ttl_seconds=60, max_entries=2)
+        for user_id in (1, 2):
+            cache.set(f"uid:{user_id}", DBUser(id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com"))
+        assert cache.get("uid:1") is not None
+        cache.set("uid:3", DBUser(id=3, username="user3", email="user3@example.com"))
+
+        assert cache.get("uid:2") is None
+        assert cache.get("uid:1")["username"] == "user1"
+        assert cache.get("uid:3")["username"] == "user3"
+
+
+@pytest.fixture
+def counted_decode(monkeypatch):
+    """Count the JWT decodes done by verify_access_token, starting with an empty cache."""
+    clear_token_cache()
+    calls = []
+    original_decode = auth.jwt.decode
+
+    def decode(*args, **kwargs):
+        calls.append(args[0])
+        return original_decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, "decode", decode)
+    yield calls
+    clear_token_cache()
+
+
+@pytest.mark.unit
+class TestTokenCache:
+    """Test the verification cache of access tokens."""
+
+    def test_token_is_decoded_once(self, counted_decode):
+        """Test that repeated verifications of a token are served from the cache."""
+        token = create_access_token(data={"sub": "testuser", "uid": 1})
+        payloads = [verify_access_token(token) for _ in range(5)]
+        assert len(counted_decode) == 1
+        assert all(payload["sub"] == "testuser" for payload in payloads)
+
+    def test_cached_payload_is_a_copy(self, counted_decode):
+        """Test that callers cannot modify the cached payload."""
+        token = create_access_token(data={"sub": "testuser"})
+        verify_access_token(token)["sub"] = "changed"
+        assert verify_access_token(token)["sub"] == "testuser"
+
+    def test_expired_token_is_not_served_from_cache(self, counted_decode, monkeypatch):
+        """Test that the exp claim is checked on cache hits."""
+        token = create_access_token(data={"sub": "testuser"}, expires_delta=timedelta(hours=1))
+        assert verify_access_token(token) is not None
+
+        now = auth.time.time()
+        monkeypatch.setattr(auth.time, "time", lambda: now + 2 * 24 * 3600)
+        verify_access_token(token)
+        assert len(counted_decode) == 2
+
+    def test_invalid_token_is_not_cached(self, counted_decode):
+        """Test that failed verifications are repeated."""
+        assert verify_access_token("not-a-token") is None
+        assert verify_access_token("not-a-token") is None
+        assert len(counted_decode) == 2
+
+    def test_least_recently_used_token_is_evicted(self, counted_decode, monkeypatch):
+        """Test that the cache is bounded."""
+        monkeypatch.setattr(auth, "TOKEN_CACHE_MAX_ENTRIES", 2)
+        first, second, third = [create_access_token(data={"sub": f"user{i}"}) for i in range(3)]
+        verify_access_token(first)
+        verify_access_token(second)
+        verify_access_token(first)
+        verify_access_token(third)
+
+        counted_decode.clear()
+        verify_access_token(first)
+        verify_access_token(second)
+        assert counted_decode == [second]
+
+
+@pytest.mark.unit
+class TestPasswordHasher:
+    """Test password hashing outside the event loop."""
+
+    async def test_process_pool_hashes_and_verifies(self):
+        """Test hashing and verifying in worker processes."""
+        hasher = PasswordHasher(workers=1)
+        try:
+            hashed = await hasher.hash("secret123")
+            assert await hasher.verify("secret123", hashed)
+            assert not await hasher.verify("wrong", hashed)
+        finally:
+            hasher.shutdown()
+        assert hasher.stats()["completed"] == 3
+        assert hasher.stats()["pending"] == 0
+
+    async def test_process_pool_runs_in_spawned_process_and_shuts_down(self):
+        """Test that the hashing runs in a spawned child process, which stops on shutdown."""
+        before = set(multiprocessing.active_children())
+        hasher = PasswordHasher(workers=1)
+        try:
+            hashed = await hasher.hash("secret123")
+            workers = [process for process in multiprocessing.active_children() if process not in before]
+            assert len(workers) == 1
+            assert await hasher.verify("secret123", hashed)
+        finally:
+            hasher.shutdown()
+
+        workers[0].join(timeout=10)
+        assert not workers[0].is_alive()
+        # A hasher that was shut down starts a new pool when it is used again
+        try:
+            assert await hasher.verify("secret123", hashed)
+        finally:
+            hasher.shutdown()
+
+    async def test_queue_depth_is_tracked(self):
+        """Test that concurrent hashes beyond the worker count are reported as queued."""
+        hasher = PasswordHasher(workers=0)
+        hashed = hash_password("secret123")
+        results = await asyncio.gather(*[hasher.verify("secret123", hashed) for _ in range(4)])
+        assert all(results)
+        stats = hasher.stats()
+        assert stats["max_pending"] == 4
+        assert stats["pending"] == 0
+        assert stats["queued"] == 0
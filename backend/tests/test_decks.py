@@ -33,6 +33,15 @@ class TestCreateDeck:
         data = response.json()
         assert data["name"] == "Minimal Deck"
 
+    def test_create_deck_with_scheduler(self, client, auth_headers):
+        """Test creating a deck with its own scheduler."""
+        response = client.post("/decks", headers=auth_headers, json={"name": "FSRS Deck", "scheduler": "fsrs"})
+        assert response.status_code == 200
+        assert response.json()["scheduler"] == "fsrs"
+
+        response = client.post("/decks", headers=auth_headers, json={"name": "Default Deck"})
+        assert response.json()["scheduler"] is None
+
     def test_create_deck_unauthenticated(self, client):
         """Test creating deck without authentication fails."""
         response = client.post(
@@ -89,6 +98,39 @@ class TestGetDecks:
         data = response.json()
         assert len(data) == 3
 
+    def test_get_decks_cursor_pagination(self, client, auth_headers, db_session, test_user):
+        """Test paging through decks with the X-Next-Cursor header, oldest deck first."""
+        from src.models import DBDeck
+        from datetime import datetime, timedelta
+        created = datetime.now()
+        for i in range(5):
+            db_session.add(DBDeck(name=f"Deck {i}", user_id=test_user.id, created_at=created + timedelta(seconds=i)))
+        db_session.commit()
+
+        response = client.get("/decks?limit=2", headers=auth_headers)
+        names = [deck["name"] for deck in response.json()]
+        while "X-Next-Cursor" in response.headers:
+            response = client.get(
+                "/decks", params={"limit": 2, "cursor": response.headers["X-Next-Cursor"]}, headers=auth_headers
+            )
+            assert response.status_code == 200
+            names += [deck["name"] for deck in response.json()]
+
+        assert names == [f"Deck {i}" for i in range(5)]
+
+    def test_get_decks_invalid_cursor(self, client, auth_headers):
+        """Test that a malformed cursor is rejected."""
+        response = client.get("/decks?cursor=garbage", headers=auth_headers)
+        assert response.status_code == 400
+
+    def test_get_decks_limit_out_of_range(self, client, auth_headers, test_deck):
+        """Test that a page size below 1 or above 500 is rejected."""
+        for limit in (-1, 0, 501):
+            response = client.get("/decks", params={"limit": limit}, headers=auth_headers)
+            assert response.status_code == 422
+        response = client.get(f"/decks/{test_deck.id}/flashcards", params={"limit": -1}, headers=auth_headers)
+        assert response.status_code == 422
+
     def test_get_decks_unauthenticated(self, client):
         """Test getting decks without authentication fails."""
         response = client.get("/decks")
@@ -189,6 +231,23 @@ class TestUpdateDeck:
         assert data["name"] == "New Name"
         assert data["description"] == "New Description"
 
+    def test_update_deck_scheduler(self, client, auth_headers, test_deck):
+        """Test choosing a deck's scheduler, keeping it on other updates and resetting it with null."""
+        response = client.put(f"/decks/{test_deck.id}", headers=auth_headers, json={"scheduler": "fsrs"})
+        assert response.status_code == 200
+        assert response.json()["scheduler"] == "fsrs"
+
+        response = client.put(f"/decks/{test_deck.id}", headers=auth_headers, json={"name": "Renamed"})
+        assert response.json()["scheduler"] == "fsrs"
+
+        response = client.put(f"/decks/{test_deck.id}", headers=auth_headers, json={"scheduler": None})
+        assert response.json()["scheduler"] is None
+
+    def test_update_deck_invalid_scheduler(self, client, auth_headers, test_deck):
+        """Test that unknown schedulers are rejected."""
+        response = client.put(f"/decks/{test_deck.id}", headers=auth_headers, json={"scheduler": "leitner"})
+        assert response.status_code == 422
+
     def test_update_deck_not_found(self, client, auth_headers):
         """Test updating non-existent deck."""
         response = client.put(
@@ -228,6 +287,30 @@ class TestDeleteDeck:
         )
         assert get_response.status_code == 404
 
+    def test_delete_deck_cascades_in_one_statement(self, client, auth_headers, db_session, test_user, test_deck, test_flashcard):
+        """Test that the flashcards and reviews of a deck are deleted by the database, not loaded and deleted one by one."""
+        from sqlalchemy import event
+        from src.models import DBFlashcard, DBReview, ReviewFeedback
+        db_session.add(DBReview(flashcard_id=test_flashcard.id, user_id=test_user.id, feedback=ReviewFeedback.GOOD))
+        db_session.commit()
+        client.get("/me", headers=auth_headers)  # identity is cached from here on
+        deck_id = test_deck.id
+
+        statements = []
+        engine = db_session.get_bind().engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = client.delete(f"/decks/{deck_id}", headers=auth_headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert response.status_code == 200
+        assert len(statements) == 1
+        assert statements[0].startswith("DELETE FROM decks")
+        assert db_session.query(DBFlashcard).filter(DBFlashcard.deck_id == deck_id).count() == 0
+        assert db_session.query(DBReview).count() == 0
+
     def test_delete_deck_not_found(self, client, auth_headers):
         """Test deleting non-existent deck."""
         response = client.delete("/decks/99999", headers=auth_headers)
@@ -309,6 +392,28 @@ class TestGetDeckFlashcards:
         # Should only include the due card, not the future one
         assert all(card["front"] != "Future" for card in data)
 
+    def test_get_deck_flashcards_cursor_pagination(self, client, auth_headers, test_deck, db_session, test_user):
+        """Test paging through the cards of a deck with the X-Next-Cursor header."""
+        from src.models import DBFlashcard
+        from datetime import datetime
+        created = datetime.now()
+        db_session.add_all([
+            DBFlashcard(front=f"Q{i}", back="A", user_id=test_user.id, deck_id=test_deck.id, created_at=created)
+            for i in range(3)
+        ])
+        db_session.commit()
+
+        first = client.get(f"/decks/{test_deck.id}/flashcards?limit=2", headers=auth_headers)
+        second = client.get(
+            f"/decks/{test_deck.id}/flashcards",
+            params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]},
+            headers=auth_headers,
+        )
+
+        # Cards created at the same time are ordered by id
+        assert [card["front"] for card in first.json() + second.json()] == ["Q0", "Q1", "Q2"]
+        assert "X-Next-Cursor" not in second.headers
+
     def test_get_deck_flashcards_not_found(self, client, auth_headers):
         """Test getting flashcards from non-existent deck."""
         response = client.get("/decks/99999/flashcards", headers=auth_headers)
@@ -372,3 +477,189 @@ class TestAddFlashcardToDeck:
             f"/decks/{test_deck.id}/flashcard/{test_flashcard.id}"
         )
         assert response.status_code == 401
+
+
+@pytest.mark.integration
+class TestBulkMoveRemoveFlashcards:
+    """Test moving and removing many flashcards at once."""
+
+    @pytest.fixture
+    def other_deck_cards(self, db_session, test_user):
+        """A second deck of the test user with three cards."""
+        from src.models import DBDeck, DBFlashcard
+        deck = DBDeck(name="Other", user_id=test_user.id)
+        deck.flashcards = [DBFlashcard(front=f"Q{i}", back=f"A{i}", user_id=test_user.id) for i in range(3)]
+        db_session.add(deck)
+        db_session.commit()
+        return deck.id, [card.id for card in deck.flashcards]
+
+    def test_move_by_ids_in_one_update(self, client, auth_headers, db_session, test_deck, other_deck_cards):
+        """Test that moving cards by id is one ownership-scoped UPDATE and returns the count."""
+        from sqlalchemy import event
+        from src.models import DBFlashcard
+        client.get("/me", headers=auth_headers)  # identity is cached from here on
+        deck_id = test_deck.id
+        _, card_ids = other_deck_cards
+
+        statements = []
+        engine = db_session.get_bind().engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = client.post(
+                f"/decks/{deck_id}/flashcards:move", headers=auth_headers, json={"flashcard_ids": card_ids[:2]}
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert response.status_code == 200
+        assert response.json() == {"updated": 2}
+        assert [statement.split()[0] for statement in statements] == ["SELECT", "UPDATE"]
+        moved = db_session.query(DBFlashcard.id).filter(DBFlashcard.deck_id == deck_id).all()
+        assert sorted(card_id for card_id, in moved) == sorted(card_ids[:2])
+
+    def test_move_all_cards_of_deck(self, client, auth_headers, test_deck, test_flashcard, other_deck_cards):
+        """Test moving every card of another deck, cards already in the deck are not counted."""
+        from_deck_id, _ = other_deck_cards
+        response = client.post(
+            f"/decks/{test_deck.id}/flashcards:move", headers=auth_headers, json={"from_deck_id": from_deck_id}
+        )
+        assert response.json() == {"updated": 3}
+        cards = client.get(f"/decks/{test_deck.id}/flashcards", headers=auth_headers).json()
+        assert len(cards) == 4
+
+        response = client.post(
+            f"/decks/{test_deck.id}/flashcards:move", headers=auth_headers, json={"flashcard_ids": [test_flashcard.id]}
+        )
+        assert response.json() == {"updated": 0}
+
+    def test_move_skips_other_users_cards(self, client, auth_headers, db_session, test_deck):
+        """Test that cards of another user are neither moved nor counted."""
+        from src.models import DBUser, DBFlashcard
+        other = DBUser(username="other", email="other@example.com", hashed_password="x")
+        other.flashcards = [DBFlashcard(front="Q", back="A")]
+        db_session.add(other)
+        db_session.commit()
+        card_id = other.flashcards[0].id
+
+        response = client.post(
+            f"/decks/{test_deck.id}/flashcards:move", headers=auth_headers, json={"flashcard_ids": [card_id]}
+        )
+        assert response.json() == {"updated": 0}
+        assert db_session.get(DBFlashcard, card_id).deck_id is None
+
+    def test_move_requires_one_selection(self, client, auth_headers, test_deck):
+        """Test that exactly one of flashcard_ids and from_deck_id must be given."""
+        url = f"/decks/{test_deck.id}/flashcards:move"
+        assert client.post(url, headers=auth_headers, json={}).status_code == 400
+        response = client.post(url, headers=auth_headers, json={"flashcard_ids": [1], "from_deck_id": 1})
+        assert response.status_code == 400
+        assert client.post(url, headers=auth_headers, json={"flashcard_ids": []}).status_code == 422
+
+    def test_move_to_missing_deck(self, client, auth_headers, other_deck_cards):
+        """Test moving cards into a deck that does not exist."""
+        _, card_ids = other_deck_cards
+        response = client.post("/decks/99999/flashcards:move", headers=auth_headers, json={"flashcard_ids": card_ids})
+        assert response.status_code == 404
+
+    def test_remove_by_ids_and_all(self, client, auth_headers, other_deck_cards):
+        """Test removing some cards and then the rest, the cards are kept without a deck."""
+        deck_id, card_ids = other_deck_cards
+        url = f"/decks/{deck_id}/flashcards:remove"
+
+        assert client.post(url, headers=auth_headers, json={"flashcard_ids": card_ids[:1]}).json() == {"updated": 1}
+        assert client.post(url, headers=auth_headers, json={}).json() == {"updated": 2}
+        assert client.get(f"/decks/{deck_id}/flashcards", headers=auth_headers).json() == []
+        assert client.get(f"/flashcards/{card_ids[0]}", headers=auth_headers).json()["deck_id"] is None
+
+    def test_remove_from_missing_deck(self, client, auth_headers):
+        """Test removing cards from a deck that does not exist."""
+        response = client.post("/decks/99999/flashcards:remove", headers=auth_headers, json={})
+        assert response.status_code == 404
+
+    def test_bulk_unauthenticated(self, client, test_deck):
+        """Test the bulk endpoints without authentication."""
+        assert client.post(f"/decks/{test_deck.id}/flashcards:move", json={"from_deck_id": 1}).status_code == 401
+        assert client.post(f"/decks/{test_deck.id}/flashcards:remove", json={}).status_code == 401
+
+
+@pytest.fixture
+def cards_in_every_state(db_session, test_user, test_deck):
+    """One new, two learning (one of them due) and one mature card in the test deck."""
+    from datetime import datetime, timedelta
+    from src.models import DBFlashcard
+    now = datetime.now()
+    db_session.add_all([
+        DBFlashcard(front="New", back="A", user_id=test_user.id, deck_id=test_deck.id, next_review_at=now - timedelta(minutes=1)),
+        DBFlashcard(front="Learning due", back="A", user_id=test_user.id, deck_id=test_deck.id,
+                    review_count=1, interval=1, next_review_at=now - timedelta(hours=1)),
+        DBFlashcard(front="Learning", back="A", user_id=test_user.id, deck_id=test_deck.id,
+                    review_count=2, interval=6, next_review_at=now + timedelta(days=6)),
+        DBFlashcard(front="Mature", back="A", user_id=test_user.id, deck_id=test_deck.id,
+                    review_count=5, interval=30, next_review_at=now + timedelta(days=30)),
+    ])
+    db_session.commit()
+
+
+@pytest.mark.integration
+class TestDeckStats:
+    """Test the deck statistics endpoints."""
+
+    def test_deck_stats(self, client, auth_headers, test_deck, cards_in_every_state):
+        """Test the card counts of one deck."""
+        response = client.get(f"/decks/{test_deck.id}/stats", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "deck_id": test_deck.id, "total": 4, "due": 2, "new": 1, "learning": 2, "mature": 1,
+        }
+
+    def test_deck_stats_empty_deck(self, client, auth_headers, test_deck):
+        """Test that a deck without cards has all counts zero."""
+        response = client.get(f"/decks/{test_deck.id}/stats", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.json()["total"] == 0
+
+    def test_deck_stats_not_found(self, client, auth_headers):
+        """Test the stats of a deck that does not exist."""
+        response = client.get("/decks/9999/stats", headers=auth_headers)
+        assert response.status_code == 404
+
+    def test_all_deck_stats(self, client, auth_headers, db_session, test_user, test_deck, cards_in_every_state):
+        """Test the counts of all decks in one call, including decks without cards."""
+        from src.models import DBDeck
+        empty_deck = DBDeck(name="Empty", user_id=test_user.id)
+        db_session.add(empty_deck)
+        db_session.commit()
+
+        response = client.get("/decks/stats", headers=auth_headers)
+
+        assert response.status_code == 200
+        stats = {entry["deck_id"]: entry for entry in response.json()}
+        assert stats[test_deck.id]["total"] == 4
+        assert stats[test_deck.id]["due"] == 2
+        assert stats[empty_deck.id] == {
+            "deck_id": empty_deck.id, "total": 0, "due": 0, "new": 0, "learning": 0, "mature": 0,
+        }
+
+    def test_all_deck_stats_single_query(self, client, auth_headers, db_session, test_deck, cards_in_every_state):
+        """Test that the counts of all decks come from one query."""
+        from sqlalchemy import event
+        client.get("/decks/stats", headers=auth_headers)  # identity is cached from here on
+        statements = []
+        engine = db_session.get_bind().engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            client.get("/decks/stats", headers=auth_headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert len(statements) == 1
+        assert "GROUP BY" in statements[0]
+
+    def test_deck_stats_unauthenticated(self, client, test_deck):
+        """Test getting deck stats without authentication."""
+        assert client.get(f"/decks/{test_deck.id}/stats").status_code == 401
+        assert client.get("/decks/stats").status_code == 401
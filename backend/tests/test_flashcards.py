@@ -79,6 +79,79 @@ class TestCreateFlashcard:
         assert response.status_code == 422
 
 
+@pytest.mark.integration
+class TestBulkCreateFlashcards:
+    """Test bulk flashcard creation endpoint."""
+
+    def test_bulk_create_success(self, client, auth_headers, test_deck):
+        """Test creating several flashcards in one request."""
+        cards = [{"front": f"Question {i}", "back": f"Answer {i}"} for i in range(50)]
+        response = client.post(
+            "/flashcards/bulk",
+            headers=auth_headers,
+            json={"deck_id": test_deck.id, "flashcards": cards}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 50
+        assert [card["front"] for card in data] == [card["front"] for card in cards]
+        assert all(card["deck_id"] == test_deck.id for card in data)
+        assert all(card["id"] is not None for card in data)
+        assert data[0]["easiness_factor"] == 2.5
+        assert data[0]["interval"] == 1
+        assert data[0]["review_count"] == 0
+
+        response = client.get(f"/decks/{test_deck.id}/flashcards", headers=auth_headers)
+        assert len(response.json()) == 50
+
+    def test_bulk_create_without_deck(self, client, auth_headers):
+        """Test bulk creating flashcards that are not assigned to a deck."""
+        response = client.post(
+            "/flashcards/bulk",
+            headers=auth_headers,
+            json={"flashcards": [{"front": "Question", "back": "Answer"}]}
+        )
+        assert response.status_code == 200
+        assert response.json()[0]["deck_id"] is None
+
+    def test_bulk_create_invalid_deck(self, client, auth_headers):
+        """Test that nothing is created for a deck the user does not own."""
+        response = client.post(
+            "/flashcards/bulk",
+            headers=auth_headers,
+            json={"deck_id": 99999, "flashcards": [{"front": "Question", "back": "Answer"}]}
+        )
+        assert response.status_code == 404
+        assert client.get("/flashcards", headers=auth_headers).json() == []
+
+    def test_bulk_create_is_all_or_nothing(self, client, auth_headers):
+        """Test that one invalid card rejects the whole request."""
+        response = client.post(
+            "/flashcards/bulk",
+            headers=auth_headers,
+            json={"flashcards": [{"front": "Question", "back": "Answer"}, {"front": "Only front"}]}
+        )
+        assert response.status_code == 422
+        assert client.get("/flashcards", headers=auth_headers).json() == []
+
+    def test_bulk_create_empty_and_too_many(self, client, auth_headers):
+        """Test the limits on the number of cards."""
+        response = client.post("/flashcards/bulk", headers=auth_headers, json={"flashcards": []})
+        assert response.status_code == 422
+
+        cards = [{"front": "Q", "back": "A"}] * 5001
+        response = client.post("/flashcards/bulk", headers=auth_headers, json={"flashcards": cards})
+        assert response.status_code == 422
+
+    def test_bulk_create_unauthenticated(self, client):
+        """Test bulk creating flashcards without authentication."""
+        response = client.post(
+            "/flashcards/bulk",
+            json={"flashcards": [{"front": "Question", "back": "Answer"}]}
+        )
+        assert response.status_code == 401
+
+
 @pytest.mark.integration
 class TestGetFlashcards:
     """Test listing flashcards endpoint."""
@@ -152,6 +225,60 @@ class TestGetFlashcards:
         data = response.json()
         assert len(data) == 3
 
+    def test_get_flashcards_cursor_pagination(self, client, auth_headers, db_session, test_user):
+        """Test paging through flashcards by creation time and, for due cards, by next review time."""
+        from src.models import DBFlashcard
+        now = datetime.now()
+        # Created in order 0..4, due in reverse order
+        for i in range(5):
+            db_session.add(DBFlashcard(
+                front=f"Question {i}", back=f"Answer {i}", user_id=test_user.id,
+                created_at=now - timedelta(days=10 - i), next_review_at=now - timedelta(days=i + 1),
+            ))
+        db_session.commit()
+
+        def fetch_all(params):
+            fronts = []
+            cursor = None
+            while True:
+                response = client.get("/flashcards", params={**params, "limit": 2, **({"cursor": cursor} if cursor else {})}, headers=auth_headers)
+                assert response.status_code == 200
+                fronts += [card["front"] for card in response.json()]
+                cursor = response.headers.get("X-Next-Cursor")
+                if cursor is None:
+                    return fronts
+
+        assert fetch_all({}) == [f"Question {i}" for i in range(5)]
+        assert fetch_all({"due": True}) == [f"Question {i}" for i in reversed(range(5))]
+        assert fetch_all({"order_by": "next_review_at"}) == [f"Question {i}" for i in reversed(range(5))]
+
+    def test_get_flashcards_cursor_of_other_ordering(self, client, auth_headers, db_session, test_user):
+        """Test that a cursor cannot be reused for a differently ordered listing."""
+        from src.models import DBFlashcard
+        for i in range(3):
+            db_session.add(DBFlashcard(front=f"Q{i}", back="A", user_id=test_user.id, created_at=datetime.now(), next_review_at=datetime.now()))
+        db_session.commit()
+
+        cursor = client.get("/flashcards?limit=1", headers=auth_headers).headers["X-Next-Cursor"]
+        response = client.get("/flashcards", params={"limit": 1, "cursor": cursor, "due": True}, headers=auth_headers)
+        assert response.status_code == 400
+
+    def test_get_flashcards_limit_out_of_range(self, client, auth_headers):
+        """Test that a page size below 1 or above 500 is rejected."""
+        for limit in (-1, 0, 501):
+            response = client.get("/flashcards", params={"limit": limit}, headers=auth_headers)
+            assert response.status_code == 422
+
+    def test_sort_columns_reject_null(self, db_session, test_user):
+        """Test that the database rejects a flashcard without the sort keys the cursor continues after."""
+        from sqlalchemy import insert
+        from sqlalchemy.exc import IntegrityError
+        from src.models import DBFlashcard
+        for column in ("created_at", "next_review_at"):
+            # A Core insert, the ORM would fill a None with the column default
+            with pytest.raises(IntegrityError), db_session.begin_nested():
+                db_session.execute(insert(DBFlashcard).values(front="Q", back="A", user_id=test_user.id, **{column: None}))
+
     def test_get_flashcards_unauthenticated(self, client):
         """Test getting flashcards without authentication."""
         response = client.get("/flashcards")
@@ -426,6 +553,38 @@ class TestReviewFlashcard:
         assert updated_next_review > original_next_review
 
 
+    def test_review_flashcard_with_user_scheduler(self, client, auth_headers, test_flashcard):
+        """Test that a user who chose FSRS gets FSRS schedules."""
+        client.put("/me/scheduler", headers=auth_headers, json={"scheduler": "fsrs"})
+
+        client.post(f"/flashcards/{test_flashcard.id}/review", headers=auth_headers, json={"feedback": "good"})
+
+        data = client.get(f"/flashcards/{test_flashcard.id}", headers=auth_headers).json()
+        assert data["stability"] == pytest.approx(3.7145)
+        assert data["difficulty"] == pytest.approx(5.1618)
+        assert data["interval"] == 4
+
+    def test_review_flashcard_deck_scheduler_wins(self, client, auth_headers, test_flashcard, test_deck):
+        """Test that the deck's scheduler is used over the user's."""
+        client.put("/me/scheduler", headers=auth_headers, json={"scheduler": "fsrs"})
+        client.put(f"/decks/{test_deck.id}", headers=auth_headers, json={"scheduler": "sm2"})
+
+        client.post(f"/flashcards/{test_flashcard.id}/review", headers=auth_headers, json={"feedback": "good"})
+
+        data = client.get(f"/flashcards/{test_flashcard.id}", headers=auth_headers).json()
+        assert data["stability"] is None
+        assert data["interval"] == 1
+
+    def test_review_time_is_the_schedule_time(self, client, auth_headers, test_flashcard):
+        """Test that the stored review time is the card's last review time."""
+        review = client.post(
+            f"/flashcards/{test_flashcard.id}/review", headers=auth_headers, json={"feedback": "good"}
+        ).json()
+
+        data = client.get(f"/flashcards/{test_flashcard.id}", headers=auth_headers).json()
+        assert data["last_reviewed_at"] == review["review_at"]
+
+
 @pytest.mark.integration
 class TestRemoveFlashcardFromDeck:
     """Test removing flashcard from deck endpoint."""
@@ -0,0 +1,85 @@
+"""Unit tests for image preprocessing before LLM upload."""
+import io
+import pytest
+from PIL import Image
+
+from src.image_processing import preprocess_image, sniff_image_type, UnsupportedImageError
+
+
+def make_image(fmt: str, size=(400, 300), mode="RGB", **save_kwargs) -> bytes:
+    """Create an encoded test image."""
+    color = (200, 30, 30, 128) if mode == "RGBA" else (200, 30, 30)
+    image = Image.new(mode, size, color)
+    output = io.BytesIO()
+    image.save(output, format=fmt, **save_kwargs)
+    return output.getvalue()
+
+
+@pytest.mark.unit
+class TestImagePreprocessing:
+    """Test format sniffing, downscaling and re-encoding of uploads."""
+
+    @pytest.mark.parametrize("fmt, mime_type", [
+        ("JPEG", "image/jpeg"),
+        ("PNG", "image/png"),
+        ("WEBP", "image/webp"),
+        ("GIF", "image/gif"),
+    ])
+    def test_sniff_image_type(self, fmt, mime_type):
+        """Test that the format is detected from the content."""
+        assert sniff_image_type(make_image(fmt)) == mime_type
+
+    def test_sniff_unknown_type(self):
+        """Test that non-image bytes are not detected as an image."""
+        assert sniff_image_type(b"%PDF-1.7 not an image") is None
+
+    def test_large_image_is_downscaled(self):
+        """Test that the longest edge is limited to max_edge keeping the aspect ratio."""
+        prepared = preprocess_image(make_image("PNG", size=(4000, 3000)), max_edge=1000)
+
+        assert (prepared.width, prepared.height) == (1000, 750)
+        assert prepared.mime_type == "image/jpeg"
+        assert len(prepared.data) < prepared.original_size
+
+    def test_small_image_is_not_upscaled(self):
+        """Test that images below max_edge keep their size."""
+        prepared = preprocess_image(make_image("JPEG", size=(300, 200)), max_edge=1000)
+
+        assert (prepared.width, prepared.height) == (300, 200)
+
+    def test_metadata_is_stripped(self):
+        """Test that EXIF data is not carried over."""
+        exif = Image.Exif()
+        exif[0x010F] = "PhoneMaker"  # camera make
+        prepared = preprocess_image(make_image("JPEG", exif=exif.tobytes()))
+
+        assert "exif" not in Image.open(io.BytesIO(prepared.data)).info
+
+    def test_transparent_image_stays_png(self):
+        """Test that images with an alpha channel are encoded as PNG."""
+        prepared = preprocess_image(make_image("PNG", mode="RGBA"))
+
+        assert prepared.mime_type == "image/png"
+        assert sniff_image_type(prepared.data) == "image/png"
+
+    def test_prepared_image_is_passed_through(self):
+        """Test that preprocessing an already prepared image returns it unchanged instead of re-encoding it."""
+        for image in (make_image("PNG", size=(4000, 3000)), make_image("PNG", mode="RGBA")):
+            prepared = preprocess_image(image, max_edge=1000)
+            again = preprocess_image(prepared.data, max_edge=1000)
+
+            assert again.data == prepared.data
+            assert again.mime_type == prepared.mime_type
+
+    def test_decompression_bomb_raises(self, monkeypatch):
+        """Test that images with more pixels than Pillow accepts are rejected."""
+        monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+        with pytest.raises(UnsupportedImageError, match="too many pixels"):
+            preprocess_image(make_image("PNG", size=(400, 300)))
+
+    def test_unsupported_image_raises(self):
+        """Test that unknown or corrupt uploads are rejected."""
+        with pytest.raises(UnsupportedImageError):
+            preprocess_image(b"definitely not an image")
+        with pytest.raises(UnsupportedImageError):
+            preprocess_image(b"\x89PNG\r\n\x1a\n truncated")
@@ -0,0 +1,880 @@
+"""Tests for LLM-powered flashcard generation."""
+import io
+import json
+import asyncio
+import base64
+import pytest
+from datetime import datetime, timedelta
+from PIL import Image
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from langchain_core.messages import AIMessageChunk
+
+from routers import llm as llm_router
+from src.database import Base
+from src.llm_service import LLMService, GenerationCache, FlashcardBatch, GeneratedFlashcard, split_into_chunks, merge_batches
+from src.generation_jobs import GenerationJobQueue
+from src.models import DBGenerationCacheEntry, DBGenerationJob, DBGenerationJobImage, DBUser, GenerationJobStatus
+
+
+class FakeModel:
+    """Stand-in for the structured Gemini model that records its calls."""
+
+    def __init__(self, flashcards=None, delay=0.0):
+        self.flashcards = flashcards if flashcards is not None else [
+            GeneratedFlashcard(front="What is 猫 (ねこ)?", back="Cat"),
+            GeneratedFlashcard(front="What is 犬 (いぬ)?", back="Dog"),
+        ]
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def invoke(self, messages):
+        self.calls.append(messages)
+        return FlashcardBatch(flashcards=self.flashcards)
+
+    async def ainvoke(self, messages):
+        self.calls.append(messages)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return FlashcardBatch(flashcards=self.flashcards)
+
+
+def make_image_bytes(size=(800, 600), fmt="PNG", color=(255, 255, 255)) -> bytes:
+    """Create an encoded test image."""
+    output = io.BytesIO()
+    Image.new("RGB", size, color).save(output, format=fmt)
+    return output.getvalue()
+
+
+def make_image_base64(size=(800, 600), fmt="PNG") -> str:
+    """Create a base64 encoded test image."""
+    return base64.b64encode(make_image_bytes(size, fmt)).decode()
+
+
+@pytest.fixture(autouse=True)
+def clear_llm_cache():
+    """Start every test with an empty response cache."""
+    llm_router.llm_service.cache.clear()
+    yield
+    llm_router.llm_service.cache.clear()
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """Replace the router's model with a fake so no Gemini calls are made."""
+    model = FakeModel()
+    monkeypatch.setattr(llm_router.llm_service, "model", model)
+    return model
+
+
+@pytest.mark.integration
+class TestGenerateFromText:
+    """Test flashcard generation from text."""
+
+    def test_generate_from_text_success(self, client, auth_headers, fake_model):
+        """Test generating flashcards from text."""
+        response = client.post(
+            "/llm/generate-from-text",
+            headers=auth_headers,
+            json={"text": "猫 means cat, 犬 means dog", "num_cards": 2}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["flashcards"]) == 2
+        assert data["flashcards"][0]["back"] == "Cat"
+        assert len(fake_model.calls) == 1
+
+    def test_generate_from_text_with_deck(self, client, auth_headers, test_deck, fake_model):
+        """Test generating flashcards for a deck the user owns."""
+        response = client.post(
+            "/llm/generate-from-text",
+            headers=auth_headers,
+            json={"text": "猫 means cat", "num_cards": 2, "deck_id": test_deck.id}
+        )
+        assert response.status_code == 200
+
+    def test_generate_from_text_invalid_deck(self, client, auth_headers, fake_model):
+        """Test generating flashcards for a non-existent deck."""
+        response = client.post(
+            "/llm/generate-from-text",
+            headers=auth_headers,
+            json={"text": "猫 means cat", "num_cards": 2, "deck_id": 99999}
+        )
+        assert response.status_code == 404
+        assert fake_model.calls == []
+
+    def test_generate_from_text_refused(self, client, auth_headers, monkeypatch):
+        """Test that an empty model response is reported as an error."""
+        monkeypatch.setattr(llm_router.llm_service, "model", FakeModel(flashcards=[]))
+        response = client.post(
+            "/llm/generate-from-text",
+            headers=auth_headers,
+            json={"text": "Write me a poem", "num_cards": 2}
+        )
+        assert response.status_code == 500
+        assert "educational content" in response.json()["detail"]
+
+    def test_generate_from_text_unauthenticated(self, client):
+        """Test generating flashcards without authentication."""
+        response = client.post("/llm/generate-from-text", json={"text": "猫", "num_cards": 2})
+        assert response.status_code == 401
+
+
+@pytest.mark.integration
+class TestGenerateFromImage:
+    """Test flashcard generation from images."""
+
+    def test_generate_from_image_success(self, client, auth_headers, fake_model):
+        """Test generating flashcards from a base64 encoded image."""
+        response = client.post(
+            "/llm/generate-from-image",
+            headers=auth_headers,
+            json={"image_base64": make_image_base64(), "num_cards": 2}
+        )
+        assert response.status_code == 200
+        assert len(response.json()["flashcards"]) == 2
+        content = fake_model.calls[0][0].content
+        assert content[1]["type"] == "image_url"
+        # The PNG upload is re-encoded before it is sent to the model
+        assert content[1]["image_url"].startswith("data:image/jpeg;base64,")
+
+    def test_generate_from_image_invalid_image(self, client, auth_headers, fake_model):
+        """Test that uploads which are not images are rejected."""
+        response = client.post(
+            "/llm/generate-from-image",
+            headers=auth_headers,
+            json={"image_base64": base64.b64encode(b"not an image").decode(), "num_cards": 2}
+        )
+        assert response.status_code == 400
+        assert fake_model.calls == []
+
+    def test_generate_from_image_too_many_pixels(self, client, auth_headers, fake_model, monkeypatch):
+        """Test that a decompression bomb is rejected with 400."""
+        monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+        response = client.post(
+            "/llm/generate-from-image",
+            headers=auth_headers,
+            json={"image_base64": make_image_base64(), "num_cards": 2}
+        )
+        assert response.status_code == 400
+        assert fake_model.calls == []
+
+
+@pytest.mark.integration
+class TestGenerateFromImages:
+    """Test flashcard generation from several images in one request."""
+
+    def test_generate_from_images_success(self, client, auth_headers, fake_model):
+        """Test that the images are sent together and one deduplicated batch is returned."""
+        response = client.post(
+            "/llm/generate-from-images",
+            headers=auth_headers,
+            json={"images_base64": [make_image_base64(), make_image_base64(fmt="JPEG")], "num_cards": 3}
+        )
+        assert response.status_code == 200
+        fronts = [card["front"] for card in response.json()["flashcards"]]
+        assert len(fronts) == len(set(fronts))
+        assert len(fake_model.calls) == 1
+
+    def test_generate_from_images_empty_list(self, client, auth_headers, fake_model):
+        """Test that at least one image is required."""
+        response = client.post(
+            "/llm/generate-from-images",
+            headers=auth_headers,
+            json={"images_base64": [], "num_cards": 2}
+        )
+        assert response.status_code == 422
+
+    def test_generate_from_images_invalid_base64(self, client, auth_headers, fake_model):
+        """Test that an image that is not valid base64 is rejected with 400 before the model is called."""
+        response = client.post(
+            "/llm/generate-from-images",
+            headers=auth_headers,
+            json={"images_base64": [make_image_base64(), "not base64!"], "num_cards": 2}
+        )
+        assert response.status_code == 400
+        assert fake_model.calls == []
+
+    async def test_images_are_grouped_per_call(self):
+        """Test that more images than images_per_call are split into a few calls."""
+        service = LLMService()
+        service.model = FakeModel()
+        service.images_per_call = 2
+        images = [make_image_bytes(color=(i * 40, 0, 0)) for i in range(5)]
+
+        result = await service.agenerate_flashcards_from_images(images, count=4)
+
+        assert len(service.model.calls) == 3
+        image_counts = [
+            len([part for part in call[0].content if part["type"] == "image_url"])
+            for call in service.model.calls
+        ]
+        assert sorted(image_counts) == [1, 2, 2]
+        assert [card.front for card in result.flashcards] == ["What is 猫 (ねこ)?", "What is 犬 (いぬ)?"]
+
+
+@pytest.mark.integration
+class TestGenerateFromImageUpload:
+    """Test flashcard generation from multipart image uploads."""
+
+    def test_upload_multiple_images(self, client, auth_headers, fake_model):
+        """Test that all uploaded images are sent to the model in one call."""
+        response = client.post(
+            "/llm/generate-from-image/upload",
+            headers=auth_headers,
+            files=[
+                ("images", ("page1.png", make_image_bytes(color=(255, 255, 255)), "image/png")),
+                ("images", ("page2.jpg", make_image_bytes(fmt="JPEG", color=(0, 0, 0)), "image/jpeg")),
+            ],
+            data={"num_cards": "2"}
+        )
+        assert response.status_code == 200
+        assert len(response.json()["flashcards"]) == 2
+        assert len(fake_model.calls) == 1
+        image_parts = [part for part in fake_model.calls[0][0].content if part["type"] == "image_url"]
+        assert len(image_parts) == 2
+
+    def test_upload_with_invalid_deck(self, client, auth_headers, fake_model):
+        """Test uploading images for a deck the user does not own."""
+        response = client.post(
+            "/llm/generate-from-image/upload",
+            headers=auth_headers,
+            files=[("images", ("page1.png", make_image_bytes(), "image/png"))],
+            data={"num_cards": "2", "deck_id": "99999"}
+        )
+        assert response.status_code == 404
+
+    def test_upload_too_large(self, client, auth_headers, fake_model, monkeypatch):
+        """Test that images above the size limit are rejected."""
+        monkeypatch.setattr(llm_router, "LLM_MAX_UPLOAD_BYTES", 100)
+        response = client.post(
+            "/llm/generate-from-image/upload",
+            headers=auth_headers,
+            files=[("images", ("page1.png", make_image_bytes(), "image/png"))],
+        )
+        assert response.status_code == 413
+        assert fake_model.calls == []
+
+    def test_upload_too_many_images(self, client, auth_headers, fake_model, monkeypatch):
+        """Test that the number of images per request is limited."""
+        monkeypatch.setattr(llm_router, "LLM_MAX_UPLOAD_FILES", 1)
+        response = client.post(
+            "/llm/generate-from-image/upload",
+            headers=auth_headers,
+            files=[
+                ("images", ("page1.png", make_image_bytes(), "image/png")),
+                ("images", ("page2.png", make_image_bytes(), "image/png")),
+            ],
+        )
+        assert response.status_code == 400
+
+    def test_upload_unauthenticated(self, client):
+        """Test uploading images without authentication."""
+        response = client.post(
+            "/llm/generate-from-image/upload",
+            files=[("images", ("page1.png", make_image_bytes(), "image/png"))],
+        )
+        assert response.status_code == 401
+
+
+@pytest.mark.unit
+class TestAsyncGeneration:
+    """Test the async generation path of the LLM service."""
+
+    async def test_agenerate_limits_concurrency(self):
+        """Test that no more than max_concurrency model calls run at once."""
+        service = LLMService()
+        service.model = FakeModel(delay=0.01)
+        service.max_concurrency = 2
+
+        results = await asyncio.gather(*[
+            service.agenerate_flashcards(text=f"lesson {i}", count=2) for i in range(6)
+        ])
+
+        assert len(results) == 6
+        assert len(service.model.calls) == 6
+        assert service.model.max_in_flight == 2
+
+    async def test_agenerate_rejects_missing_input(self):
+        """Test that text or image input is required."""
+        service = LLMService()
+        service.model = FakeModel()
+        with pytest.raises(ValueError):
+            await service.agenerate_flashcards(count=2)
+
+
+class ChunkEchoModel:
+    """Fake model that returns one card per requested card, naming the chunk it came from."""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        prompt = messages[0].content
+        self.prompts.append(prompt)
+        count = int(prompt.split("Generate exactly ")[1].split()[0])
+        chunk_id = len(self.prompts)
+        return FlashcardBatch(flashcards=[
+            GeneratedFlashcard(front=f"chunk {chunk_id} card {i}", back="answer") for i in range(count)
+        ] + [GeneratedFlashcard(front="Shared card", back="duplicate in every chunk")])
+
+
+@pytest.mark.unit
+class TestChunkedGeneration:
+    """Test splitting long texts and merging the per-chunk results."""
+
+    def test_short_text_is_not_split(self):
+        """Test that texts below the limit stay in one chunk."""
+        assert split_into_chunks("猫はかわいい。", max_chars=100, overlap=10) == ["猫はかわいい。"]
+
+    def test_split_on_japanese_sentence_endings(self):
+        """Test that chunks end after 。 and respect the size limit."""
+        text = "".join(f"これは{i}番目の文です。" for i in range(40))
+        chunks = split_into_chunks(text, max_chars=60, overlap=0)
+
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 60 for chunk in chunks)
+        assert all(chunk.endswith("。") for chunk in chunks)
+        assert "".join(chunk.replace(" ", "") for chunk in chunks) == text
+
+    def test_chunks_overlap(self):
+        """Test that each chunk repeats the last sentence of the previous chunk."""
+        text = " ".join(f"Sentence number {i} is here." for i in range(30))
+        chunks = split_into_chunks(text, max_chars=120, overlap=40)
+
+        for previous, current in zip(chunks, chunks[1:]):
+            last_sentence = previous.split(". ")[-1]
+            assert current.startswith(last_sentence)
+
+    def test_split_on_paragraphs_and_long_sentences(self):
+        """Test paragraph boundaries and hard splitting of oversized sentences."""
+        text = "First paragraph without ending\n\nSecond paragraph\n\n" + "x" * 250
+        chunks = split_into_chunks(text, max_chars=100, overlap=0)
+
+        assert chunks[0] == "First paragraph without ending Second paragraph"
+        assert all(len(chunk) <= 100 for chunk in chunks)
+
+    def test_merge_deduplicates_and_trims(self):
+        """Test that duplicate fronts are dropped and cards are taken from every batch."""
+        batches = [
+            FlashcardBatch(flashcards=[GeneratedFlashcard(front="猫?", back="cat"), GeneratedFlashcard(front="a", back="1")]),
+            FlashcardBatch(flashcards=[GeneratedFlashcard(front="猫", back="cat"), GeneratedFlashcard(front="b", back="2")]),
+        ]
+        merged = merge_batches(batches, count=3)
+
+        assert [card.front for card in merged.flashcards] == ["猫?", "a", "b"]
+
+    async def test_long_text_is_generated_per_chunk(self):
+        """Test the map-reduce path for texts above the chunk limit."""
+        service = LLMService()
+        service.model = ChunkEchoModel()
+        service.chunk_chars = 200
+        service.chunk_overlap = 20
+        text = "".join(f"これは{i}番目の文です。" for i in range(60))
+
+        result = await service.agenerate_flashcards(text=text, count=10)
+
+        assert len(service.model.prompts) > 1
+        assert len(result.flashcards) == 10
+        fronts = [card.front for card in result.flashcards]
+        assert len(set(fronts)) == len(fronts)
+        assert fronts.count("Shared card") == 1
+
+
+@pytest.mark.unit
+class TestGenerationCache:
+    """Test the content-addressed LLM response cache."""
+
+    async def test_repeated_input_is_served_from_cache(self):
+        """Test that the same text and count only hit the model once."""
+        service = LLMService()
+        service.model = FakeModel()
+
+        first = await service.agenerate_flashcards(text="猫 means cat", count=2)
+        second = await service.agenerate_flashcards(text="猫 means cat", count=2)
+
+        assert first == second
+        assert len(service.model.calls) == 1
+        assert service.cache.stats()["hits"] == 1
+        assert service.cache.stats()["misses"] == 1
+
+    def test_key_depends_on_count_and_input(self):
+        """Test that count, text and image bytes all change the key."""
+        key = GenerationCache.make_key("猫", None, 2)
+        assert key == GenerationCache.make_key("猫", None, 2)
+        assert key != GenerationCache.make_key("猫", None, 3)
+        assert key != GenerationCache.make_key("犬", None, 2)
+        assert key != GenerationCache.make_key(None, "猫".encode(), 2)
+
+    def test_expired_entries_are_misses(self):
+        """Test that entries older than the TTL are not returned."""
+        cache = GenerationCache(max_entries=10, ttl_seconds=60, persistent=False)
+        batch = FlashcardBatch(flashcards=[GeneratedFlashcard(front="a", back="b")])
+        cache.set("key", batch)
+        stored_at, stored = cache._entries["key"]
+        cache._entries["key"] = (stored_at - 120, stored)
+
+        assert cache.get("key") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test LRU eviction once max_entries is reached."""
+        cache = GenerationCache(max_entries=2, ttl_seconds=60, persistent=False)
+        batch = FlashcardBatch(flashcards=[GeneratedFlashcard(front="a", back="b")])
+        cache.set("first", batch)
+        cache.set("second", batch)
+        cache.get("first")
+        cache.set("third", batch)
+
+        assert cache.get("second") is None
+        assert cache.get("first") is not None
+        assert cache.get("third") is not None
+
+    def test_persistent_tier_survives_new_process_cache(self):
+        """Test that a fresh cache finds entries written to the database."""
+        engine = create_engine(
+            "sqlite:///:memory:",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        batch = FlashcardBatch(flashcards=[GeneratedFlashcard(front="a", back="b")])
+
+        GenerationCache(ttl_seconds=60, persistent=True, session_factory=session_factory).set("key", batch)
+        cache = GenerationCache(ttl_seconds=60, persistent=True, session_factory=session_factory)
+
+        assert cache.get("key") == batch
+        assert cache.get("key") == batch
+        assert cache.stats()["persistent_hits"] == 1
+        assert cache.stats()["hits"] == 1
+
+    def test_persistent_write_prunes_expired_rows(self):
+        """Test that writing an entry deletes the expired rows of other keys, not only looked up ones."""
+        engine = create_engine(
+            "sqlite:///:memory:",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        batch = FlashcardBatch(flashcards=[GeneratedFlashcard(front="a", back="b")])
+        with session_factory() as db:
+            db.add(DBGenerationCacheEntry(key="old", response=batch.model_dump_json(), created_at=datetime.now() - timedelta(hours=1)))
+            db.commit()
+
+        GenerationCache(ttl_seconds=60, persistent=True, session_factory=session_factory).set("new", batch)
+
+        with session_factory() as db:
+            assert [entry.key for entry in db.query(DBGenerationCacheEntry).all()] == ["new"]
+
+
+@pytest.mark.integration
+class TestCacheStats:
+    """Test the cache statistics reported by the metrics endpoint."""
+
+    def test_cache_stats_counts_hits(self, client, auth_headers, fake_model):
+        """Test that a repeated request shows up as a cache hit."""
+        for _ in range(2):
+            client.post(
+                "/llm/generate-from-text",
+                headers=auth_headers,
+                json={"text": "猫 means cat", "num_cards": 2}
+            )
+
+        response = client.get("/metrics", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()["llm_cache"]
+        assert data["hits"] == 1
+        assert data["misses"] == 1
+        assert len(fake_model.calls) == 1
+
+
+class ManualJobQueue(GenerationJobQueue):
+    """Job queue that accepts jobs but only runs them when a test calls run_job."""
+
+    def __init__(self, session_factory):
+        super().__init__(session_factory=session_factory, workers=0)
+        self.submitted = []
+
+    def submit(self, job_id: str):
+        self.submitted.append(job_id)
+
+
+@pytest.fixture
+def job_queue(db_session, monkeypatch):
+    """Job queue of the LLM router that runs jobs in the test database session."""
+    queue = ManualJobQueue(session_factory=lambda: db_session)
+    monkeypatch.setattr(llm_router, "job_queue", queue)
+    return queue
+
+
+@pytest.mark.integration
+class TestGenerationJobs:
+    """Test background generation jobs."""
+
+    def test_background_text_generation_returns_job(self, client, auth_headers, db_session, fake_model, job_queue):
+        """Test that background=true queues a job instead of calling the model."""
+        response = client.post(
+            "/llm/generate-from-text?background=true",
+            headers=auth_headers,
+            json={"text": "猫 means cat", "num_cards": 2}
+        )
+        assert response.status_code == 202
+        data = response.json()
+        assert data["status"] == "pending"
+        assert data["source"] == "text"
+        assert data["flashcards"] is None
+        assert fake_model.calls == []
+        assert db_session.get(DBGenerationJob, data["id"]) is not None
+        assert job_queue.submitted == [data["id"]]
+
+    def test_background_generation_without_workers(self, client, auth_headers, db_session):
+        """Test that a job is rejected with 503 instead of staying pending forever when no workers run."""
+        response = client.post(
+            "/llm/generate-from-text?background=true",
+            headers=auth_headers,
+            json={"text": "猫 means cat", "num_cards": 2}
+        )
+        assert response.status_code == 503
+        assert db_session.query(DBGenerationJob).count() == 0
+
+    def test_job_result_can_be_polled(self, client, auth_headers, db_session, fake_model, job_queue):
+        """Test polling a job before and after a worker ran it."""
+        job_id = client.post(
+            "/llm/generate-from-image?background=true",
+            headers=auth_headers,
+            json={"image_base64": make_image_base64(), "num_cards": 2}
+        ).json()["id"]
+
+        asyncio.run(job_queue.run_job(job_id))
+
+        response = client.get(f"/llm/jobs/{job_id}", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "succeeded"
+        assert [card["back"] for card in data["flashcards"]] == ["Cat", "Dog"]
+        assert data["finished_at"] is not None
+        assert db_session.get(DBGenerationJob, job_id).image is None
+
+    def test_background_upload_job(self, client, auth_headers, db_session, fake_model, job_queue):
+        """Test that uploaded images can be generated in a job, which stores and then deletes the downscaled pages."""
+        response = client.post(
+            "/llm/generate-from-image/upload?background=true",
+            headers=auth_headers,
+            files=[
+                ("images", ("page1.png", make_image_bytes(size=(3000, 2000)), "image/png")),
+                ("images", ("page2.jpg", make_image_bytes(fmt="JPEG", color=(0, 0, 0)), "image/jpeg")),
+            ],
+            data={"num_cards": "2"}
+        )
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+        assert response.json()["source"] == "images"
+        pages = db_session.query(DBGenerationJobImage).filter_by(job_id=job_id).order_by(DBGenerationJobImage.position).all()
+        assert len(pages) == 2
+        assert Image.open(io.BytesIO(pages[0].data)).size == (1568, 1045)
+        assert fake_model.calls == []
+
+        asyncio.run(job_queue.run_job(job_id))
+
+        assert client.get(f"/llm/jobs/{job_id}", headers=auth_headers).json()["status"] == "succeeded"
+        image_parts = [part for part in fake_model.calls[0][0].content if part["type"] == "image_url"]
+        assert len(image_parts) == 2
+        assert db_session.query(DBGenerationJobImage).filter_by(job_id=job_id).count() == 0
+
+    def test_failed_job_reports_error(self, client, auth_headers, monkeypatch, job_queue):
+        """Test that a model refusal marks the job as failed."""
+        monkeypatch.setattr(llm_router.llm_service, "model", FakeModel(flashcards=[]))
+        job_id = client.post(
+            "/llm/generate-from-text?background=true",
+            headers=auth_headers,
+            json={"text": "Write me a poem", "num_cards": 2}
+        ).json()["id"]
+
+        asyncio.run(job_queue.run_job(job_id))
+
+        data = client.get(f"/llm/jobs/{job_id}", headers=auth_headers).json()
+        assert data["status"] == "failed"
+        assert "educational content" in data["error"]
+
+    def test_job_events_stream(self, client, auth_headers, db_session, fake_model, job_queue):
+        """Test that the events stream sends the final status and closes, polling with sessions of the overridden get_db."""
+        job_id = client.post(
+            "/llm/generate-from-text?background=true",
+            headers=auth_headers,
+            json={"text": "猫 means cat", "num_cards": 2}
+        ).json()["id"]
+        asyncio.run(job_queue.run_job(job_id))
+
+        response = client.get(f"/llm/jobs/{job_id}/events", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert "event: status" in response.text
+        assert '"status":"succeeded"' in response.text
+
+    def test_get_job_of_other_user(self, client, auth_headers, db_session):
+        """Test that jobs of other users are not visible."""
+        other_user = DBUser(username="otheruser", email="other@example.com", hashed_password="x")
+        db_session.add(other_user)
+        db_session.commit()
+        job = DBGenerationJob(source="text", text="猫", num_cards=2, user_id=other_user.id)
+        db_session.add(job)
+        db_session.commit()
+
+        response = client.get(f"/llm/jobs/{job.id}", headers=auth_headers)
+        assert response.status_code == 404
+
+    def test_unfinished_jobs_are_recovered(self, db_session, test_user, job_queue):
+        """Test that pending jobs and running jobs with an expired lease are queued again, without changing them."""
+        now = datetime.now()
+        jobs = {
+            "pending": DBGenerationJob(source="text", text="a", num_cards=2, user_id=test_user.id),
+            "abandoned": DBGenerationJob(source="text", text="b", num_cards=2, user_id=test_user.id,
+                                         status=GenerationJobStatus.RUNNING, heartbeat_at=now - timedelta(hours=1)),
+            "running": DBGenerationJob(source="text", text="c", num_cards=2, user_id=test_user.id,
+                                       status=GenerationJobStatus.RUNNING, heartbeat_at=now),
+            "done": DBGenerationJob(source="text", text="d", num_cards=2, user_id=test_user.id,
+                                    status=GenerationJobStatus.SUCCEEDED),
+        }
+        db_session.add_all(jobs.values())
+        db_session.commit()
+        ids = {name: job.id for name, job in jobs.items()}
+
+        recovered = job_queue._recover_jobs()
+
+        assert set(recovered) == {ids["pending"], ids["abandoned"]}
+        assert db_session.get(DBGenerationJob, ids["running"]).status == GenerationJobStatus.RUNNING
+
+    def test_job_is_claimed_once(self, db_session, test_user, job_queue):
+        """Test that of two workers claiming the same job only the first gets it."""
+        job = DBGenerationJob(source="text", text="a", num_cards=2, user_id=test_user.id)
+        db_session.add(job)
+        db_session.commit()
+        job_id = job.id
+
+        assert job_queue.claim(job_id) is not None
+        assert job_queue.claim(job_id) is None
+        assert db_session.get(DBGenerationJob, job_id).status == GenerationJobStatus.RUNNING
+
+    def test_no_session_open_during_generation(self, db_session, test_user, job_queue, fake_model, monkeypatch):
+        """Test that a worker reads the job and stores its result with short sessions, none is open while the model runs."""
+        job = DBGenerationJob(source="text", text="猫 means cat", num_cards=2, user_id=test_user.id)
+        db_session.add(job)
+        db_session.commit()
+        job_id = job.id
+        open_sessions = []
+        open_during_call = []
+
+        class TrackedSession:
+            def __getattr__(self, name):
+                return getattr(db_session, name)
+
+            def close(self):
+                open_sessions.remove(self)
+
+        def session_factory():
+            session = TrackedSession()
+            open_sessions.append(session)
+            return session
+
+        async def ainvoke(messages):
+            open_during_call.append(len(open_sessions))
+            return FlashcardBatch(flashcards=fake_model.flashcards)
+
+        job_queue.session_factory = session_factory
+        monkeypatch.setattr(fake_model, "ainvoke", ainvoke)
+        asyncio.run(job_queue.run_job(job_id))
+
+        assert open_during_call == [0]
+        assert open_sessions == []
+        assert db_session.get(DBGenerationJob, job_id).status == GenerationJobStatus.SUCCEEDED
+
+    def test_job_running_elsewhere_is_not_run(self, db_session, test_user, job_queue, fake_model):
+        """Test that a worker skips a job another live process is running."""
+        job = DBGenerationJob(source="text", text="a", num_cards=2, user_id=test_user.id,
+                              status=GenerationJobStatus.RUNNING, heartbeat_at=datetime.now())
+        db_session.add(job)
+        db_session.commit()
+
+        asyncio.run(job_queue.run_job(job.id))
+
+        assert fake_model.calls == []
+
+    def test_expired_lease_is_taken_over(self, db_session, test_user, job_queue, fake_model, monkeypatch):
+        """Test that an abandoned job runs again and the late result of its first worker is discarded."""
+        job = DBGenerationJob(source="text", text="猫 means cat", num_cards=2, user_id=test_user.id)
+        db_session.add(job)
+        db_session.commit()
+        job_id = job.id
+        first_claim = job_queue.claim(job_id)
+        db_session.execute(
+            update(DBGenerationJob).where(DBGenerationJob.id == job_id).values(heartbeat_at=datetime.now() - timedelta(hours=1))
+        )
+        db_session.commit()
+
+        asyncio.run(job_queue.run_job(job_id))
+        # The first worker comes back late with a failure
+        monkeypatch.setattr(llm_router.llm_service, "model", FakeModel(flashcards=[]))
+        late = {**job_queue.load_inputs(job_id), "text": "Write me a poem"}
+        asyncio.run(job_queue.process(job_id, late, first_claim))
+
+        db_session.expire_all()
+        job = db_session.get(DBGenerationJob, job_id)
+        assert job.status == GenerationJobStatus.SUCCEEDED
+        assert job.error is None
+        assert job.started_at != first_claim
+
+
+class FakeStreamModel:
+    """Stand-in for the plain Gemini chat model that streams JSON lines in small pieces."""
+
+    def __init__(self, lines=None, piece_size=7):
+        self.lines = lines if lines is not None else [
+            '{"front": "What is 猫 (ねこ)?", "back": "Cat"}',
+            '{"front": "What is 犬 (いぬ)?", "back": "Dog"}',
+        ]
+        self.piece_size = piece_size
+        self.calls = []
+
+    async def astream(self, messages):
+        self.calls.append(messages)
+        output = "\n".join(self.lines)
+        for start in range(0, len(output), self.piece_size):
+            yield AIMessageChunk(content=output[start:start + self.piece_size])
+
+
+def parse_sse(body: str) -> list[tuple[str, dict]]:
+    """Split a Server-Sent Events body into (event, data) pairs."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.fixture
+def fake_stream_model(monkeypatch):
+    """Replace the router's streaming model with a fake."""
+    model = FakeStreamModel()
+    monkeypatch.setattr(llm_router.llm_service, "stream_model", model)
+    return model
+
+
+@pytest.mark.integration
+class TestStreamingGeneration:
+    """Test streamed flashcard generation."""
+
+    def test_stream_from_text(self, client, auth_headers, fake_model, fake_stream_model):
+        """Test that every card is sent as its own event, followed by done."""
+        response = client.post(
+            "/llm/generate-from-text/stream",
+            headers=auth_headers,
+            json={"text": "猫 means cat and 犬 means dog", "num_cards": 2}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(response.text)
+        assert [event for event, _ in events] == ["card", "card", "done"]
+        assert events[0][1] == {"front": "What is 猫 (ねこ)?", "back": "Cat"}
+        assert events[2][1]["count"] == 2
+        assert "JSON object on its own line" in fake_stream_model.calls[0][0].content
+
+    def test_stream_invalid_deck(self, client, auth_headers, fake_model, fake_stream_model):
+        """Test that deck errors are reported before the stream starts."""
+        response = client.post(
+            "/llm/generate-from-text/stream",
+            headers=auth_headers,
+            json={"text": "猫 means cat", "num_cards": 2, "deck_id": 99999}
+        )
+        assert response.status_code == 404
+        assert fake_stream_model.calls == []
+
+    def test_stream_refused_sends_error_event(self, client, auth_headers, fake_model, monkeypatch):
+        """Test that a refusal is sent as an error event."""
+        monkeypatch.setattr(llm_router.llm_service, "stream_model", FakeStreamModel(lines=[]))
+        response = client.post(
+            "/llm/generate-from-text/stream",
+            headers=auth_headers,
+            json={"text": "Write me a poem", "num_cards": 2}
+        )
+        events = parse_sse(response.text)
+        assert [event for event, _ in events] == ["error"]
+        assert "educational content" in events[0][1]["detail"]
+
+    def test_stream_from_upload(self, client, auth_headers, fake_model, fake_stream_model):
+        """Test streaming cards from an uploaded image."""
+        response = client.post(
+            "/llm/generate-from-image/upload/stream",
+            headers=auth_headers,
+            files=[("images", ("page.png", make_image_bytes(), "image/png"))],
+            data={"num_cards": "2"}
+        )
+        assert response.status_code == 200
+        assert [event for event, _ in parse_sse(response.text)] == ["card", "card", "done"]
+
+    def test_stream_upload_invalid_image(self, client, auth_headers, fake_model, fake_stream_model):
+        """Test that unreadable uploads are rejected before the stream starts."""
+        response = client.post(
+            "/llm/generate-from-image/upload/stream",
+            headers=auth_headers,
+            files=[("images", ("page.png", b"not an image", "image/png"))],
+            data={"num_cards": "2"}
+        )
+        assert response.status_code == 400
+
+    async def test_stream_skips_noise_and_duplicates(self):
+        """Test that fences, broken lines and repeated fronts are dropped and count is respected."""
+        service = LLMService()
+        service.model = FakeModel()
+        service.stream_model = FakeStreamModel(lines=[
+            "```json",
+            '{"front": "A?", "back": "1"}',
+            '{"front": "broken',
+            '{"front": "a ?", "back": "again"}',
+            '{"front": "B?", "back": "2"}',
+            '{"front": "C?", "back": "3"}',
+            "```",
+        ])
+
+        cards = [card async for card in service.astream_flashcards(text="Lesson", count=2)]
+
+        assert [card.front for card in cards] == ["A?", "B?"]
+        cached = service.cache.get(service.cache.make_key("Lesson", None, 2))
+        assert [card.front for card in cached.flashcards] == ["A?", "B?"]
+
+    async def test_stream_reraises_error_when_every_call_fails(self):
+        """Test that the error of the model calls is raised, not the refusal error of an empty result."""
+        class FailingModel:
+            async def ainvoke(self, messages):
+                raise RuntimeError("Quota exceeded")
+
+        service = LLMService()
+        service.model = FailingModel()
+        service.chunk_chars = 200
+        service.chunk_overlap = 20
+        text = "".join(f"これは{i}番目の文です。" for i in range(60))
+
+        with pytest.raises(RuntimeError, match="Quota exceeded"):
+            [card async for card in service.astream_flashcards(text=text, count=4)]
+
+    async def test_stream_shares_cache_with_image_generation(self):
+        """Test that a multi-image generation is served from the cache by the stream, with the same model calls."""
+        service = LLMService()
+        service.model = FakeModel()
+        service.images_per_call = 2
+        service.cache.clear()
+        images = [make_image_bytes(color=(i * 40, 0, 0)) for i in range(5)]
+
+        result = await service.agenerate_flashcards_from_images(images, count=4)
+        streamed = [card async for card in service.astream_flashcards(images=images, count=4)]
+
+        assert streamed == result.flashcards
+        assert len(service.model.calls) == 3
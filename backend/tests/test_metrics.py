@@ -0,0 +1,92 @@
+"""Tests for the metrics endpoint and the database pool telemetry."""
+import pytest
+from sqlalchemy import create_engine, exc
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+
+from src import database
+
+
+@pytest.mark.integration
+class TestMetrics:
+    """Test the runtime metrics endpoint."""
+
+    def test_password_hashing_metrics(self, client, auth_headers):
+        """Test that logins are counted by the password hashing pool."""
+        before = client.get("/metrics", headers=auth_headers).json()["password_hashing"]
+        client.post("/login", data={"username": "testuser", "password": "testpassword123"})
+        after = client.get("/metrics", headers=auth_headers).json()["password_hashing"]
+
+        assert after["completed"] == before["completed"] + 1
+        assert after["pending"] == 0
+        assert after["queued"] == 0
+        assert after["bcrypt_rounds"] > 0
+
+    def test_metrics_unauthenticated(self, client):
+        """Test getting metrics without authentication."""
+        response = client.get("/metrics")
+        assert response.status_code == 401
+
+    def test_database_pool_metrics(self, client, auth_headers):
+        """Test that the pool of the sync engine is reported."""
+        response = client.get("/metrics", headers=auth_headers)
+        assert response.status_code == 200
+        pool = response.json()["database_pools"]["sync"]
+        assert pool["pool_class"] in ("QueuePool", "NullPool")
+        assert pool["timeouts"] == 0
+
+
+@pytest.fixture
+def instrumented_engine(tmp_path, monkeypatch):
+    """A SQLite engine with one pooled and one overflow connection, registered for telemetry."""
+    monkeypatch.setattr(database, "_pool_stats", {})
+    options = {"poolclass": QueuePool, "pool_size": 1, "max_overflow": 1, "pool_timeout": 0.05}
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", **options)
+    database.instrument_engine("test", engine, options)
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.unit
+class TestPoolTelemetry:
+    """Test the connection pool counters fed by pool events."""
+
+    def test_checkout_and_checkin(self, instrumented_engine):
+        """Test that checked out connections are counted while in use."""
+        with instrumented_engine.connect():
+            stats = database.get_pool_stats()["test"]
+            assert stats["in_use"] == 1
+            assert stats["checkouts"] == 1
+            assert stats["connects"] == 1
+            assert stats["overflow_connects"] == 0
+
+        stats = database.get_pool_stats()["test"]
+        assert stats["in_use"] == 0
+        assert stats["idle"] == 1
+        assert stats["max_in_use"] == 1
+        assert stats["size"] == 1
+        assert stats["max_overflow"] == 1
+
+    def test_overflow_and_timeout(self, instrumented_engine):
+        """Test that overflow connections and checkout timeouts are counted."""
+        with instrumented_engine.connect(), instrumented_engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                instrumented_engine.connect()
+
+        stats = database.get_pool_stats()["test"]
+        assert stats["checkouts"] == 2
+        assert stats["max_in_use"] == 2
+        assert stats["overflow_connects"] == 1
+        assert stats["timeouts"] == 1
+        assert stats["wait_ms_max"] >= 50
+
+    def test_session_checkout_wait_is_measured(self, instrumented_engine):
+        """Test that a session waiting for a connection is timed, sessions check out through engine.connect()."""
+        with instrumented_engine.connect(), instrumented_engine.connect():
+            with Session(instrumented_engine) as session:
+                with pytest.raises(exc.TimeoutError):
+                    session.connection()
+
+        stats = database.get_pool_stats()["test"]
+        assert stats["timeouts"] == 1
+        assert stats["wait_ms_max"] >= 50
@@ -0,0 +1,96 @@
+"""Regression tests for the query plans of the due-card, listing and review history queries."""
+import pytest
+from datetime import datetime
+
+from sqlalchemy import select
+
+from src import review_queue
+from src.models import DBFlashcard, DBDeck
+from src.pagination import paginate, encode_cursor
+from src.replay_reviews import review_history_statement
+
+
+def explain(db_session, query) -> str:
+    """Return SQLite's query plan of an ORM query or a select statement as one string."""
+    statement = getattr(query, "statement", query)
+    compiled = statement.compile(dialect=db_session.get_bind().dialect)
+    params = tuple(
+        value.isoformat(" ") if isinstance(value, datetime) else value
+        for value in (compiled.params[name] for name in compiled.positiontup)
+    )
+    rows = db_session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).fetchall()
+    return "\n".join(row[-1] for row in rows)
+
+
+@pytest.mark.integration
+class TestDueCardQueryPlans:
+    """Test that the due-card queries use the composite indexes."""
+
+    def test_deck_due_query_uses_composite_index(self, db_session, test_flashcard):
+        """Test the due query of a deck, as in GET /decks/{id}/flashcards?due=true."""
+        query = db_session.query(DBFlashcard).filter(
+            DBFlashcard.deck_id == test_flashcard.deck_id,
+            DBFlashcard.user_id == test_flashcard.user_id,
+            DBFlashcard.next_review_at <= datetime.now(),
+        )
+
+        plan = explain(db_session, query)
+        assert "ix_flashcards_user_deck_next_review (user_id=? AND deck_id=? AND next_review_at<?)" in plan
+
+    def test_user_due_query_uses_composite_index(self, db_session, test_flashcard):
+        """Test the due query across all decks, as in GET /flashcards?due=true."""
+        query = db_session.query(DBFlashcard).filter(
+            DBFlashcard.user_id == test_flashcard.user_id,
+            DBFlashcard.next_review_at <= datetime.now(),
+        )
+
+        plan = explain(db_session, query)
+        assert "ix_flashcards_user_next_review (user_id=? AND next_review_at<?)" in plan
+
+    def test_review_queue_is_an_ordered_index_scan(self, db_session, test_flashcard):
+        """Test that the review queue page is read in order from the index, without a sort step."""
+        statement = review_queue.page_statement(
+            test_flashcard.user_id, test_flashcard.deck_id, datetime.now(), limit=50,
+            after=(datetime.now(), test_flashcard.id), new_left=20, reviews_left=200,
+        )
+
+        plan = explain(db_session, statement)
+        assert "USING INDEX ix_flashcards_user_deck_next_review" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.integration
+class TestListingQueryPlans:
+    """Test that deep pages of the listings are index range scans in sort order."""
+
+    def test_deck_flashcards_page(self, db_session, test_flashcard):
+        """Test a later page of a deck's cards, as in GET /decks/{id}/flashcards?cursor=..."""
+        cursor = encode_cursor("created_at", datetime.now(), test_flashcard.id)
+        query = paginate(
+            select(DBFlashcard).where(DBFlashcard.user_id == test_flashcard.user_id, DBFlashcard.deck_id == test_flashcard.deck_id),
+            DBFlashcard.created_at, DBFlashcard.id, cursor, limit=100,
+        )
+
+        plan = explain(db_session, query)
+        assert "USING INDEX ix_flashcards_user_deck_created" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_decks_page(self, db_session, test_deck):
+        """Test a later page of the deck list, as in GET /decks?cursor=..."""
+        cursor = encode_cursor("created_at", datetime.now(), test_deck.id)
+        query = paginate(select(DBDeck).where(DBDeck.user_id == test_deck.user_id), DBDeck.created_at, DBDeck.id, cursor, limit=100)
+
+        plan = explain(db_session, query)
+        assert "USING INDEX ix_decks_user_created" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.integration
+class TestReviewHistoryQueryPlan:
+    """Test that the review history replay streams without sorting."""
+
+    def test_history_is_an_ordered_index_scan(self, db_session, test_user):
+        """Test the history query of src/replay_reviews.py."""
+        plan = explain(db_session, review_history_statement(test_user.id))
+        assert "ix_reviews_user_flashcard_review_at (user_id=?)" in plan
+        assert "TEMP B-TREE" not in plan
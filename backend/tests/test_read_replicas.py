@@ -0,0 +1,118 @@
+"""Tests for routing read-only endpoints to read replicas."""
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src import database
+from src.database import Base
+from src.dependencies import RecentWrites, recent_writes
+from src.models import DBDeck, DBFlashcard
+
+
+@pytest.fixture
+def replica_db(monkeypatch):
+    """A separate in-memory database registered as the only read replica."""
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    replica_session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(database, "replica_session_factories", [replica_session_factory])
+    db = replica_session_factory()
+    yield db
+    db.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def replica_deck(replica_db, test_user, auth_headers):
+    """A deck that only exists on the replica."""
+    deck = DBDeck(name="Replica Deck", user_id=test_user.id, created_at=datetime.now())
+    replica_db.add(deck)
+    replica_db.add(DBFlashcard(front="Replica Q", back="Replica A", user_id=test_user.id, deck=deck, next_review_at=datetime.now()))
+    replica_db.commit()
+    return deck
+
+
+@pytest.mark.integration
+class TestReadReplicaRouting:
+    """Test which database the read endpoints are served from."""
+
+    def test_reads_served_from_replica(self, client, auth_headers, replica_deck):
+        """Test that list and detail endpoints read from the replica."""
+        decks = client.get("/decks", headers=auth_headers).json()
+        assert [deck["name"] for deck in decks] == ["Replica Deck"]
+
+        response = client.get(f"/decks/{replica_deck.id}", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["name"] == "Replica Deck"
+
+        flashcards = client.get(f"/decks/{replica_deck.id}/flashcards", headers=auth_headers).json()
+        assert [card["front"] for card in flashcards] == ["Replica Q"]
+
+        flashcards = client.get("/flashcards", headers=auth_headers).json()
+        assert [card["front"] for card in flashcards] == ["Replica Q"]
+
+    def test_writes_go_to_primary(self, client, auth_headers, replica_deck, db_session):
+        """Test that write endpoints never touch the replica."""
+        response = client.post("/decks", json={"name": "New Deck"}, headers=auth_headers)
+        assert response.status_code == 200
+
+        assert db_session.query(DBDeck).filter(DBDeck.name == "New Deck").count() == 1
+
+    def test_reads_stick_to_primary_after_write(self, client, auth_headers, replica_deck):
+        """Test that a user reads their own writes right after writing."""
+        client.post("/decks", json={"name": "New Deck"}, headers=auth_headers)
+
+        decks = client.get("/decks", headers=auth_headers).json()
+        assert [deck["name"] for deck in decks] == ["New Deck"]
+
+    def test_reads_return_to_replica_after_window(self, client, auth_headers, replica_deck, monkeypatch):
+        """Test that reads move back to the replica once the stickiness window has passed."""
+        monkeypatch.setattr(recent_writes, "window_seconds", 0)
+        client.post("/decks", json={"name": "New Deck"}, headers=auth_headers)
+
+        decks = client.get("/decks", headers=auth_headers).json()
+        assert [deck["name"] for deck in decks] == ["Replica Deck"]
+
+    def test_failed_write_is_not_sticky(self, client, auth_headers, replica_deck):
+        """Test that a request that wrote nothing does not pin the user to the primary."""
+        response = client.put("/decks/9999", json={"name": "Renamed"}, headers=auth_headers)
+        assert response.status_code == 404
+
+        decks = client.get("/decks", headers=auth_headers).json()
+        assert [deck["name"] for deck in decks] == ["Replica Deck"]
+
+
+    def test_stickiness_holds_across_worker_processes(self, client, auth_headers, replica_deck, monkeypatch):
+        """Test that the write is carried by the client, so a worker that did not serve the write still reads the primary."""
+        client.post("/decks", json={"name": "New Deck"}, headers=auth_headers)
+        # Another worker process has its own tracker but the same secret
+        monkeypatch.setattr("src.dependencies.recent_writes", RecentWrites())
+
+        decks = client.get("/decks", headers=auth_headers).json()
+        assert [deck["name"] for deck in decks] == ["New Deck"]
+
+
+@pytest.mark.unit
+class TestRecentWrites:
+    """Test the signed last-write cookie."""
+
+    def test_mark_and_expire(self):
+        """Test that a write is recent within the window and expires after it."""
+        writes = RecentWrites(window_seconds=5, secret="secret")
+        assert not writes.is_recent(1, None)
+
+        cookie = writes.cookie_value(1)
+        assert writes.is_recent(1, cookie)
+        assert not writes.is_recent(2, cookie)
+        assert not writes.is_recent(1, writes.cookie_value(1, at=0))
+
+    def test_forged_cookies_are_ignored(self):
+        """Test that cookies with a wrong signature or malformed values do not pin reads to the primary."""
+        writes = RecentWrites(window_seconds=5, secret="secret")
+        user_id, written_at, _ = writes.cookie_value(1).split(":")
+
+        assert not writes.is_recent(1, f"{user_id}:{written_at}:{'0' * 64}")
+        assert not writes.is_recent(1, RecentWrites(window_seconds=5, secret="other").cookie_value(1))
+        assert not writes.is_recent(1, "garbage")
@@ -0,0 +1,117 @@
+"""Tests for rebuilding flashcard schedules from the review history."""
+import random
+import pytest
+from datetime import datetime, timedelta
+
+from src.models import DBDeck, DBFlashcard, DBReview, DBUser, ReviewFeedback, SchedulerName
+from src.replay_reviews import replay
+from src.spaced_repetition import CardState, SCHEDULERS, SM2Algo
+
+
+@pytest.fixture
+def review_history(db_session, test_user):
+    """Five cards with 0 to 12 random reviews each, and the schedules reviewing them one by one gives."""
+    rng = random.Random(7)
+    start = datetime(2025, 1, 1, 8, 0)
+    cards = [DBFlashcard(front=f"Q{i}", back=f"A{i}", user_id=test_user.id) for i in range(5)]
+    db_session.add_all(cards)
+    db_session.commit()
+
+    expected = {}
+    for i, card in enumerate(cards):
+        scalar = DBFlashcard(easiness_factor=2.5, interval=1, repetitions=0, review_count=0)
+        for day in range(i * 3):
+            feedback = rng.choice(list(ReviewFeedback))
+            review_at = start + timedelta(days=day, minutes=i)
+            db_session.add(DBReview(flashcard_id=card.id, user_id=test_user.id, feedback=feedback, review_at=review_at))
+            SM2Algo.update_flashcard(feedback, scalar, now=review_at)
+        if scalar.review_count:
+            expected[card.id] = scalar
+    # Corrupt the stored schedules, the replay must not depend on them
+    for card in cards:
+        card.easiness_factor, card.interval, card.repetitions, card.review_count = 1.3, 99, 9, 0
+    db_session.commit()
+    return expected
+
+
+def schedule(card) -> tuple:
+    return (card.easiness_factor, card.interval, card.repetitions, card.review_count,
+            card.next_review_at, card.last_reviewed_at)
+
+
+@pytest.mark.integration
+class TestReplayReviews:
+    """Test replaying the review history through the vectorized schedulers."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 4, 10000])
+    def test_replay_matches_reviewing_one_by_one(self, db_session, test_user, review_history, chunk_size):
+        """Test that the rebuilt schedules equal the scalar path, also with cards split across chunks."""
+        stats = replay(db_session, chunk_size=chunk_size)
+
+        assert (stats.users, stats.reviews, stats.cards) == (1, 30, 4)
+        db_session.expire_all()
+        for card_id, scalar in review_history.items():
+            assert schedule(db_session.get(DBFlashcard, card_id)) == schedule(scalar)
+
+    @pytest.mark.parametrize("chunk_size", [4, 10000])
+    def test_replay_with_the_scheduler_of_each_deck(self, db_session, test_user, review_history, chunk_size):
+        """Test that cards of an FSRS deck are rebuilt with FSRS and the others with the user's SM-2 default."""
+        deck = DBDeck(name="FSRS deck", user_id=test_user.id, scheduler=SchedulerName.FSRS)
+        db_session.add(deck)
+        db_session.flush()
+        fsrs_ids = sorted(review_history)[:2]
+        for card_id in fsrs_ids:
+            db_session.get(DBFlashcard, card_id).deck_id = deck.id
+        db_session.commit()
+
+        replay(db_session, chunk_size=chunk_size)
+
+        db_session.expire_all()
+        for card_id, scalar in review_history.items():
+            card = db_session.get(DBFlashcard, card_id)
+            if card_id not in fsrs_ids:
+                assert schedule(card) == schedule(scalar)
+                continue
+            state = CardState(2.5, 1, 0, 0, None, None, None, None)
+            for review in db_session.query(DBReview).filter_by(flashcard_id=card_id).order_by(DBReview.review_at):
+                state = SCHEDULERS[SchedulerName.FSRS].schedule(state, review.feedback, review.review_at)
+            assert CardState.of(card) == state
+
+    def test_replay_with_the_user_scheduler(self, db_session, test_user, review_history):
+        """Test that a user who chose FSRS gets FSRS state on every replayed card."""
+        test_user.scheduler = SchedulerName.FSRS
+        db_session.commit()
+
+        replay(db_session)
+
+        db_session.expire_all()
+        assert all(db_session.get(DBFlashcard, card_id).stability is not None for card_id in review_history)
+
+    def test_cards_without_reviews_are_kept(self, db_session, test_user, review_history):
+        """Test that a card without reviews keeps its stored schedule."""
+        replay(db_session)
+
+        db_session.expire_all()
+        unreviewed = db_session.query(DBFlashcard).filter(DBFlashcard.id.notin_(review_history.keys())).one()
+        assert (unreviewed.interval, unreviewed.repetitions) == (99, 9)
+
+    def test_only_given_users(self, db_session, test_user, review_history):
+        """Test that passing user ids leaves the cards of other users alone."""
+        other = DBUser(username="other", email="other@example.com", hashed_password="x")
+        db_session.add(other)
+        db_session.commit()
+
+        stats = replay(db_session, [other.id])
+
+        assert (stats.users, stats.reviews, stats.cards) == (1, 0, 0)
+        db_session.expire_all()
+        assert all(db_session.get(DBFlashcard, card_id).interval == 99 for card_id in review_history)
+
+    def test_dry_run_writes_nothing(self, db_session, test_user, review_history):
+        """Test that a dry run counts the reviews but rolls back the new schedules."""
+        stats = replay(db_session, dry_run=True)
+
+        assert stats.reviews == 30
+        db_session.expire_all()
+        assert all(db_session.get(DBFlashcard, card_id).interval == 99 for card_id in review_history)
+
@@ -0,0 +1,64 @@
+"""Tests for rejecting oversized request bodies before they are parsed."""
+import pytest
+from typing import List
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from src.request_limits import BodySizeLimitMiddleware
+
+
+@pytest.fixture
+def limited_client():
+    """App with an upload endpoint limited to 1000 bytes and an unlimited one."""
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware, max_bytes=1000, paths=("/upload",))
+    received = []
+
+    @app.post("/upload")
+    async def upload(files: List[UploadFile] = File(...)):
+        received.extend(files)
+        return {"files": len(files)}
+
+    @app.post("/other")
+    async def other(files: List[UploadFile] = File(...)):
+        return {"files": len(files)}
+
+    with TestClient(app) as client:
+        client.received = received
+        yield client
+
+
+@pytest.mark.unit
+class TestBodySizeLimit:
+    """Test BodySizeLimitMiddleware."""
+
+    def test_small_body_passes(self, limited_client):
+        """Test that bodies below the limit reach the endpoint."""
+        response = limited_client.post("/upload", files=[("files", ("a.bin", b"x" * 100))])
+        assert response.status_code == 200
+        assert response.json() == {"files": 1}
+
+    def test_content_length_over_limit(self, limited_client):
+        """Test that a declared body size over the limit is rejected before the endpoint runs."""
+        response = limited_client.post("/upload", files=[("files", ("a.bin", b"x" * 2000))])
+        assert response.status_code == 413
+        assert limited_client.received == []
+
+    def test_chunked_body_over_limit(self, limited_client):
+        """Test that a body without Content-Length is counted while it arrives."""
+        body = b"--b\r\nContent-Disposition: form-data; name=\"files\"; filename=\"a.bin\"\r\n\r\n" + b"x" * 2000 + b"\r\n--b--\r\n"
+
+        def chunks():
+            for start in range(0, len(body), 500):
+                yield body[start:start + 500]
+
+        response = limited_client.post(
+            "/upload", content=chunks(), headers={"Content-Type": "multipart/form-data; boundary=b"}
+        )
+        assert response.status_code == 413
+        assert limited_client.received == []
+
+    def test_other_paths_are_not_limited(self, limited_client):
+        """Test that only the configured path prefixes are limited."""
+        response = limited_client.post("/other", files=[("files", ("a.bin", b"x" * 2000))])
+        assert response.status_code == 200
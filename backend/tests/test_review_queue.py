@@ -0,0 +1,141 @@
+"""Integration tests for the review queue endpoint."""
+import pytest
+from datetime import datetime, timedelta
+
+from src import review_queue
+from src.models import DBFlashcard, DBReview, ReviewFeedback
+
+
+@pytest.fixture
+def due_cards(db_session, test_user, test_deck):
+    """Five due cards, the most overdue first, and one card that is not due yet."""
+    now = datetime.now()
+    cards = [
+        DBFlashcard(front=f"Q{i}", back=f"A{i}", user_id=test_user.id, deck_id=test_deck.id,
+                    next_review_at=now - timedelta(days=5 - i))
+        for i in range(5)
+    ]
+    cards.append(DBFlashcard(front="Later", back="Later", user_id=test_user.id, deck_id=test_deck.id,
+                             next_review_at=now + timedelta(days=1)))
+    db_session.add_all(cards)
+    db_session.commit()
+    return cards[:5]
+
+
+def fetch_all(client, auth_headers, deck_id, limit):
+    """Page through the whole queue, return the pages."""
+    pages = []
+    cursor = None
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(f"/decks/{deck_id}/review-queue", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = pages[-1]["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.integration
+class TestReviewQueue:
+    """Test the due-card queue of a deck."""
+
+    def test_queue_ordered_by_urgency(self, client, auth_headers, test_deck, due_cards):
+        """Test that due cards come most overdue first, with only the fields the review page needs."""
+        response = client.get(f"/decks/{test_deck.id}/review-queue", headers=auth_headers)
+
+        assert response.status_code == 200
+        page = response.json()
+        assert [card["front"] for card in page["cards"]] == ["Q0", "Q1", "Q2", "Q3", "Q4"]
+        assert set(page["cards"][0]) == {"id", "front", "back", "is_new"}
+        assert page["cards"][0]["is_new"] is True
+        assert page["next_cursor"] is None
+
+    def test_keyset_pagination(self, client, auth_headers, test_deck, due_cards):
+        """Test that pages continue after the last card without gaps or duplicates."""
+        pages = fetch_all(client, auth_headers, test_deck.id, limit=2)
+
+        assert [len(page["cards"]) for page in pages] == [2, 2, 1]
+        fronts = [card["front"] for page in pages for card in page["cards"]]
+        assert fronts == ["Q0", "Q1", "Q2", "Q3", "Q4"]
+
+    def test_pagination_with_equal_due_dates(self, client, auth_headers, db_session, test_deck, due_cards):
+        """Test that cards due at the same time are paged by id."""
+        for card in due_cards:
+            card.next_review_at = due_cards[0].next_review_at
+        db_session.commit()
+
+        pages = fetch_all(client, auth_headers, test_deck.id, limit=2)
+
+        ids = [card["id"] for page in pages for card in page["cards"]]
+        assert ids == sorted(card.id for card in due_cards)
+
+    def test_daily_new_card_limit(self, client, auth_headers, test_deck, due_cards, monkeypatch):
+        """Test that at most the daily number of new cards is served."""
+        monkeypatch.setattr(review_queue, "REVIEW_QUEUE_NEW_PER_DAY", 3)
+
+        pages = fetch_all(client, auth_headers, test_deck.id, limit=2)
+
+        fronts = [card["front"] for page in pages for card in page["cards"]]
+        assert fronts == ["Q0", "Q1", "Q2"]
+        assert pages[-1]["new_remaining"] == 0
+
+    def test_daily_limits_count_todays_reviews(self, client, auth_headers, db_session, test_user, test_deck, due_cards, monkeypatch):
+        """Test that cards studied earlier today use up the allowance."""
+        monkeypatch.setattr(review_queue, "REVIEW_QUEUE_NEW_PER_DAY", 2)
+        monkeypatch.setattr(review_queue, "REVIEW_QUEUE_REVIEWS_PER_DAY", 1)
+        now = datetime.now()
+        # Q0 was reviewed for the first time today, Q1 had been reviewed before and again today
+        due_cards[0].review_count = 1
+        due_cards[1].review_count = 2
+        db_session.add_all([
+            DBReview(flashcard_id=due_cards[0].id, user_id=test_user.id, feedback=ReviewFeedback.BAD, review_at=now),
+            DBReview(flashcard_id=due_cards[1].id, user_id=test_user.id, feedback=ReviewFeedback.BAD, review_at=now - timedelta(days=3)),
+            DBReview(flashcard_id=due_cards[1].id, user_id=test_user.id, feedback=ReviewFeedback.BAD, review_at=now),
+        ])
+        db_session.commit()
+
+        page = client.get(f"/decks/{test_deck.id}/review-queue", headers=auth_headers).json()
+
+        # One new card left (Q2) and no review cards left (Q0 and Q1 are skipped)
+        assert [card["front"] for card in page["cards"]] == ["Q2"]
+        assert page["new_remaining"] == 0
+        assert page["reviews_remaining"] == 0
+
+    def test_review_queue_invalid_cursor(self, client, auth_headers, test_deck):
+        """Test that a malformed cursor is rejected."""
+        response = client.get(f"/decks/{test_deck.id}/review-queue", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+        assert response.status_code == 400
+
+    def test_review_queue_edited_cursor(self, client, auth_headers, test_deck, due_cards):
+        """Test that a cursor whose allowance was raised by the client is rejected."""
+        from src.pagination import encode_cursor, decode_cursor
+        cursor = client.get(f"/decks/{test_deck.id}/review-queue", params={"limit": 2}, headers=auth_headers).json()["next_cursor"]
+        after_due, after_id, new_left, reviews_left, signature = decode_cursor(cursor, datetime, int, int, int, str)
+        edited = encode_cursor(after_due, after_id, 1000, 1000, signature)
+
+        response = client.get(f"/decks/{test_deck.id}/review-queue", params={"cursor": edited}, headers=auth_headers)
+        assert response.status_code == 400
+
+    def test_review_queue_cursor_of_other_deck(self, client, auth_headers, db_session, test_user, test_deck, due_cards):
+        """Test that a cursor is only valid for the deck it was created for."""
+        from src.models import DBDeck
+        other_deck = DBDeck(name="Other", user_id=test_user.id)
+        db_session.add(other_deck)
+        db_session.commit()
+        cursor = client.get(f"/decks/{test_deck.id}/review-queue", params={"limit": 2}, headers=auth_headers).json()["next_cursor"]
+
+        response = client.get(f"/decks/{other_deck.id}/review-queue", params={"cursor": cursor}, headers=auth_headers)
+        assert response.status_code == 400
+
+    def test_review_queue_deck_not_found(self, client, auth_headers):
+        """Test the review queue of a deck that does not exist."""
+        response = client.get("/decks/9999/review-queue", headers=auth_headers)
+        assert response.status_code == 404
+
+    def test_review_queue_unauthenticated(self, client, test_deck):
+        """Test getting the review queue without authentication."""
+        response = client.get(f"/decks/{test_deck.id}/review-queue")
+        assert response.status_code == 401
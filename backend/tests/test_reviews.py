@@ -0,0 +1,210 @@
+"""Integration tests for batched review submission."""
+import pytest
+from datetime import datetime, timedelta
+
+from src.models import DBFlashcard, DBReview, DBUser
+from src.utils import hash_password
+
+
+@pytest.fixture
+def second_flashcard(db_session, test_user, test_deck):
+    """Create another flashcard in the test deck."""
+    flashcard = DBFlashcard(
+        front="What is 3+3?",
+        back="6",
+        user_id=test_user.id,
+        deck_id=test_deck.id,
+        created_at=datetime.now(),
+        next_review_at=datetime.now()
+    )
+    db_session.add(flashcard)
+    db_session.commit()
+    db_session.refresh(flashcard)
+    return flashcard
+
+
+@pytest.mark.integration
+class TestReviewBatch:
+    """Test the batch review endpoint."""
+
+    def test_batch_updates_all_cards(self, client, auth_headers, db_session, test_flashcard, second_flashcard):
+        """Test that every card is scheduled and every review is stored."""
+        response = client.post(
+            "/reviews/batch",
+            headers=auth_headers,
+            json={"reviews": [
+                {"flashcard_id": test_flashcard.id, "feedback": "good", "elapsed_ms": 2300},
+                {"flashcard_id": second_flashcard.id, "feedback": "bad", "elapsed_ms": 9100},
+            ]}
+        )
+        assert response.status_code == 200
+        assert response.json()["reviewed"] == 2
+
+        db_session.expire_all()
+        assert test_flashcard.repetitions == 1
+        assert test_flashcard.review_count == 1
+        assert second_flashcard.repetitions == 0
+        assert second_flashcard.review_count == 1
+        reviews = db_session.query(DBReview).order_by(DBReview.id).all()
+        assert [(review.flashcard_id, review.elapsed_ms) for review in reviews] == [
+            (test_flashcard.id, 2300),
+            (second_flashcard.id, 9100),
+        ]
+
+    def test_reviews_are_applied_in_order(self, client, auth_headers, db_session, test_flashcard):
+        """Test that repeated reviews of one card build on each other."""
+        first = datetime(2024, 3, 1, 9, 0)
+        second = first + timedelta(days=1)
+        response = client.post(
+            "/reviews/batch",
+            headers=auth_headers,
+            json={"reviews": [
+                {"flashcard_id": test_flashcard.id, "feedback": "good", "reviewed_at": first.isoformat()},
+                {"flashcard_id": test_flashcard.id, "feedback": "good", "reviewed_at": second.isoformat()},
+            ]}
+        )
+        assert response.status_code == 200
+
+        db_session.expire_all()
+        assert test_flashcard.repetitions == 2
+        assert test_flashcard.interval == 6
+        assert test_flashcard.review_count == 2
+        assert test_flashcard.last_reviewed_at == second
+        assert test_flashcard.next_review_at == second + timedelta(days=6)
+
+    def test_interleaved_reviews_match_one_by_one(self, client, auth_headers, db_session, test_flashcard, second_flashcard):
+        """Test that interleaved repeated reviews of two cards give the same schedule as reviewing one by one."""
+        from src.spaced_repetition import SM2Algo
+        from src.models import ReviewFeedback
+        start = datetime(2024, 3, 1, 9, 0)
+        reviews = [
+            (test_flashcard, "good"), (second_flashcard, "mid"), (test_flashcard, "good"),
+            (test_flashcard, "bad"), (second_flashcard, "good"), (test_flashcard, "good"),
+        ]
+        expected = {card.id: DBFlashcard(easiness_factor=2.5, interval=1, repetitions=0, review_count=0)
+                    for card in (test_flashcard, second_flashcard)}
+        for i, (card, feedback) in enumerate(reviews):
+            SM2Algo.update_flashcard(ReviewFeedback(feedback), expected[card.id], now=start + timedelta(days=i))
+
+        response = client.post("/reviews/batch", headers=auth_headers, json={"reviews": [
+            {"flashcard_id": card.id, "feedback": feedback, "reviewed_at": (start + timedelta(days=i)).isoformat()}
+            for i, (card, feedback) in enumerate(reviews)
+        ]})
+        assert response.status_code == 200
+
+        db_session.expire_all()
+        for card in (test_flashcard, second_flashcard):
+            scalar = expected[card.id]
+            assert (card.easiness_factor, card.interval, card.repetitions, card.review_count) == \
+                (scalar.easiness_factor, scalar.interval, scalar.repetitions, scalar.review_count)
+            assert (card.next_review_at, card.last_reviewed_at) == (scalar.next_review_at, scalar.last_reviewed_at)
+
+    def test_batch_uses_scheduler_of_each_deck(self, client, auth_headers, db_session, test_user, test_flashcard, second_flashcard):
+        """Test that cards of an FSRS deck and of the user's SM-2 default in one batch match reviewing one by one."""
+        from src.spaced_repetition import CardState, SCHEDULERS, SM2_SCHEDULER
+        from src.models import DBDeck, ReviewFeedback, SchedulerName
+        fsrs_deck = DBDeck(name="FSRS deck", user_id=test_user.id, scheduler=SchedulerName.FSRS)
+        db_session.add(fsrs_deck)
+        db_session.flush()
+        second_flashcard.deck_id = fsrs_deck.id
+        db_session.commit()
+
+        start = datetime(2024, 3, 1, 9, 0)
+        reviews = [
+            (test_flashcard, "good"), (second_flashcard, "good"), (second_flashcard, "mid"),
+            (test_flashcard, "good"), (second_flashcard, "bad"), (second_flashcard, "good"),
+        ]
+        schedulers = {test_flashcard.id: SM2_SCHEDULER, second_flashcard.id: SCHEDULERS[SchedulerName.FSRS]}
+        expected = {card_id: CardState(2.5, 1, 0, 0, None, None, None, None) for card_id in schedulers}
+        for i, (card, feedback) in enumerate(reviews):
+            expected[card.id] = schedulers[card.id].schedule(expected[card.id], ReviewFeedback(feedback), start + timedelta(days=i))
+
+        response = client.post("/reviews/batch", headers=auth_headers, json={"reviews": [
+            {"flashcard_id": card.id, "feedback": feedback, "reviewed_at": (start + timedelta(days=i)).isoformat()}
+            for i, (card, feedback) in enumerate(reviews)
+        ]})
+        assert response.status_code == 200
+
+        db_session.expire_all()
+        assert CardState.of(test_flashcard) == expected[test_flashcard.id]
+        assert CardState.of(second_flashcard) == expected[second_flashcard.id]
+        assert second_flashcard.stability is not None
+
+    def test_future_review_time_is_clamped(self, client, auth_headers, db_session, test_flashcard):
+        """Test that review times in the future are replaced by the current time."""
+        future = datetime.now() + timedelta(days=30)
+        response = client.post(
+            "/reviews/batch",
+            headers=auth_headers,
+            json={"reviews": [{"flashcard_id": test_flashcard.id, "feedback": "good", "reviewed_at": future.isoformat()}]}
+        )
+        assert response.status_code == 200
+
+        db_session.expire_all()
+        assert test_flashcard.last_reviewed_at <= datetime.now()
+
+    def test_unknown_card_is_skipped(self, client, auth_headers, db_session, test_flashcard):
+        """Test that reviews of unknown cards are skipped and reported, the others are stored."""
+        response = client.post(
+            "/reviews/batch",
+            headers=auth_headers,
+            json={"reviews": [
+                {"flashcard_id": test_flashcard.id, "feedback": "good"},
+                {"flashcard_id": 99999, "feedback": "good"},
+            ]}
+        )
+        assert response.status_code == 200
+        assert response.json()["reviewed"] == 1
+        assert response.json()["skipped"] == [99999]
+
+        db_session.expire_all()
+        assert test_flashcard.review_count == 1
+        assert db_session.query(DBReview).count() == 1
+
+    def test_card_of_other_user(self, client, db_session, test_flashcard):
+        """Test that cards of other users cannot be reviewed."""
+        other_user = DBUser(
+            username="otheruser",
+            email="other@example.com",
+            hashed_password=hash_password("otherpassword123")
+        )
+        db_session.add(other_user)
+        db_session.commit()
+        token = client.post(
+            "/login",
+            data={"username": "otheruser", "password": "otherpassword123"}
+        ).json()["access_token"]
+
+        response = client.post(
+            "/reviews/batch",
+            headers={"Authorization": f"Bearer {token}"},
+            json={"reviews": [{"flashcard_id": test_flashcard.id, "feedback": "good"}]}
+        )
+        assert response.status_code == 200
+        assert response.json()["reviewed"] == 0
+        assert response.json()["skipped"] == [test_flashcard.id]
+
+        db_session.expire_all()
+        assert test_flashcard.review_count == 0
+
+    def test_empty_batch(self, client, auth_headers):
+        """Test that an empty batch is rejected."""
+        response = client.post("/reviews/batch", headers=auth_headers, json={"reviews": []})
+        assert response.status_code == 422
+
+    def test_negative_elapsed_time(self, client, auth_headers, test_flashcard):
+        """Test that negative answer times are rejected."""
+        response = client.post(
+            "/reviews/batch",
+            headers=auth_headers,
+            json={"reviews": [{"flashcard_id": test_flashcard.id, "feedback": "good", "elapsed_ms": -1}]}
+        )
+        assert response.status_code == 422
+
+    def test_batch_unauthenticated(self, client, test_flashcard):
+        """Test submitting reviews without authentication."""
+        response = client.post(
+            "/reviews/batch",
+            json={"reviews": [{"flashcard_id": test_flashcard.id, "feedback": "good"}]}
+        )
+        assert response.status_code == 401
@@ -0,0 +1,185 @@
+"""Unit tests for the scheduler protocol and the FSRS scheduler."""
+import random
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+
+from src.models import DBFlashcard, ReviewFeedback, SchedulerName
+from src.spaced_repetition import (
+    BatchState, CardState, FSRSScheduler, SCHEDULERS, SM2Algo, SM2_SCHEDULER,
+    DEFAULT_SCHEDULER, feedback_array, schedule_in_rounds, scheduler_for,
+)
+
+FSRS = SCHEDULERS[SchedulerName.FSRS]
+NOW = datetime(2025, 1, 1, 9, 0)
+
+
+def new_card() -> CardState:
+    return CardState(2.5, 1, 0, 0, None, None, None, None)
+
+
+@pytest.mark.unit
+class TestSchedulerSelection:
+    """Test choosing a scheduler by deck, user and server default."""
+
+    def test_first_choice_wins(self):
+        """The deck's scheduler is used over the user's."""
+        assert scheduler_for(SchedulerName.FSRS, SchedulerName.SM2) is FSRS
+        assert scheduler_for(SchedulerName.SM2, SchedulerName.FSRS) is SM2_SCHEDULER
+
+    def test_unset_choices_are_skipped(self):
+        """A deck without a scheduler uses the user's, and a user without one the default."""
+        assert scheduler_for(None, SchedulerName.FSRS) is FSRS
+        assert scheduler_for(None, None) is SCHEDULERS[DEFAULT_SCHEDULER]
+
+    def test_stored_values(self):
+        """Plain string values select the same scheduler."""
+        assert scheduler_for("fsrs") is FSRS
+
+
+@pytest.mark.unit
+class TestSM2Scheduler:
+    """Test that the SM-2 scheduler is the SM-2 algorithm."""
+
+    def test_matches_update_flashcard(self):
+        """schedule gives the same state as SM2Algo.update_flashcard over a review history."""
+        rng = random.Random(3)
+        card = DBFlashcard(easiness_factor=2.5, interval=1, repetitions=0, review_count=0)
+        state = new_card()
+        for day in range(30):
+            feedback = rng.choice(list(ReviewFeedback))
+            now = NOW + timedelta(days=day)
+            SM2Algo.update_flashcard(feedback, card, now=now)
+            state = SM2_SCHEDULER.schedule(state, feedback, now)
+            assert state == CardState.of(card)
+
+    def test_clears_fsrs_state(self):
+        """A card scheduled with SM-2 drops its FSRS memory state."""
+        state = FSRS.schedule(new_card(), ReviewFeedback.GOOD, NOW)
+        state = SM2_SCHEDULER.schedule(state, ReviewFeedback.GOOD, NOW + timedelta(days=4))
+
+        assert state.stability is None
+        assert state.difficulty is None
+
+
+@pytest.mark.unit
+class TestFSRSScheduler:
+    """Test the FSRS scheduler."""
+
+    @pytest.mark.parametrize("feedback, stability, difficulty, interval", [
+        (ReviewFeedback.BAD, 0.4872, 7.6214, 1),
+        (ReviewFeedback.MID, 1.4003, 6.3916, 1),
+        (ReviewFeedback.GOOD, 3.7145, 5.1618, 4),
+    ])
+    def test_first_review(self, feedback, stability, difficulty, interval):
+        """A new card starts from the initial stability and difficulty of its grade."""
+        state = FSRS.schedule(new_card(), feedback, NOW)
+
+        assert state.stability == pytest.approx(stability)
+        assert state.difficulty == pytest.approx(difficulty)
+        assert state.interval == interval
+        assert state.next_review_at == NOW + timedelta(days=interval)
+        assert state.last_reviewed_at == NOW
+        assert state.review_count == 1
+
+    def test_intervals_grow_faster_than_sm2(self):
+        """Reviewed on time with GOOD, FSRS schedules fewer reviews than SM-2 for the first months."""
+        fsrs, sm2 = new_card(), new_card()
+        fsrs_at = sm2_at = NOW
+        fsrs_intervals, sm2_intervals = [], []
+        for _ in range(5):
+            fsrs = FSRS.schedule(fsrs, ReviewFeedback.GOOD, fsrs_at)
+            sm2 = SM2_SCHEDULER.schedule(sm2, ReviewFeedback.GOOD, sm2_at)
+            fsrs_at, sm2_at = fsrs.next_review_at, sm2.next_review_at
+            fsrs_intervals.append(fsrs.interval)
+            sm2_intervals.append(sm2.interval)
+
+        assert fsrs_intervals == sorted(fsrs_intervals)
+        assert all(f > s for f, s in zip(fsrs_intervals, sm2_intervals))
+
+    def test_forgetting(self):
+        """BAD lowers stability, raises difficulty and resets repetitions, the easiness factor is kept."""
+        state = FSRS.schedule(new_card(), ReviewFeedback.GOOD, NOW)
+        state = FSRS.schedule(state, ReviewFeedback.GOOD, state.next_review_at)
+        forgotten = FSRS.schedule(state, ReviewFeedback.BAD, state.next_review_at)
+
+        assert forgotten.stability < state.stability
+        assert forgotten.difficulty > state.difficulty
+        assert forgotten.repetitions == 0
+        assert forgotten.interval < state.interval
+        assert forgotten.easiness_factor == state.easiness_factor
+
+    def test_hard_is_shorter_than_good(self):
+        """MID grows stability less than GOOD."""
+        state = FSRS.schedule(new_card(), ReviewFeedback.GOOD, NOW)
+        hard = FSRS.schedule(state, ReviewFeedback.MID, state.next_review_at)
+        good = FSRS.schedule(state, ReviewFeedback.GOOD, state.next_review_at)
+
+        assert state.stability < hard.stability < good.stability
+
+    def test_starts_from_sm2_state(self):
+        """A card reviewed with SM-2 before continues from its interval instead of starting over."""
+        state = CardState(2.5, 10, 3, 3, None, None, NOW, NOW - timedelta(days=10))
+        state = FSRS.schedule(state, ReviewFeedback.GOOD, NOW)
+
+        assert state.stability > 10
+        assert state.interval > 10
+        assert state.review_count == 4
+
+    def test_desired_retention(self):
+        """A higher desired retention schedules the next review earlier."""
+        strict = FSRSScheduler(desired_retention=0.95)
+        state = FSRS.schedule(new_card(), ReviewFeedback.GOOD, NOW)
+        state = FSRS.schedule(state, ReviewFeedback.GOOD, state.next_review_at)
+
+        assert strict.schedule(state, ReviewFeedback.GOOD, state.next_review_at).interval < \
+            FSRS.schedule(state, ReviewFeedback.GOOD, state.next_review_at).interval
+
+    def test_maximum_interval(self):
+        """Intervals are capped at the maximum interval."""
+        capped = FSRSScheduler(maximum_interval=30)
+        state = new_card()
+        for _ in range(10):
+            state = capped.schedule(state, ReviewFeedback.GOOD, state.next_review_at or NOW)
+
+        assert state.interval == 30
+
+    def test_batch_matches_scalar(self):
+        """schedule_batch gives the same states as schedule, card by card."""
+        rng = random.Random(11)
+        states = [new_card() for _ in range(50)]
+        batch = BatchState.new(50)
+        for day in range(20):
+            feedback = [rng.choice(list(ReviewFeedback)) for _ in states]
+            now = NOW + timedelta(days=day * 3)
+            states = [FSRS.schedule(state, item, now) for state, item in zip(states, feedback)]
+            batch = FSRS.schedule_batch(batch, feedback_array(feedback), now)
+
+        for state, row in zip(states, batch.rows()):
+            assert CardState(**row) == state
+
+
+@pytest.mark.unit
+class TestScheduleInRounds:
+    """Test applying a sequence of reviews with a scheduler per card."""
+
+    def test_each_card_uses_its_scheduler(self):
+        """Cards of different schedulers in one sequence match reviewing them one by one."""
+        rng = random.Random(5)
+        schedulers = [SM2_SCHEDULER, FSRS, FSRS, SM2_SCHEDULER]
+        card = np.array([rng.randrange(4) for _ in range(40)])
+        occurrence = np.array([np.sum(card[:i] == card[i]) for i in range(len(card))])
+        feedback = [rng.choice(list(ReviewFeedback)) for _ in card]
+        review_at = [NOW + timedelta(hours=i) for i in range(len(card))]
+
+        state = BatchState.new(4)
+        schedule_in_rounds(
+            state, card, occurrence, feedback_array(feedback),
+            np.array(review_at, dtype="datetime64[us]"), schedulers
+        )
+
+        expected = [new_card() for _ in schedulers]
+        for position, item, now in zip(card, feedback, review_at):
+            expected[position] = schedulers[position].schedule(expected[position], item, now)
+        for state_row, expected_state in zip(state.rows(), expected):
+            assert CardState(**state_row) == expected_state
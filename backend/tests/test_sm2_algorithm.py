@@ -1,5 +1,6 @@
 """Unit tests for SM-2 spaced repetition algorithm."""
 import pytest
+import numpy as np
 from datetime import datetime, timedelta
 from src.spaced_repetition import SM2Algo
 from src.models import DBFlashcard, ReviewFeedback
@@ -233,6 +234,24 @@ class TestSM2Algorithm:
         assert flashcard.last_reviewed_at is not None
         assert flashcard.last_reviewed_at >= before_review
 
+    def test_explicit_review_time(self, db_session, test_user):
+        """Test that a given review time is used instead of the current time."""
+        flashcard = DBFlashcard(
+            front="Test",
+            back="Answer",
+            user_id=test_user.id,
+            created_at=datetime.now(),
+            next_review_at=datetime.now()
+        )
+        db_session.add(flashcard)
+        db_session.commit()
+
+        reviewed_at = datetime(2024, 3, 1, 9, 30)
+        SM2Algo.update_flashcard(ReviewFeedback.GOOD, flashcard, now=reviewed_at)
+
+        assert flashcard.last_reviewed_at == reviewed_at
+        assert flashcard.next_review_at == reviewed_at + timedelta(days=1)
+
     def test_review_count_increments(self, db_session, test_user):
         """Test that review count always increments."""
         flashcard = DBFlashcard(
@@ -284,3 +303,65 @@ class TestSM2Algorithm:
         SM2Algo.update_flashcard(ReviewFeedback.GOOD, flashcard)
         assert flashcard.repetitions == 1
         assert flashcard.interval == 1
+
+
+@pytest.mark.unit
+class TestSM2Batch:
+    """Test that the vectorized SM2Algo.update_batch matches update_flashcard exactly."""
+
+    def scalar(self, feedback, easiness_factor, interval, repetitions, now):
+        """Run the scalar path on a detached card."""
+        card = DBFlashcard(easiness_factor=easiness_factor, interval=interval, repetitions=repetitions, review_count=0)
+        SM2Algo.update_flashcard(feedback, card, now=now)
+        return card
+
+    def test_matches_scalar_over_review_histories(self):
+        """Test 500 cards through 30 random reviews each, comparing every intermediate state."""
+        import random
+        rng = random.Random(42)
+        feedbacks = list(ReviewFeedback)
+        now = datetime(2026, 1, 1, 9, 30)
+        cards = [DBFlashcard(easiness_factor=2.5, interval=1, repetitions=0, review_count=0) for _ in range(500)]
+        ef, interval, reps = [np.array(values) for values in ([2.5] * 500, [1] * 500, [0] * 500)]
+
+        for _ in range(30):
+            batch_feedback = [rng.choice(feedbacks) for _ in cards]
+            for card, feedback in zip(cards, batch_feedback):
+                SM2Algo.update_flashcard(feedback, card, now=now)
+            result = SM2Algo.update_batch(SM2Algo.quality_array(batch_feedback), ef, interval, reps, now)
+            ef, interval, reps = result.easiness_factor, result.interval, result.repetitions
+
+            assert ef.tolist() == [card.easiness_factor for card in cards]
+            assert interval.tolist() == [card.interval for card in cards]
+            assert reps.tolist() == [card.repetitions for card in cards]
+            assert result.next_review_at.tolist() == [card.next_review_at for card in cards]
+
+    def test_half_intervals_round_to_even(self):
+        """Test that a tie like 5 * 1.3 = 6.5 rounds to 6, as round() does."""
+        now = datetime(2026, 1, 1)
+        card = self.scalar(ReviewFeedback.MID, 1.3, 5, 2, now)
+        result = SM2Algo.update_batch(np.array([3]), np.array([1.3]), np.array([5]), np.array([2]), now)
+        assert card.interval == 6
+        assert result.interval.tolist() == [6]
+
+    def test_review_time_per_card(self):
+        """Test passing one review time per card."""
+        times = [datetime(2026, 1, 1, 8), datetime(2026, 3, 1, 20, 15)]
+        result = SM2Algo.update_batch(
+            np.array([5, 0]), np.array([2.5, 2.5]), np.array([6, 16]), np.array([2, 3]),
+            np.array(times, dtype="datetime64[us]")
+        )
+        assert result.interval.tolist() == [16, 1]
+        assert result.next_review_at.tolist() == [times[0] + timedelta(days=16), times[1] + timedelta(days=1)]
+
+    def test_interval_beyond_datetime_range(self):
+        """Test that an interval past year 9999 raises OverflowError like the scalar path instead of wrapping around."""
+        now = datetime(2026, 1, 1)
+        with pytest.raises(OverflowError):
+            self.scalar(ReviewFeedback.GOOD, 2.5, 2_000_000, 5, now)
+        with pytest.raises(OverflowError):
+            SM2Algo.update_batch(np.array([5, 5]), np.array([2.5, 2.5]), np.array([6, 2_000_000]), np.array([2, 5]), now)
+
+    def test_quality_array(self):
+        """Test converting feedback to SM-2 quality, also from the stored string values."""
+        assert SM2Algo.quality_array([ReviewFeedback.GOOD, "mid", "bad"]).tolist() == [5, 3, 0]
@@ -13,6 +13,21 @@ async function apiGet(path) {
   return res.json();
 }
 
+async function apiGetAll(path) {
+  // list endpoints return one page at a time, the X-Next-Cursor header points to the next one
+  const items = [];
+  let cursor = null;
+  do {
+    const separator = path.includes("?") ? "&" : "?";
+    const pagePath = cursor ? `${path}${separator}cursor=${encodeURIComponent(cursor)}` : path;
+    const res = await fetch(pagePath, { headers });
+    if (!res.ok) throw new Error(`GET ${pagePath} failed`);
+    items.push(...(await res.json()));
+    cursor = res.headers.get("X-Next-Cursor");
+  } while (cursor);
+  return items;
+}
+
 async function apiPost(path, body) {
   const res = await fetch(path, {
     method: "POST",
@@ -27,6 +42,53 @@ async function apiPost(path, body) {
   return res.json();
 }
 
+async function apiPostForm(path, formData) {
+  // no Content-Type header, the browser sets the multipart boundary itself
+  const res = await fetch(path, {
+    method: "POST",
+    headers: { Authorization: headers.Authorization },
+    body: formData,
+  });
+  if (!res.ok) {
+    const errorData = await res.json().catch(() => ({}));
+    const errorMessage = errorData.detail || `POST ${path} failed`;
+    throw new Error(errorMessage);
+  }
+  return res.json();
+}
+
+async function apiStream(path, options, onCard) {
+  // the server sends Server-Sent Events: one "card" event per generated flashcard, then "done" or "error"
+  const res = await fetch(path, { method: "POST", ...options });
+  if (!res.ok) {
+    const errorData = await res.json().catch(() => ({}));
+    const errorMessage = errorData.detail || `POST ${path} failed`;
+    throw new Error(errorMessage);
+  }
+
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+    const events = buffer.split("\n\n");
+    buffer = events.pop();
+    for (const block of events) {
+      const fields = {};
+      for (const line of block.split("\n")) {
+        const separator = line.indexOf(": ");
+        if (separator > 0) fields[line.slice(0, separator)] = line.slice(separator + 2);
+      }
+      if (fields.event === "card") {
+        onCard(JSON.parse(fields.data));
+      } else if (fields.event === "error") {
+        throw new Error(JSON.parse(fields.data).detail);
+      }
+    }
+  }
+}
+
 async function apiPut(path, body) {
   const res = await fetch(path, {
     method: "PUT",
@@ -62,13 +124,10 @@ async function getNumberOfFlashcards() {
     if (params.has("deckId")){
         const deckId = params.get("deckId");
         displayDeckName(deckId);
-        const allFlashcards = await apiGet(`/decks/${deckId}/flashcards`);
-        const numberofAllFlashcards = allFlashcards.length;
-        document.getElementById("all-flashcards").textContent = `${numberofAllFlashcards} total cards`
-        
-        const dueFlashcards = await apiGet(`/decks/${deckId}/flashcards?due=true`);
-        const numberOfDueFlashcards = dueFlashcards.length;
-        document.getElementById("due-flashcards").textContent = `${numberOfDueFlashcards} due cards`
+        // counted by the server, no need to download the cards
+        const stats = await apiGet(`/decks/${deckId}/stats`);
+        document.getElementById("all-flashcards").textContent = `${stats.total} total cards (${stats.new} new, ${stats.learning} learning, ${stats.mature} mature)`
+        document.getElementById("due-flashcards").textContent = `${stats.due} due cards`
     }    
 }
 
@@ -173,7 +232,7 @@ async function addNewCard() {
 async function showAllFlashcards() {
   const params = new URLSearchParams(window.location.search);
   const deckId = params.get("deckId");
-  const flashcards = await apiGet(`/decks/${deckId}/flashcards`);
+  const flashcards = await apiGetAll(`/decks/${deckId}/flashcards`);
   const tbody = document.getElementById("flashcards-tbody");
   const rowTemplate = document.getElementById("flashcard-row-template");
   
@@ -323,6 +382,29 @@ function setupTabs() {
 // =====================
 
 let generatedFlashcards = [];
+const JOB_POLL_INTERVAL_MS = 1500;
+// apiStream reads the response body as a stream, browsers without it run the generation as a job
+const STREAMING_SUPPORTED = typeof TextDecoderStream !== "undefined";
+
+async function waitForGenerationJob(jobId) {
+  // generation runs in a background job on the server, poll it until a worker has finished it
+  while (true) {
+    const job = await apiGet(`/llm/jobs/${jobId}`);
+    if (job.status === "succeeded") {
+      return job;
+    }
+    if (job.status === "failed") {
+      throw new Error(job.error || "Failed to generate flashcards");
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
+}
+
+function showStreamedFlashcard(card) {
+  // render every card as soon as it arrives instead of waiting for the whole batch
+  generatedFlashcards.push(card);
+  displayGeneratedFlashcards();
+}
 
 async function generateFromText() {
   const form = document.getElementById("llm-text-form");
@@ -345,14 +427,20 @@ async function generateFromText() {
     document.getElementById("generated-cards-preview").classList.add("hidden");
 
     try {
-      const response = await apiPost("/llm/generate-from-text", {
-        text,
-        num_cards: numCards,
-        deck_id: deckId
-      });
-
-      generatedFlashcards = response.flashcards;
-      displayGeneratedFlashcards();
+      const body = { text, num_cards: numCards, deck_id: deckId };
+      if (STREAMING_SUPPORTED) {
+        generatedFlashcards = [];
+        await apiStream("/llm/generate-from-text/stream", {
+          headers,
+          body: JSON.stringify(body),
+        }, showStreamedFlashcard);
+      } else {
+        const job = await apiPost("/llm/generate-from-text?background=true", body);
+        const finishedJob = await waitForGenerationJob(job.id);
+
+        generatedFlashcards = finishedJob.flashcards;
+        displayGeneratedFlashcards();
+      }
     } catch (err) {
       console.error("Failed to generate flashcards from text:", err);
       alert(err.message || "Failed to generate flashcards. Please try again.");
@@ -386,8 +474,8 @@ async function generateFromImage() {
 
   form.addEventListener("submit", async (event) => {
     event.preventDefault();
-    const file = imageInput.files[0];
-    if (!file) {
+    const files = imageInput.files;
+    if (files.length === 0) {
       alert("Please select an image");
       return;
     }
@@ -405,17 +493,21 @@ async function generateFromImage() {
     document.getElementById("generated-cards-preview").classList.add("hidden");
 
     try {
-      // Convert image to base64
-      const base64 = await fileToBase64(file);
-      const base64Data = base64.split(',')[1]; // Remove data:image/xxx;base64, prefix
-
-      const response = await apiPost("/llm/generate-from-image", {
-        image_base64: base64Data,
-        num_cards: numCards,
-        deck_id: deckId
-      });
+      // Upload the raw image files instead of base64 encoding them into JSON
+      const formData = new FormData();
+      for (const file of files) {
+        formData.append("images", file);
+      }
+      formData.append("num_cards", numCards);
+      if (deckId !== null) {
+        formData.append("deck_id", deckId);
+      }
+
+      // several pages take a while, so they are generated in a job instead of one long request
+      const job = await apiPostForm("/llm/generate-from-image/upload?background=true", formData);
+      const finishedJob = await waitForGenerationJob(job.id);
 
-      generatedFlashcards = response.flashcards;
+      generatedFlashcards = finishedJob.flashcards;
       displayGeneratedFlashcards();
     } catch (err) {
       console.error("Failed to generate flashcards from image:", err);
@@ -427,15 +519,6 @@ async function generateFromImage() {
   });
 }
 
-function fileToBase64(file) {
-  return new Promise((resolve, reject) => {
-    const reader = new FileReader();
-    reader.onload = () => resolve(reader.result);
-    reader.onerror = reject;
-    reader.readAsDataURL(file);
-  });
-}
-
 function displayGeneratedFlashcards() {
   const container = document.getElementById("generated-cards-list");
   container.innerHTML = "";
@@ -544,13 +627,11 @@ async function saveGeneratedCards() {
     const numCards = generatedFlashcards.length;
 
     try {
-      for (const card of generatedFlashcards) {
-        await apiPost("/flashcards", {
-          front: card.front,
-          back: card.back,
-          deck_id: deckId
-        });
-      }
+      // one request for all cards, the server creates all of them or none
+      await apiPost("/flashcards/bulk", {
+        deck_id: deckId,
+        flashcards: generatedFlashcards.map((card) => ({ front: card.front, back: card.back })),
+      });
 
       await getNumberOfFlashcards();
       generatedFlashcards = [];
@@ -566,7 +647,7 @@ async function saveGeneratedCards() {
       alert(`Successfully saved ${numCards} flashcards!`);
     } catch (err) {
       console.error("Failed to save generated flashcards:", err);
-      alert("Failed to save some flashcards. Please try again.");
+      alert(err.message || "Failed to save flashcards. Please try again.");
     }
   });
 }
@@ -48,8 +48,15 @@ async function apiDelete(path) {
 // =====================
 
 async function getDueFlashcards(deckId){
-    const dueFlashcards = await apiGet(`/decks/${deckId}/flashcards?due=true`);
-    dueFlashcards.sort((a,b) => new Date(a.next_review_at) - new Date(b.next_review_at));
+    // the server returns the due cards most overdue first, within today's limits, one page at a time
+    const dueFlashcards = [];
+    let cursor = null;
+    do {
+        const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+        const page = await apiGet(`/decks/${deckId}/review-queue${query}`);
+        dueFlashcards.push(...page.cards);
+        cursor = page.next_cursor;
+    } while (cursor);
 
     return dueFlashcards;
 }
@@ -96,31 +103,73 @@ async function fillFrontAndBack(){
     await startTimer();
 }
 
+// reviews are buffered and sent in batches instead of one request per button press
+const REVIEW_FLUSH_SIZE = 10;
+let pendingReviews = [];
+
+function flushReviews({ keepalive = false } = {}) {
+    if (pendingReviews.length === 0) return Promise.resolve();
+    const reviews = pendingReviews;
+    pendingReviews = [];
+    return fetch("/reviews/batch", {
+        method: "POST",
+        headers,
+        body: JSON.stringify({ reviews }),
+        keepalive, // lets the request outlive the page when it is sent on unload
+    }).then(async (res) => {
+        if (res.ok) {
+            const result = await res.json();
+            if (result.skipped.length > 0) {
+                console.warn("Reviews of unknown flashcards were skipped:", result.skipped);
+            }
+            return;
+        }
+        if (res.status < 500) {
+            // the server will reject this batch again, retrying it would only block later reviews
+            console.error(`Dropping ${reviews.length} reviews rejected with ${res.status}`);
+            return;
+        }
+        throw new Error("POST /reviews/batch failed");
+    }).catch((err) => {
+        // network errors and server errors are temporary
+        console.error("Failed to send reviews:", err);
+        if (!keepalive) {
+            // keep them for the next flush
+            pendingReviews = reviews.concat(pendingReviews);
+        }
+    });
+}
+
+async function recordFeedback(feedback){
+    const currentFlashcard = reviewQueue[currentIndex];
+    pendingReviews.push({
+        flashcard_id: currentFlashcard.id,
+        feedback,
+        reviewed_at: new Date().toISOString(),
+        elapsed_ms: new Date() - startTime,
+    });
+    currentIndex++;
+    await fillFrontAndBack();
+    if (pendingReviews.length >= REVIEW_FLUSH_SIZE || currentIndex >= reviewQueue.length) {
+        await flushReviews();
+    }
+}
+
 async function sendFeedback(){
-    // we need to get the curernt flashcard"s id (referencing the global variable) 
     const badFeedbackButton = document.getElementById("bad");
     const midFeedbackButton = document.getElementById("mid");
     const goodFeedbackButton = document.getElementById("good");
-    const currentFlashcard = reviewQueue[currentIndex];
 
-    badFeedbackButton.addEventListener("click", async () => {
-        currentIndex++;
-        await fillFrontAndBack();
-        await apiPost(`/flashcards/${currentFlashcard.id}/review`, {"feedback": "bad"});
-    });
-   midFeedbackButton.addEventListener("click", async () => {
-        currentIndex++;
-        await fillFrontAndBack();
-        await apiPost(`/flashcards/${currentFlashcard.id}/review`, {"feedback": "mid"});
-    });
-    goodFeedbackButton.addEventListener("click", async () => {
-        currentIndex++;
-        await fillFrontAndBack();
-        await apiPost(`/flashcards/${currentFlashcard.id}/review`, {"feedback": "good"});
+    badFeedbackButton.addEventListener("click", () => recordFeedback("bad"));
+    midFeedbackButton.addEventListener("click", () => recordFeedback("mid"));
+    goodFeedbackButton.addEventListener("click", () => recordFeedback("good"));
 
+    // send whatever is left when the user leaves the page
+    window.addEventListener("pagehide", () => flushReviews({ keepalive: true }));
+    document.addEventListener("visibilitychange", () => {
+        if (document.visibilityState === "hidden") flushReviews({ keepalive: true });
     });
-
-}   
+}
 
 async function cardActions() {
     const editButton = document.getElementById("edit-card");
@@ -177,7 +226,8 @@ async function showReviewFinishedMessage(){
 
 async function backToStartButton(){
     const backToStart = document.getElementById("back-to-start");
-    backToStart.addEventListener("click", () => {
+    backToStart.addEventListener("click", async () => {
+        await flushReviews();
         window.location.href = "start.html";
     })
 }
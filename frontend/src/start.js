@@ -32,7 +32,7 @@ async function apiDelete(path) {
 // =====================
 // UI Helpers
 // =====================
-function createDeckListItem(deck) {
+function createDeckListItem(deck, stats) {
   const li = document.createElement("li");
   const link = document.createElement("a");
   const deleteButton = document.createElement("button");
@@ -44,15 +44,22 @@ function createDeckListItem(deck) {
   deleteButton.dataset.id = deck.id;
 
   li.appendChild(link);
+  if (stats) {
+    const dueCount = document.createElement("span");
+    dueCount.classList.add("text-red-500");
+    dueCount.textContent = ` ${stats.due} due / ${stats.total} cards `;
+    li.appendChild(dueCount);
+  }
   li.appendChild(deleteButton);
 
   return li;
 }
 
-function renderDecks(decks) {
+function renderDecks(decks, deckStats) {
   const deckUl = document.querySelector("#decks-list");
   deckUl.innerHTML = ""; // clear old
-  decks.forEach((deck) => deckUl.appendChild(createDeckListItem(deck)));
+  const statsById = new Map(deckStats.map((stats) => [stats.deck_id, stats]));
+  decks.forEach((deck) => deckUl.appendChild(createDeckListItem(deck, statsById.get(deck.id))));
 }
 
 // =====================
@@ -66,8 +73,9 @@ async function loadUser() {
 }
 
 async function loadDecks() {
-  const decks = await apiGet("/decks");
-  renderDecks(decks);
+  // the card counts of all decks come from one request instead of one per deck
+  const [decks, deckStats] = await Promise.all([apiGet("/decks"), apiGet("/decks/stats")]);
+  renderDecks(decks, deckStats);
 }
 
 async function handleCreateDeck(event) {